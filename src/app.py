@@ -1,9 +1,10 @@
 import logging
 
 import dash_bootstrap_components as dbc
-from dash import Dash
+import diskcache
+from dash import Dash, DiskcacheManager
 
-from config.settings import LOG_LEVEL
+from config.settings import BACKGROUND_CACHE_PATH, LOG_LEVEL
 
 logging.basicConfig(
     format="%(asctime)s,%(msecs)03d %(levelname)-8s [%(filename)s %(funcName)s:%(lineno)d] %(message)s",
@@ -12,10 +13,15 @@ logging.basicConfig(
     level=LOG_LEVEL,
 )
 
+# Long running callbacks (e.g. watchlist scans) run in a separate process and
+# report progress through this cache
+background_callback_manager = DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_PATH))
+
 app = Dash(
     __name__,
     external_stylesheets=[dbc.themes.LUX, dbc.icons.FONT_AWESOME],
     suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager,
 )
 app.title = "Options Tracker"
 
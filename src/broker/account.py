@@ -8,7 +8,8 @@ class Account(Base):
     """A class for searching for an account."""
 
     def __init__(self, **query):
-        Base.__init__(self)
+        # account_number and consumer_id select the account, the selected one by default
+        Base.__init__(self, **query)
 
     def get_accounts(self, account="all", fields=None):
         """
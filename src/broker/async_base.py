@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from config.settings import ASYNC_MAX_CONCURRENCY, HTTP_TIMEOUT
+from utils.exceptions import APIException
+
+from .base import Base
+from .candle_store import candle_store
+from .history import validate_price_history
+from .options import chain_cache, chain_cache_key, chain_cache_ttl
+from .rate_limiter import RateLimiter, retry_delay, should_retry
+from .urls import (
+    GET_ACCOUNT,
+    GET_ACCOUNTS,
+    GET_OPTION_CHAIN,
+    GET_PRICE_HISTORY,
+    GET_QUOTES,
+)
+
+
+class AsyncBase(Base):
+    """
+    Asyncio counterpart of Base.
+
+    Multiplexes many in-flight requests on one event loop instead of spawning
+    worker processes that only wait on HTTP. Concurrency is bounded by a
+    semaphore so a large watchlist doesn't open hundreds of sockets at once.
+
+    EXAMPLE:
+
+    async with AsyncBase() as client:
+        chains = await asyncio.gather(
+            *(client.get_options_chain(option_chain=chain) for chain in chains)
+        )
+    """
+
+    def __init__(self, max_concurrency=None, **kwargs):
+        Base.__init__(self, **kwargs)
+        self.max_concurrency = max_concurrency or ASYNC_MAX_CONCURRENCY
+        self._semaphore = None
+        self._session = None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Session and semaphore must be created inside the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.merged_headers,
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    @staticmethod
+    def _prepare_params(params):
+        """aiohttp only accepts str, int or float values, so mirror what requests sends."""
+        if not params:
+            return None
+        return {key: str(value) for key, value in params.items() if value is not None}
+
+    async def _api_response_async(self, url, params, verify=True):
+        session = self._get_session()
+        limiter = RateLimiter.for_consumer(self.config["consumer_id"])
+
+        attempt = 0
+        throttled = False
+        while True:
+            # A penalty already holds the slot of the retry after a 429
+            if not throttled:
+                await limiter.acquire_async()
+            async with self._semaphore:
+                start = time.perf_counter()
+                async with session.get(
+                    url,
+                    params=self._prepare_params(params),
+                    ssl=None if verify else False,
+                ) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    try:
+                        response_dict = await response.json(content_type=None)
+                    except ValueError:
+                        response_dict = {}
+                logging.debug(
+                    f"GET {url} {status} in {(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+
+            if status == 200:
+                return response_dict
+
+            if not should_retry(status, attempt):
+                raise APIException(
+                    response_dict if isinstance(response_dict, dict) else {}
+                )
+
+            # Back off, and hold everyone sharing the quota if we were throttled
+            delay = retry_delay(retry_after, attempt)
+            throttled = status == 429
+            if throttled:
+                await limiter.penalize_async(delay)
+            logging.warning(f"{url} returned {status}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_quotes(self, instruments=None):
+        """
+        Async version of Quotes.get_quotes
+
+        NAME: instruments
+        DESC: A list of different financial instruments.
+        TYPE: List
+        """
+        instruments = self.prepare_arguments_list(parameter_list=instruments)
+        data = {"apikey": self.config["consumer_id"], "symbol": instruments}
+        url = self.api_endpoint(GET_QUOTES)
+        return await self._api_response_async(url=url, params=data)
+
+    async def get_options_chain(self, option_chain=None, args_dictionary=None):
+        """
+        Async version of Options.get_options_chain, the response is shared
+        through chain_cache and must not be modified.
+
+        NAME: option_chain
+        DESC: Represents a single OptionChainObject.
+        TYPE: TDAmeritrade.OptionChainObject
+        """
+        url = self.api_endpoint(GET_OPTION_CHAIN)
+
+        if option_chain is not None:
+            option_chain.add_chain_key(
+                key_name="apikey", key_value=self.config["consumer_id"]
+            )
+            data = option_chain._get_query_parameters()
+        else:
+            data = args_dictionary
+
+        cache_key = chain_cache_key(data)
+        res = chain_cache.get(cache_key)
+        if res is None:
+            res = await self._api_response_async(url=url, params=data)
+            chain_cache.set(cache_key, res, chain_cache_ttl())
+        return res
+
+    async def get_price_history(
+        self,
+        symbol=None,
+        periodType=None,
+        period=None,
+        startDate=None,
+        endDate=None,
+        frequencyType=None,
+        frequency=None,
+        needExtendedHoursData=None,
+    ):
+        """
+        Async version of History.get_price_history, returns the candles.
+        Served from the local candle store like the sync version.
+        """
+        data = {
+            "apikey": self.config["consumer_id"],
+            "period": period,
+            "periodType": periodType,
+            "startDate": startDate,
+            "endDate": endDate,
+            "frequency": frequency,
+            "frequencyType": frequencyType,
+            "needExtendedHoursData": needExtendedHoursData,
+        }
+        data = validate_price_history(data)
+        url = self.api_endpoint(GET_PRICE_HISTORY.format(symbol=symbol))
+
+        if candle_store.supports(data):
+            # Candle files are read and written in the default executor so the
+            # other requests on the event loop keep going
+            loop = asyncio.get_running_loop()
+            stored, fetch_start, fetch_end = await loop.run_in_executor(
+                None, candle_store.plan, symbol, data
+            )
+            candles = []
+            if fetch_start is not None:
+                params = dict(data, startDate=fetch_start, endDate=fetch_end)
+                res = await self._api_response_async(url=url, params=params)
+                candles = res["candles"]
+            return await loop.run_in_executor(
+                None, candle_store.update, symbol, data, stored, candles, fetch_end
+            )
+
+        res = await self._api_response_async(url=url, params=data)
+        return res["candles"]
+
+    async def get_accounts(self, account="all", fields=None):
+        """
+        Async version of Account.get_accounts
+
+        NAME: account
+        DESC: The account number you wish to recieve data on. Default value is 'all'
+              which will return all accounts of the user.
+        TYPE: String
+
+        NAME: fields
+        DESC: Balances displayed by default, additional fields can be added here by
+              adding positions or orders.
+        TYPE: List<String>
+        """
+        fields = self.prepare_arguments_list(parameter_list=fields)
+        data = {"apikey": self.config["consumer_id"], "fields": fields}
+
+        if account == "all":
+            endpoint = GET_ACCOUNTS
+        else:
+            endpoint = GET_ACCOUNT.format(accountId=account)
+
+        url = self.api_endpoint(endpoint)
+        return await self._api_response_async(url=url, params=data)
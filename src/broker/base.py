@@ -2,11 +2,11 @@ import logging
 import time
 import urllib.parse
 
-import requests
-
 from utils.exceptions import APIException
 from utils.store import Store_Factory
 
+from .rate_limiter import RateLimiter, retry_delay, should_retry
+from .session import SessionManager
 from .user_config import REDIRECT_URI, UserConfig
 
 
@@ -14,6 +14,9 @@ class Base:
     # Cache store
     store = Store_Factory.get_store()
 
+    # Auth state already read from the store, shared by every client in the process
+    _auth_states = {}
+
     """
         TD Ameritrade API Client Class.
 
@@ -194,7 +197,7 @@ class Base:
         TYPE: String
         """
 
-        cache_key = "auth_state" + UserConfig.ACCOUNT_NUMBER
+        cache_key = "auth_state" + self.config["account_number"]
         # define the initalized state, these are the default values.
         initialized_state = {
             "access_token": None,
@@ -213,12 +216,20 @@ class Base:
 
             # if they allowed for caching get from cache
             if self.config["cache_state"]:
-                current_auth_state = Base.store.get_dict(cache_key)
+                current_auth_state = Base._auth_states.get(cache_key)
+                # Re-read the store only when the in process copy is about to expire
+                if (
+                    not current_auth_state
+                    or current_auth_state["access_token_expires_at"] - time.time() < 60
+                ):
+                    current_auth_state = Base.store.get_dict(cache_key)
+                    if current_auth_state:
+                        Base._auth_states[cache_key] = current_auth_state
                 if current_auth_state:  # If data available in cache
                     self.state.update(current_auth_state)
                 else:
                     logging.error(
-                        f" Auth State not available in cache for user {UserConfig.ACCOUNT_NUMBER}"
+                        f" Auth State not available in cache for user {self.config['account_number']}"
                     )
 
         # if they want to save it and have allowed for caching then read from cache
@@ -226,6 +237,7 @@ class Base:
             # build JSON string using dictionary comprehension.
             json_string = {key: self.state[key] for key in initialized_state}
             Base.store.set_dict(cache_key, json_string)
+            Base._auth_states[cache_key] = json_string
 
     def login(self, url_str):
         """
@@ -309,8 +321,8 @@ class Base:
         }
 
         # post the data to the token endpoint and store the response.
-        token_response = requests.post(
-            url=self.config["token_endpoint"], data=data, verify=True
+        token_response = SessionManager.request(
+            "POST", url=self.config["token_endpoint"], data=data, verify=True
         )
 
         # call the save_token method to save the access token.
@@ -360,7 +372,9 @@ class Base:
         }
 
         # make a post request to the token endpoint
-        response = requests.post(self.config["token_endpoint"], data=data, verify=True)
+        response = SessionManager.request(
+            "POST", self.config["token_endpoint"], data=data, verify=True
+        )
 
         # if there was an error go through the full authentication
         if response.status_code == 401:
@@ -595,12 +609,37 @@ class Base:
         return parameter_list
 
     def _api_response(self, url, params, verify=True):
-        response = requests.get(
-            url=url, headers=self.merged_headers, params=params, verify=verify
-        )
-
-        if response.status_code != 200:
-            raise APIException(response)
+        limiter = RateLimiter.for_consumer(self.config["consumer_id"])
+
+        attempt = 0
+        throttled = False
+        while True:
+            # A penalty already holds the slot of the retry after a 429
+            if not throttled:
+                limiter.acquire()
+            response = SessionManager.request(
+                "GET",
+                url=url,
+                headers=self.merged_headers,
+                params=params,
+                verify=verify,
+            )
+            if response.status_code == 200:
+                break
+
+            if not should_retry(response.status_code, attempt):
+                raise APIException(response)
+
+            # Back off, and hold everyone sharing the quota if we were throttled
+            delay = retry_delay(response.headers.get("Retry-After"), attempt)
+            throttled = response.status_code == 429
+            if throttled:
+                limiter.penalize(delay)
+            logging.warning(
+                f"{url} returned {response.status_code}, retrying in {delay:.2f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
 
         response_dict = response.json()
         logging.debug(response_dict)
@@ -0,0 +1,203 @@
+import logging
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from config.settings import CANDLE_STORE_PATH
+
+# Columns of a candle, stored as one array each
+CANDLE_FIELDS = ("datetime", "open", "high", "low", "close", "volume")
+
+# Intraday candles change too often to be worth keeping
+STORED_FREQUENCY_TYPES = ("daily", "weekly", "monthly")
+
+
+class CandleStore:
+    """
+    Price history kept on disk, one columnar .npz file per symbol and frequency.
+
+    A request for a date range is served from the file when it already covers
+    the start of the range, and only the candles from the last stored one
+    onwards are fetched from the API. The last stored candle is always fetched
+    again since it may have been saved while the market was still open.
+
+    covered_from is the date from which the file holds every candle. A range
+    starting earlier is fetched at least up to covered_from, so the stored
+    candles stay contiguous.
+
+    EXAMPLE:
+
+    stored, fetch_start, fetch_end = candle_store.plan(symbol, data)
+    candles = []
+    if fetch_start is not None:
+        candles = fetch(dict(data, startDate=fetch_start, endDate=fetch_end))
+    candles = candle_store.update(symbol, data, stored, candles, fetch_end)
+
+    Parameters:
+        path (str): Directory holding the candle files, empty to disable the store
+    """
+
+    def __init__(self, path: str = CANDLE_STORE_PATH):
+        self.path = path
+
+    def supports(self, data: dict) -> bool:
+        """True if a validated get_price_history payload can be served by the store"""
+        return bool(
+            self.path
+            and data.get("startDate")
+            and data.get("endDate")
+            and data.get("frequencyType") in STORED_FREQUENCY_TYPES
+        )
+
+    def plan(self, symbol: str, data: dict) -> tuple:
+        """
+        Loads the stored candles and works out where the API request should start.
+
+        Args:
+            symbol (str): Ticker
+            data (dict): Validated get_price_history payload, dates in milliseconds
+
+        Returns:
+            (stored, fetch_start, fetch_end):
+                stored (dict): Stored columns and covered_from, None if nothing stored
+                fetch_start, fetch_end (int): startDate and endDate of the request
+                    to send, in milliseconds, None if the stored candles already
+                    cover the whole range
+        """
+        stored = self.load(symbol, data["frequencyType"], data["frequency"])
+        if stored is None or len(stored["datetime"]) == 0:
+            return stored, data["startDate"], data["endDate"]
+
+        if stored["covered_from"] > data["startDate"]:
+            # Fetch through to the stored candles so no gap is left before them
+            return (
+                stored,
+                data["startDate"],
+                max(data["endDate"], stored["covered_from"]),
+            )
+
+        last = int(stored["datetime"][-1])
+        if last > data["endDate"]:
+            return stored, None, None
+        return stored, last, data["endDate"]
+
+    def update(
+        self, symbol: str, data: dict, stored: dict, candles: list, fetch_end: int
+    ) -> list:
+        """
+        Merges the fetched candles into the stored ones, saves them and returns
+        the candles of the requested range.
+
+        Args:
+            symbol (str): Ticker
+            data (dict): Validated get_price_history payload, dates in milliseconds
+            stored (dict): Stored columns returned by plan
+            candles (list): Candles returned by the API
+            fetch_end (int): endDate of the request the candles were fetched
+                with, None if nothing was fetched
+
+        Returns:
+            list: Candles between startDate and endDate, as returned by the API
+        """
+        fetched = {
+            field: np.array(
+                [candle[field] for candle in candles],
+                dtype=np.int64 if field == "datetime" else np.float64,
+            )
+            for field in CANDLE_FIELDS
+        }
+
+        if stored is not None and len(stored["datetime"]) == 0:
+            stored = None
+
+        # Coverage only extends back when the fetched range reaches the stored one
+        if stored is None or (
+            stored["covered_from"] > data["startDate"]
+            and fetch_end is not None
+            and fetch_end >= stored["covered_from"]
+        ):
+            covered_from = data["startDate"]
+        else:
+            covered_from = stored["covered_from"]
+
+        if stored is not None:
+            # Fetched candles replace stored ones with the same timestamp
+            keep = ~np.isin(stored["datetime"], fetched["datetime"])
+            columns = {
+                field: np.concatenate([stored[field][keep], fetched[field]])
+                for field in CANDLE_FIELDS
+            }
+        else:
+            columns = fetched
+
+        order = np.argsort(columns["datetime"], kind="stable")
+        columns = {field: values[order] for field, values in columns.items()}
+
+        try:
+            self.save(
+                symbol, data["frequencyType"], data["frequency"], columns, covered_from
+            )
+        except OSError as e:
+            logging.warning(f"Unable to save candles for {symbol}: {str(e)}")
+
+        window = (columns["datetime"] >= data["startDate"]) & (
+            columns["datetime"] <= data["endDate"]
+        )
+        return [
+            {
+                "open": float(columns["open"][i]),
+                "high": float(columns["high"][i]),
+                "low": float(columns["low"][i]),
+                "close": float(columns["close"][i]),
+                "volume": int(columns["volume"][i]),
+                "datetime": int(columns["datetime"][i]),
+            }
+            for i in np.flatnonzero(window)
+        ]
+
+    def load(self, symbol: str, frequency_type: str, frequency: int) -> dict:
+        """Returns the stored columns and covered_from, or None if nothing is stored"""
+        file_name = self.file_name(symbol, frequency_type, frequency)
+        try:
+            with np.load(file_name) as stored:
+                columns = {field: stored[field] for field in CANDLE_FIELDS}
+                columns["covered_from"] = int(stored["covered_from"])
+                return columns
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable candle file {file_name}: {str(e)}")
+            return None
+
+    def save(
+        self,
+        symbol: str,
+        frequency_type: str,
+        frequency: int,
+        columns: dict,
+        covered_from: int,
+    ):
+        """Writes the columns atomically so readers never see a partial file"""
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    covered_from=np.int64(covered_from),
+                    **{field: columns[field] for field in CANDLE_FIELDS},
+                )
+            os.replace(tmp_name, self.file_name(symbol, frequency_type, frequency))
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def file_name(self, symbol: str, frequency_type: str, frequency: int) -> str:
+        # Symbols like $SPX.X or BRK/B aren't safe file names as is
+        name = re.sub(r"[^A-Za-z0-9.]", "_", symbol.upper())
+        return os.path.join(self.path, f"{name}_{frequency_type}_{frequency}.npz")
+
+
+candle_store = CandleStore()
@@ -1,17 +1,118 @@
+import asyncio
 import datetime
+import logging
 from enum import Enum
 
+import numpy as np
 import pandas as pd
 
 import broker.utils
-from utils.functions import date_from_milliseconds
+from utils.ustradingcalendar import MARKET_TIMEZONE
 
 from .base import Base
+from .candle_store import candle_store
 from .urls import GET_PRICE_HISTORY
 
 
-class History(Base):
+def validate_price_history(data):
+    """Validator function for get_price_history, returns the payload without None values"""
+    # Valid periods by periodType
+    valid_periods = {
+        "day": [1, 2, 3, 4, 5, 10],
+        "month": [1, 2, 3, 6],
+        "year": [1, 2, 3, 5, 10, 15, 20],
+        "ytd": [1],
+    }
+
+    # Valid frequencyType by period
+    valid_frequency_types = {
+        "day": ["minute"],
+        "month": ["daily", "weekly"],
+        "year": ["daily", "weekly", "monthly"],
+        "ytd": ["daily", "weekly"],
+    }
+
+    # Valid frequency by frequencyType
+    valid_frequencies = {
+        "minute": [1, 5, 10, 15, 30],
+        "daily": [1],
+        "weekly": [1],
+        "monthly": [1],
+    }
+
+    # check the startDate and endDate types
+    if isinstance(data["startDate"], datetime.datetime):
+        data["startDate"] = broker.utils.milliseconds_since_epoch(data["startDate"])
+    elif not (isinstance(data["startDate"], int) and (data["startDate"] is not None)):
+        raise TypeError("startDate must be a datetime.datetime or an int")
+
+    if isinstance(data["endDate"], datetime.datetime):
+        data["endDate"] = broker.utils.milliseconds_since_epoch(data["endDate"])
+    elif not (isinstance(data["endDate"], int) and (data["endDate"] is not None)):
+        raise TypeError("endDate must be a datetime.datetime or an int")
+
+    # check data to confirm that either period or date range is provided
+    if (data["startDate"] and data["endDate"] and not data["period"]) or (
+        not data["startDate"] and not data["endDate"] and data["period"]
+    ):
+        # Validate periodType
+        if data["periodType"] not in valid_periods.keys():
+            print(
+                "Period Type: {} is not valid. Valid values are {}".format(
+                    data["periodType"], valid_periods.keys()
+                )
+            )
+            raise ValueError("Invalid Value")
+
+        # Validate period
+        if data["period"] and data["period"] not in valid_periods[data["periodType"]]:
+            print(
+                "Period: {} is not valid. Valid values are {}".format(
+                    data["period"], valid_periods[data["periodType"]]
+                )
+            )
+            raise ValueError("Invalid Value")
+
+        # Validate frequencyType by frenquency
+        if data["frequencyType"] not in valid_frequencies.keys():
+            print(
+                "frequencyType: {} is not valid. Valid values are {}".format(
+                    data["frequencyType"], valid_frequencies.keys()
+                )
+            )
+            raise ValueError("Invalid Value")
+
+        # Validate frequencyType by periodType
+        if data["frequencyType"] not in valid_frequency_types[data["periodType"]]:
+            print(
+                "frequencyType: {} is not valid. Valid values for period: {} are {}".format(
+                    data["frequencyType"],
+                    data["periodType"],
+                    valid_frequency_types[data["periodType"]],
+                )
+            )
+            raise ValueError("Invalid Value")
+
+        # Validate periodType
+        if data["frequency"] not in valid_frequencies[data["frequencyType"]]:
+            print(
+                "frequency: {} is not valid. Valid values are {}".format(
+                    data["frequency"], valid_frequencies[data["frequencyType"]]
+                )
+            )
+            raise ValueError("Invalid Value")
+
+        # TODO Validate startDate and endDate
+
+        # Recompute payload dictionary and remove any None values
+        return {k: v for k, v in data.items() if v is not None}
 
+    else:
+        print("Either startDate/endDate or period must be provided exclusively.")
+        raise ValueError("Invalid Value")
+
+
+class History(Base):
     """A class for searching for History."""
 
     def __init__(self, **query):
@@ -68,117 +169,6 @@ class History(Base):
 
         """
 
-        # Validator function for get_price_history
-        def validate(data):
-            # Valid periods by periodType
-            valid_periods = {
-                "day": [1, 2, 3, 4, 5, 10],
-                "month": [1, 2, 3, 6],
-                "year": [1, 2, 3, 5, 10, 15, 20],
-                "ytd": [1],
-            }
-
-            # Valid frequencyType by period
-            valid_frequency_types = {
-                "day": ["minute"],
-                "month": ["daily", "weekly"],
-                "year": ["daily", "weekly", "monthly"],
-                "ytd": ["daily", "weekly"],
-            }
-
-            # Valid frequency by frequencyType
-            valid_frequencies = {
-                "minute": [1, 5, 10, 15, 30],
-                "daily": [1],
-                "weekly": [1],
-                "monthly": [1],
-            }
-
-            # check the startDate and endDate types
-            if isinstance(data["startDate"], datetime.datetime):
-                data["startDate"] = broker.utils.milliseconds_since_epoch(
-                    data["startDate"]
-                )
-            elif not (
-                isinstance(data["startDate"], int) and (data["startDate"] is not None)
-            ):
-                raise TypeError("startDate must be a datetime.datetime or an int")
-
-            if isinstance(data["endDate"], datetime.datetime):
-                data["endDate"] = broker.utils.milliseconds_since_epoch(data["endDate"])
-            elif not (
-                isinstance(data["endDate"], int) and (data["endDate"] is not None)
-            ):
-                raise TypeError("endDate must be a datetime.datetime or an int")
-
-            # check data to confirm that either period or date range is provided
-            if (data["startDate"] and data["endDate"] and not data["period"]) or (
-                not data["startDate"] and not data["endDate"] and data["period"]
-            ):
-                # Validate periodType
-                if data["periodType"] not in valid_periods.keys():
-                    print(
-                        "Period Type: {} is not valid. Valid values are {}".format(
-                            data["periodType"], valid_periods.keys()
-                        )
-                    )
-                    raise ValueError("Invalid Value")
-
-                # Validate period
-                if (
-                    data["period"]
-                    and data["period"] not in valid_periods[data["periodType"]]
-                ):
-                    print(
-                        "Period: {} is not valid. Valid values are {}".format(
-                            data["period"], valid_periods[data["periodType"]]
-                        )
-                    )
-                    raise ValueError("Invalid Value")
-
-                # Validate frequencyType by frenquency
-                if data["frequencyType"] not in valid_frequencies.keys():
-                    print(
-                        "frequencyType: {} is not valid. Valid values are {}".format(
-                            data["frequencyType"], valid_frequencies.keys()
-                        )
-                    )
-                    raise ValueError("Invalid Value")
-
-                # Validate frequencyType by periodType
-                if (
-                    data["frequencyType"]
-                    not in valid_frequency_types[data["periodType"]]
-                ):
-                    print(
-                        "frequencyType: {} is not valid. Valid values for period: {} are {}".format(
-                            data["frequencyType"],
-                            data["periodType"],
-                            valid_frequency_types[data["periodType"]],
-                        )
-                    )
-                    raise ValueError("Invalid Value")
-
-                # Validate periodType
-                if data["frequency"] not in valid_frequencies[data["frequencyType"]]:
-                    print(
-                        "frequency: {} is not valid. Valid values are {}".format(
-                            data["frequency"], valid_frequencies[data["frequencyType"]]
-                        )
-                    )
-                    raise ValueError("Invalid Value")
-
-                # TODO Validate startDate and endDate
-
-                # Recompute payload dictionary and remove any None values
-                return {k: v for k, v in data.items() if v is not None}
-
-            else:
-                print(
-                    "Either startDate/endDate or period must be provided exclusively."
-                )
-                raise ValueError("Invalid Value")
-
         # build the params dictionary
         data = {
             "apikey": self.config["consumer_id"],
@@ -195,11 +185,23 @@ class History(Base):
         endpoint = GET_PRICE_HISTORY.format(symbol=symbol)
 
         # validate the data
-        data = validate(data)
+        data = validate_price_history(data)
 
         # build the url
         url = self.api_endpoint(endpoint)
 
+        # Daily and longer candles are served from the local store, only the
+        # candles since the last stored one are requested
+        if candle_store.supports(data):
+            stored, fetch_start, fetch_end = candle_store.plan(symbol, data)
+            candles = []
+            if fetch_start is not None:
+                params = dict(data, startDate=fetch_start, endDate=fetch_end)
+                candles = self._api_response(url=url, params=params, verify=True)[
+                    "candles"
+                ]
+            return candle_store.update(symbol, data, stored, candles, fetch_end)
+
         self._data = self._api_response(url=url, params=data, verify=True)
 
         # return the response of the get request.
@@ -227,8 +229,119 @@ class History(Base):
             needExtendedHoursData=needExtendedHoursData,
         )
 
-        df = pd.json_normalize(res)
-        if not df.empty:
-            df["datetime"] = df["datetime"].apply(date_from_milliseconds)
-            df = df.set_index("datetime")
+        return candles_to_df(res)
+
+    def get_price_history_bulk(
+        self,
+        symbols=None,
+        periodType=None,
+        period=None,
+        startDate=None,
+        endDate=None,
+        frequencyType=None,
+        frequency=None,
+        needExtendedHoursData=None,
+        wide=False,
+    ):
+        """
+        Price history of many symbols fetched concurrently, with the same
+        arguments as get_price_history. Requests share the rate limiter and
+        daily candles are served from the local candle store. Symbols that
+        fail are logged and left out.
+
+        NAME: symbols
+        DESC: The ticker symbols to request data for.
+        TYPE: List<String>
+
+        NAME: wide
+        DESC: Return the close prices only, one column per symbol, instead of one row
+              per symbol and candle.
+        TYPE: Boolean
+
+        RETURNS: DataFrame with a DatetimeIndex in market time, long format has
+                 symbol, open, high, low, close and volume columns.
+        """
+        from .async_base import AsyncBase
+
+        async def fetch():
+            async with AsyncBase() as client:
+                return await asyncio.gather(
+                    *(
+                        client.get_price_history(
+                            symbol=symbol,
+                            periodType=periodType,
+                            period=period,
+                            startDate=startDate,
+                            endDate=endDate,
+                            frequencyType=frequencyType,
+                            frequency=frequency,
+                            needExtendedHoursData=needExtendedHoursData,
+                        )
+                        for symbol in symbols
+                    ),
+                    return_exceptions=True,
+                )
+
+        histories = asyncio.run(fetch())
+
+        results = {}
+        for symbol, candles in zip(symbols, histories):
+            if isinstance(candles, Exception):
+                logging.error(
+                    f"Error fetching historical prices for {symbol}: {str(candles)}"
+                )
+                continue
+            results[symbol] = candles
+
+        df = candles_to_frame(results, intraday=frequencyType == "minute")
+        if wide:
+            # Columns in the order the symbols were requested
+            df = df.pivot(columns="symbol", values="close")
+            return df.reindex(columns=list(results)).rename_axis(columns=None)
         return df
+
+
+def candles_to_frame(histories, intraday=False):
+    """
+    Long format DataFrame of the candles of many symbols, indexed by a
+    DatetimeIndex in market time. Daily and longer candles are dated at midnight.
+
+    Args:
+        histories (dict): Candles returned by get_price_history, keyed by symbol
+        intraday (bool): Keep the time of the candles
+    """
+    frames = [pd.DataFrame(candles) for candles in histories.values()]
+    columns = ["symbol", "open", "high", "low", "close", "volume"]
+    if not any(len(frame) for frame in frames):
+        return pd.DataFrame(
+            columns=columns, index=pd.DatetimeIndex([], name="datetime")
+        )
+
+    df = pd.concat(frames, ignore_index=True)
+    df["symbol"] = np.repeat(list(histories), [len(frame) for frame in frames])
+    index = market_time(df["datetime"])
+    if not intraday:
+        index = index.dt.normalize()
+    df.index = pd.DatetimeIndex(index, name="datetime")
+    return df[columns]
+
+
+def candles_to_df(candles):
+    """
+    Convert candles returned by get_price_history to a DataFrame indexed by
+    the date of each candle in market time, as a %Y-%m-%d string
+    """
+    df = pd.json_normalize(candles)
+    if not df.empty:
+        df["datetime"] = market_time(df["datetime"]).dt.strftime("%Y-%m-%d")
+        df = df.set_index("datetime")
+    return df
+
+
+def market_time(milliseconds):
+    """Epoch milliseconds converted in one pass to naive datetimes in market time"""
+    return (
+        pd.to_datetime(milliseconds, unit="ms", utc=True)
+        .dt.tz_convert(MARKET_TIMEZONE)
+        .dt.tz_localize(None)
+    )
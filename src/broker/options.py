@@ -1,8 +1,77 @@
+import datetime
+import json
+
+import numpy as np
 import pandas as pd
 
+from config.settings import (OPTION_CHAIN_CACHE_SHARED, OPTION_CHAIN_CACHE_SIZE,
+                             OPTION_CHAIN_TTL_CLOSED, OPTION_CHAIN_TTL_OPEN)
+from utils.ttl_cache import TTLCache
+from utils.ustradingcalendar import seconds_until_open
+
 from .base import Base
 from .urls import GET_OPTION_CHAIN
 
+# Contract fields kept from the chain JSON, mapped to column name and dtype
+CHAIN_FIELDS = {
+    'symbol': ('symbol', object),
+    'putCall': ('type', object),
+    'strikePrice': ('strike_price', np.float64),
+    'mark': ('mark', np.float64),
+    'bid': ('bid', np.float64),
+    'ask': ('ask', np.float64),
+    'delta': ('delta', np.float64),
+    'volatility': ('volatility', np.float64),
+    'daysToExpiration': ('days_to_expiration', np.int64),
+    'openInterest': ('open_interest', np.int64),
+    'totalVolume': ('volume', np.int64),
+}
+
+# Option chain responses keyed by their query parameters. Callers share the
+# cached dict, so it must be treated as read only.
+chain_cache = TTLCache(
+    maxsize=OPTION_CHAIN_CACHE_SIZE,
+    prefix='option_chain',
+    store=Base.store if OPTION_CHAIN_CACHE_SHARED else None)
+
+
+def chain_cache_key(query_parameters):
+    '''
+        Normalized cache key for an option chain request. The apikey is dropped
+        and dates are truncated to the day, since the endpoint only looks at the
+        date and screens build them from datetime.now().
+
+        NAME: query_parameters
+        DESC: The query parameters sent to the Get Option Chains endpoint.
+        TYPE: Dictionary
+
+        RTYPE: String
+    '''
+
+    normalized = {}
+    for key, value in query_parameters.items():
+        if key == 'apikey' or value is None:
+            continue
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.strftime('%Y-%m-%d')
+        normalized[key] = value
+
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def chain_cache_ttl():
+    '''
+        Seconds an option chain stays fresh. Quotes move during market hours so
+        keep it short, after the close keep it until the next open.
+
+        RTYPE: Float
+    '''
+
+    wait = seconds_until_open()
+    if wait == 0:
+        return OPTION_CHAIN_TTL_OPEN
+    return min(wait, OPTION_CHAIN_TTL_CLOSED)
+
 
 class Options(Base):
 
@@ -31,6 +100,10 @@ class Options(Base):
 
             SessionObject.get_options_chain( option_chain = option_chain_1)
 
+            The response is served from chain_cache and shared with every caller
+            asking for the same chain, so it must not be modified. Copy it first
+            (copy.deepcopy) to change it.
+
         '''
 
         # define the endpoint
@@ -54,10 +127,67 @@ class Options(Base):
             # otherwise take the args dictionary.
             data = args_dictionary
 
-        self._data = self._api_response(url=url, params=data, verify=True)
+        # serve repeated screens of the same chain from the cache
+        cache_key = chain_cache_key(data)
+        self._data = chain_cache.get(cache_key)
+        if self._data is None:
+            self._data = self._api_response(url=url, params=data, verify=True)
+            chain_cache.set(cache_key, self._data, chain_cache_ttl())
 
         # return the response of the get request.
         return self._data
 
 
-
+def option_chain_to_df(res, contract_type=None):
+    '''
+        Flattens the expiration/strike tree of a Get Option Chains response into
+        one typed DataFrame, one row per contract.
+
+        The nested maps are walked once to collect the contracts and the columns
+        are then built as NumPy arrays, instead of creating a Python object per
+        strike. Numeric fields the API reports as "NaN" become NaN.
+
+        NAME: res
+        DESC: Response of the Get Option Chains endpoint.
+        TYPE: Dictionary
+
+        NAME: contract_type
+        DESC: PUT or CALL to parse one side of the chain, both sides if None.
+        TYPE: String
+
+        RTYPE: pd.DataFrame with the CHAIN_FIELDS columns plus underlying,
+               stock_price and expiration (datetime64)
+    '''
+
+    if contract_type == 'PUT':
+        map_keys = ['putExpDateMap']
+    elif contract_type == 'CALL':
+        map_keys = ['callExpDateMap']
+    else:
+        map_keys = ['putExpDateMap', 'callExpDateMap']
+
+    # Expiration keys look like '2023-11-17:30', only the first contract per strike is used
+    expirations = []
+    contracts = []
+    for map_key in map_keys:
+        for expiration, strikes in res.get(map_key, {}).items():
+            for strike_contracts in strikes.values():
+                contracts.append(strike_contracts[0])
+                expirations.append(expiration[:10])
+
+    columns = {}
+    for field, (column, dtype) in CHAIN_FIELDS.items():
+        values = [contract.get(field) for contract in contracts]
+        if dtype is object:
+            columns[column] = np.array(values, dtype=object)
+        else:
+            numeric = pd.to_numeric(np.array(values, dtype=object), errors='coerce')
+            if dtype is np.int64:
+                numeric = np.nan_to_num(numeric).astype(np.int64)
+            columns[column] = numeric.astype(dtype, copy=False)
+
+    df = pd.DataFrame(columns)
+    df['underlying'] = res.get('symbol')
+    df['stock_price'] = float(res['underlyingPrice']) if 'underlyingPrice' in res else np.nan
+    df['expiration'] = pd.to_datetime(np.array(expirations, dtype=object), format='%Y-%m-%d')
+    return df
@@ -0,0 +1,155 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from config.settings import QUOTE_CACHE_MAX_AGE
+
+from .quotes import Quotes, quotes_frame
+
+# Level one stream fields merged into the cached quotes, by Quotes API key
+STREAM_FIELDS = {
+    "bid-price": "bidPrice",
+    "ask-price": "askPrice",
+    "last-price": "lastPrice",
+    "bid-size": "bidSize",
+    "ask-size": "askSize",
+    "total-volume": "totalVolume",
+    "last-size": "lastSize",
+    "high-price": "highPrice",
+    "low-price": "lowPrice",
+    "open-price": "openPrice",
+    "close-price": "closePrice",
+    "net-change": "netChange",
+    "mark": "mark",
+    "quote-time-in-long": "quoteTimeInLong",
+    "trade-time-in-long": "tradeTimeInLong",
+}
+
+
+def fetch_quotes(symbols: list) -> dict:
+    return Quotes().get_quotes(symbols)
+
+
+class QuoteCache:
+    """
+    Latest quote of each symbol, shared by the screens and strategies that
+    price the same symbols within seconds of each other.
+
+    A quote is served from the cache while it is younger than max_age. The
+    stale and missing symbols of a request are fetched together in one
+    get_quotes call, and a symbol already being fetched by another thread is
+    waited for instead of being requested again.
+
+    When the streamer is running, level one pushes keep the quotes of the
+    subscribed symbols fresh so they aren't polled. If the stream stops, the
+    quotes age out and are fetched again.
+
+    Parameters:
+        max_age (float): Seconds a quote is served before it is fetched again
+        fetch (callable): Takes a list of symbols and returns their quotes by symbol
+    """
+
+    def __init__(self, max_age: float = QUOTE_CACHE_MAX_AGE, fetch=fetch_quotes):
+        self.max_age = max_age
+        self.fetch = fetch
+        self._quotes = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_quotes(self, symbols, max_age: float = None) -> dict:
+        """
+        Quotes of the symbols, fetching the stale and missing ones in one request.
+
+        Parameters:
+            symbols (str | list): Symbols to quote
+            max_age (float): Overrides the cache max_age for this request
+
+        Returns:
+            dict: Quotes by symbol, symbols without a quote are left out
+        """
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+
+        quotes = {}
+        pending = {}
+        missing = []
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self._quotes.get(symbol)
+                if entry is not None and now - entry[0] <= max_age:
+                    quotes[symbol] = entry[1]
+                elif symbol in self._inflight:
+                    pending[symbol] = self._inflight[symbol]
+                else:
+                    pending[symbol] = self._inflight[symbol] = Future()
+                    missing.append(symbol)
+
+        if missing:
+            self._fetch(missing)
+
+        for symbol, future in pending.items():
+            quote = future.result()
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def get_quotesDF(self, symbols, max_age: float = None) -> pd.DataFrame:
+        """Quotes as a Dataframe, like Quotes.get_quotesDF"""
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        return quotes_frame(self.get_quotes(symbols, max_age=max_age), symbols)
+
+    def _fetch(self, symbols: list):
+        try:
+            fetched = self.fetch(symbols)
+        except Exception as e:
+            with self._lock:
+                for symbol in symbols:
+                    self._inflight.pop(symbol).set_exception(e)
+            raise
+
+        received = time.time()
+        with self._lock:
+            for symbol in symbols:
+                quote = fetched.get(symbol)
+                if quote is not None:
+                    self._quotes[symbol] = (received, quote)
+                self._inflight.pop(symbol).set_result(quote)
+
+    def on_stream_quote(self, symbol: str, fields: dict):
+        """
+        Handler for TDStreamerClient level one quotes. Pushes only carry the
+        fields that changed, so they are merged into a quote already fetched
+        from the Quotes API and other symbols are ignored.
+        """
+        with self._lock:
+            entry = self._quotes.get(symbol)
+            if entry is None:
+                return
+            quote = dict(entry[1])
+            for field, value in fields.items():
+                key = STREAM_FIELDS.get(field)
+                if key is not None and value is not None:
+                    quote[key] = value
+            self._quotes[symbol] = (time.time(), quote)
+
+    def subscribe(self, streamer, symbols: list):
+        """
+        Keeps the quotes of the symbols fresh from the level one stream. Call
+        before streamer.stream().
+        """
+        self.get_quotes(symbols)
+        streamer.level_one_quotes(
+            symbols=list(symbols), fields=["symbol", *STREAM_FIELDS]
+        )
+        streamer.add_handler(service="QUOTE", handler=self.on_stream_quote)
+
+    def clear(self):
+        """Drops every cached quote."""
+        with self._lock:
+            self._quotes.clear()
+
+
+quote_cache = QuoteCache()
@@ -1,11 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from config.settings import QUOTES_CHUNK_SIZE, QUOTES_FETCH_WORKERS
+
 from .base import Base
 from .urls import GET_QUOTES
 
 
 class Quotes(Base):
-
     """A class for searching for an account."""
 
     def __init__(self, **query):
@@ -31,6 +34,12 @@ class Quotes(Base):
 
         """
 
+        # Long lists are split so the URL stays short, chunks are fetched in parallel
+        if instruments is not None and not isinstance(instruments, str):
+            instruments = list(dict.fromkeys(instruments))
+            if len(instruments) > QUOTES_CHUNK_SIZE:
+                return self._get_quotes_chunked(instruments)
+
         # because we have a list argument, prep it for the request.
         instruments = self.prepare_arguments_list(parameter_list=instruments)
 
@@ -48,6 +57,21 @@ class Quotes(Base):
         # return the response of the get request.
         return self._data
 
+    def _get_quotes_chunked(self, instruments):
+        chunks = [
+            instruments[i : i + QUOTES_CHUNK_SIZE]
+            for i in range(0, len(instruments), QUOTES_CHUNK_SIZE)
+        ]
+        workers = min(len(chunks), QUOTES_FETCH_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self.get_quotes, chunks))
+
+        quotes = {}
+        for result in results:
+            quotes.update(result)
+        self._data = quotes
+        return quotes
+
     def get_quotes_flatten(self, instruments=None):
         quotes_str = self.get_quotes(instruments=instruments)
         quotes = []
@@ -56,5 +80,18 @@ class Quotes(Base):
         return quotes
 
     def get_quotesDF(self, instruments=None):
-        """get transaction information as Dataframe"""
-        return pd.json_normalize(self.get_quotes_flatten(instruments=instruments))
+        """
+        Quotes as a Dataframe, one row per instrument in the order requested.
+        Instruments the API didn't return a quote for are left out.
+        """
+        instruments = (
+            [instruments] if isinstance(instruments, str) else list(instruments)
+        )
+        return quotes_frame(self.get_quotes(instruments=instruments), instruments)
+
+
+def quotes_frame(quotes: dict, instruments: list) -> pd.DataFrame:
+    """Quotes keyed by symbol as a Dataframe, one row per instrument found"""
+    found = [symbol for symbol in dict.fromkeys(instruments) if symbol in quotes]
+    df = pd.DataFrame.from_dict(quotes, orient="index")
+    return df.reindex(found).reset_index(drop=True)
@@ -0,0 +1,153 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+
+from config.settings import (
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_MINUTE,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_MAX_ATTEMPTS,
+)
+from utils.store import Store_Factory
+
+# Responses worth retrying, anything else is raised straight away
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread and process using the same consumer id.
+
+    The bucket state lives in the configured Store and is updated atomically, so
+    joblib workers and gunicorn workers draw from one quota. Tokens are reserved
+    rather than polled: a caller finding the bucket empty takes a token anyway,
+    driving the balance negative, and sleeps until its slot comes up. Requests
+    therefore leave at a steady rate right up to the quota instead of bursting
+    into 429s and backing off.
+
+    Parameters:
+        consumer_id (str): Consumer id the quota belongs to
+        rate_per_minute (float): Requests allowed per minute
+        burst (float): Bucket capacity, requests that can go out back to back
+    """
+
+    _limiters = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        consumer_id: str,
+        rate_per_minute: float = RATE_LIMIT_PER_MINUTE,
+        burst: float = RATE_LIMIT_BURST,
+        store=None,
+    ):
+        self.key = f"rate_limit{consumer_id}"
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.store = store or Store_Factory.get_store()
+        # Used when the store can't be reached so requests still get paced
+        self._local_state = None
+        self._local_lock = threading.Lock()
+
+    @classmethod
+    def for_consumer(cls, consumer_id: str) -> "RateLimiter":
+        """Returns the limiter for a consumer id, shared within the process."""
+        with cls._lock:
+            if consumer_id not in cls._limiters:
+                cls._limiters[consumer_id] = cls(consumer_id)
+            return cls._limiters[consumer_id]
+
+    def _refill(self, state, now):
+        if not state:
+            return {"tokens": self.burst, "updated": now}
+        elapsed = max(now - state["updated"], 0)
+        tokens = min(self.burst, state["tokens"] + elapsed * self.rate)
+        return {"tokens": tokens, "updated": now}
+
+    def _update(self, fn):
+        try:
+            return self.store.update_dict(self.key, fn)
+        except Exception as e:
+            logging.warning(f"Rate limiter falling back to process state: {str(e)}")
+            with self._local_lock:
+                self._local_state = fn(self._local_state)
+                return self._local_state
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns the seconds to wait before using it.
+        """
+        now = time.time()
+
+        def take(state):
+            state = self._refill(state, now)
+            state["tokens"] -= 1
+            return state
+
+        state = self._update(take)
+        return max(-state["tokens"] / self.rate, 0.0)
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent, returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Async version of acquire, yields to the event loop while waiting."""
+        # Store I/O blocks, so it runs in the default executor
+        wait = await asyncio.get_running_loop().run_in_executor(None, self.reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float):
+        """
+        Broker pushed back, so empty the bucket for everyone sharing the quota
+        until the given number of seconds has passed. The slot at the end of
+        the penalty belongs to the throttled caller, whose retry must not
+        acquire another token.
+        """
+        now = time.time()
+
+        def drain(state):
+            state = self._refill(state, now)
+            state["tokens"] = min(state["tokens"], -seconds * self.rate)
+            return state
+
+        self._update(drain)
+
+    async def penalize_async(self, seconds: float):
+        """Async version of penalize, runs the Store I/O in the default executor."""
+        await asyncio.get_running_loop().run_in_executor(None, self.penalize, seconds)
+
+
+def retry_delay(retry_after, attempt: int) -> float:
+    """
+    Seconds to wait before the next attempt. A Retry-After header sent by the
+    broker wins, otherwise exponential backoff with full jitter.
+
+    Parameters:
+        retry_after (str): Retry-After header, seconds or an HTTP date
+        attempt (int): Attempt that just failed, starting at 0
+    """
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after)
+                return max(retry_at.timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2**attempt))
+
+
+def should_retry(status: int, attempt: int) -> bool:
+    """True if a response with this status should be retried after this attempt."""
+    return status in RETRY_STATUS and attempt < RETRY_MAX_ATTEMPTS - 1
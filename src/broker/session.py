@@ -0,0 +1,205 @@
+import logging
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (
+    HTTP_POOL_BLOCK,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_TIMEOUT,
+)
+
+
+class SessionManager:
+    """
+    Process wide HTTP session shared by every broker client.
+
+    A single requests.Session is created lazily per process and mounted with a
+    pooled HTTPAdapter, so connections to the TD Ameritrade hosts are kept alive
+    and reused instead of paying a new TCP + TLS handshake on every call. The
+    session is recreated after a fork since sockets can't be shared between
+    worker processes.
+
+    Attributes:
+        pool_connections (int): Number of hosts to keep a connection pool for
+        pool_maxsize (int): Maximum connections kept alive per host
+        pool_block (bool): Block when the pool for a host is exhausted
+        timeout (float): Default request timeout in seconds
+    """
+
+    pool_connections = HTTP_POOL_CONNECTIONS
+    pool_maxsize = HTTP_POOL_MAXSIZE
+    pool_block = HTTP_POOL_BLOCK
+    timeout = HTTP_TIMEOUT
+
+    _lock = threading.Lock()
+    _session = None
+    _adapter = None
+    _pid = None
+    _metrics = {}
+
+    @classmethod
+    def configure(cls, pool_connections=None, pool_maxsize=None, pool_block=None):
+        """
+        Override the pool limits. The current session is dropped so the next
+        request is served by a pool with the new limits.
+        """
+        with cls._lock:
+            if pool_connections is not None:
+                cls.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                cls.pool_maxsize = pool_maxsize
+            if pool_block is not None:
+                cls.pool_block = pool_block
+            cls._close()
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        Returns the pooled session for the current process, creating it if needed.
+        """
+        pid = os.getpid()
+        if cls._session is None or cls._pid != pid:
+            with cls._lock:
+                if cls._session is None or cls._pid != pid:
+                    cls._session, cls._adapter = cls._create_session()
+                    cls._pid = pid
+                    cls._metrics = {}
+        return cls._session
+
+    @classmethod
+    def request(cls, method, url, **kwargs) -> requests.Response:
+        """
+        Sends a request over the pooled session and records its latency.
+
+        Args:
+            method (str): HTTP method, e.g. GET or POST
+            url (str): Full URL of the endpoint
+
+        Returns:
+            requests.Response: Response of the request
+        """
+        session = cls.get_session()
+        kwargs.setdefault("timeout", cls.timeout)
+        host = urllib.parse.urlparse(url).netloc
+
+        cls._record_start(host)
+        start = time.perf_counter()
+        status = None
+        try:
+            response = session.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            cls._record_end(host, elapsed, status)
+            logging.debug(f"{method} {url} {status} in {elapsed * 1000:.1f} ms")
+
+    @classmethod
+    def get_metrics(cls) -> dict:
+        """
+        Request latency and pool utilization counters per host.
+
+        Returns:
+            dict: host -> {requests, errors, in_flight, peak_in_flight,
+                total_latency, max_latency, avg_latency, pool_maxsize,
+                open_connections, idle_connections}
+        """
+        with cls._lock:
+            metrics = {host: dict(values) for host, values in cls._metrics.items()}
+            pools = cls._pool_stats()
+
+        for host, values in metrics.items():
+            values["avg_latency"] = (
+                values["total_latency"] / values["requests"]
+                if values["requests"]
+                else 0.0
+            )
+            values["pool_maxsize"] = cls.pool_maxsize
+            values.update(pools.get(host, {}))
+        return metrics
+
+    @classmethod
+    def reset(cls):
+        """Close the pooled session and clear the counters."""
+        with cls._lock:
+            cls._close()
+
+    @classmethod
+    def _create_session(cls):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=cls.pool_connections,
+            pool_maxsize=cls.pool_maxsize,
+            pool_block=cls.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session, adapter
+
+    @classmethod
+    def _close(cls):
+        if cls._session is not None and cls._pid == os.getpid():
+            cls._session.close()
+        cls._session = None
+        cls._adapter = None
+        cls._pid = None
+        cls._metrics = {}
+
+    @classmethod
+    def _host_metrics(cls, host):
+        if host not in cls._metrics:
+            cls._metrics[host] = {
+                "requests": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "total_latency": 0.0,
+                "max_latency": 0.0,
+            }
+        return cls._metrics[host]
+
+    @classmethod
+    def _record_start(cls, host):
+        with cls._lock:
+            values = cls._host_metrics(host)
+            values["in_flight"] += 1
+            values["peak_in_flight"] = max(
+                values["peak_in_flight"], values["in_flight"]
+            )
+
+    @classmethod
+    def _record_end(cls, host, elapsed, status):
+        with cls._lock:
+            values = cls._host_metrics(host)
+            values["in_flight"] -= 1
+            values["requests"] += 1
+            values["total_latency"] += elapsed
+            values["max_latency"] = max(values["max_latency"], elapsed)
+            if status is None or status >= 400:
+                values["errors"] += 1
+
+    @classmethod
+    def _pool_stats(cls):
+        """Connections opened and idle per host, read from the urllib3 pools."""
+        stats = {}
+        if cls._adapter is None:
+            return stats
+        try:
+            pools = cls._adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                stats[pool.host] = {
+                    "open_connections": pool.num_connections,
+                    "idle_connections": sum(
+                        1 for conn in list(pool.pool.queue) if conn is not None
+                    ),
+                }
+        except (AttributeError, KeyError) as e:
+            logging.debug(f"Pool stats not available: {str(e)}")
+        return stats
@@ -55,6 +55,10 @@ class TDStreamerClient():
         self.approved_writes = list(self.fields_keys_write.keys())
         self.approved_writes_level_2 = list(self.fields_keys_write_level_2.keys())
 
+        # callbacks registered per service, called with the content of every message
+        self.handlers = {}
+        self.CSV_PATH = None
+
     def write_behavior(self, write = 'csv', file_path = None, append_mode = True):
         """
             Sets the csv dump location and the append mode.
@@ -298,6 +302,44 @@ class TDStreamerClient():
         else:
             raise ConnectionError
 
+    def add_handler(self, service = None, handler = None):
+        '''
+            Registers a callback for the data of a streaming service, so the
+            stream can be consumed live instead of through the CSV dump.
+
+            NAME: service
+            DESC: The service to listen to, for example `QUOTE` for level one quotes.
+            TYPE: String
+
+            NAME: handler
+            DESC: Called with the symbol and a dictionary of the field values, keyed
+                  by field name (e.g. `last-price`) when the name is known.
+            TYPE: Callable
+        '''
+
+        self.handlers.setdefault(service, []).append(handler)
+
+    def _dispatch(self, data = None):
+        '''
+            Passes the content of each service in a stream message to its handlers.
+
+            NAME: data
+            DESC: The streaming data requested.
+            TYPE: List.
+        '''
+
+        for service_result in data:
+            handlers = self.handlers.get(service_result['service'])
+            if not handlers:
+                continue
+
+            field_names = self.fields_keys_write.get(service_result['service'], {})
+            for content in service_result['content']:
+                symbol = content.get('key')
+                fields = {field_names.get(key, key): value for key, value in content.items()}
+                for handler in handlers:
+                    handler(symbol, fields)
+
     async def _send_message(self, message=None):
         '''
             Sending message to webSocket server
@@ -331,8 +373,10 @@ class TDStreamerClient():
                     message = message.encode('utf-8').replace(b'\xef\xbf\xbd', bytes('"None"','utf-8')).decode('utf-8')
                     message_decoded = json.loads(message)
 
-                if 'data' in message_decoded.keys():                     
-                    await self._write_to_csv(data = message_decoded['data'])
+                if 'data' in message_decoded.keys():
+                    self._dispatch(data = message_decoded['data'])
+                    if self.CSV_PATH is not None:
+                        await self._write_to_csv(data = message_decoded['data'])
 
                 print('-'*20)
                 print('Received message from server: {}'.format(str(message_decoded)))
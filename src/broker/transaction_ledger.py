@@ -0,0 +1,423 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime as dt
+
+from config.settings import LEDGER_PATH, LEDGER_SYNC_INTERVAL
+from utils.constants import DATE_FORMAT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    account TEXT NOT NULL,
+    transaction_id INTEGER NOT NULL,
+    type TEXT,
+    date TEXT NOT NULL,
+    symbol TEXT,
+    underlying TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, transaction_id)
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (account, date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account TEXT NOT NULL,
+    transaction_type TEXT NOT NULL,
+    synced_from TEXT NOT NULL,
+    synced_to TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (account, transaction_type)
+);
+CREATE TABLE IF NOT EXISTS changed_tickers (
+    account TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (account, ticker)
+);
+CREATE TABLE IF NOT EXISTS premium_rollups (
+    account TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    close_date TEXT NOT NULL,
+    option_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_price REAL NOT NULL,
+    qty REAL NOT NULL,
+    trades INTEGER NOT NULL,
+    PRIMARY KEY (account, ticker, close_date, option_type, status)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    account TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    valid_until TEXT,
+    PRIMARY KEY (account, ticker)
+);
+"""
+
+# Bumped when the schema of the rollup tables changes, they are rebuilt from
+# the transactions
+SCHEMA_VERSION = 1
+
+# Underlying of option transactions, symbol of stock transactions
+TICKER = "COALESCE(underlying, symbol)"
+
+
+class TransactionLedger:
+    """
+    Transactions kept in a local SQLite database, one row per transaction id.
+
+    The ledger remembers which dates it holds for each account and transaction
+    type. A sync only asks the API for the dates it doesn't hold yet: the days
+    before the earliest synced date and the days from the high-water mark
+    onwards. The high-water mark day itself is fetched again since more
+    transactions may have been booked after it was synced, at most once every
+    LEDGER_SYNC_INTERVAL seconds. Transactions fetched twice replace the
+    stored copy.
+
+    The ledger also holds the premium rollups built from the transactions,
+    one row per ticker, close date, option type and status. Tickers with new
+    or changed transactions are flagged when they are saved so only their
+    rollups are rebuilt.
+
+    EXAMPLE:
+
+    transaction_ledger.sync(account, "TRADE", start_date, end_date, fetch)
+    transactions = transaction_ledger.query(account, "TRADE", start_date, end_date)
+
+    Parameters:
+        path (str): SQLite database file
+        sync_interval (float): Seconds before the high-water mark day is fetched again
+    """
+
+    def __init__(
+        self, path: str = LEDGER_PATH, sync_interval: float = LEDGER_SYNC_INTERVAL
+    ):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            # WAL lets the other gunicorn workers read while one of them syncs
+            connection.execute("PRAGMA journal_mode=WAL")
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version < SCHEMA_VERSION:
+                connection.executescript(
+                    "DROP TABLE IF EXISTS premium_rollups; "
+                    "DROP TABLE IF EXISTS rollup_state;"
+                )
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._initialized = True
+        return connection
+
+    def sync(
+        self,
+        account: str,
+        transaction_type: str,
+        start_date: str,
+        end_date: str,
+        fetch,
+    ) -> int:
+        """
+        Fetches the transactions between start_date and end_date that aren't in
+        the ledger yet.
+
+        Args:
+            account (str): Account number
+            transaction_type (str): Transaction type as accepted by the API, e.g. TRADE
+            start_date (str): First date, YYYY-MM-DD
+            end_date (str): Last date, YYYY-MM-DD. Dates after today are never synced.
+            fetch (callable): fetch(start_date, end_date) returning the list of
+                transactions from the API
+
+        Returns:
+            int: Number of new or changed transactions saved
+        """
+        today = dt.now().strftime(DATE_FORMAT)
+        end_date = min(end_date, today)
+        if start_date > end_date:
+            return 0
+
+        state = self.sync_state(account, transaction_type)
+        if state is None:
+            ranges = [(start_date, end_date)]
+        else:
+            ranges = []
+            if start_date < state["synced_from"]:
+                ranges.append((start_date, state["synced_from"]))
+            if end_date > state["synced_to"] or (
+                end_date == state["synced_to"]
+                and time.time() - state["synced_at"] > self.sync_interval
+            ):
+                ranges.append((state["synced_to"], end_date))
+
+        changed = 0
+        for range_start, range_end in ranges:
+            transactions = fetch(range_start, range_end) or []
+            changed += self.save(account, transactions)
+            self._save_sync_state(account, transaction_type, range_start, range_end)
+            logging.debug(
+                f"Synced {len(transactions)} {transaction_type} transactions "
+                f"for {range_start} to {range_end}"
+            )
+        return changed
+
+    def save(self, account: str, transactions: list) -> int:
+        """
+        Adds the transactions, replacing the stored ones with the same id, and
+        flags the tickers of the new or changed transactions
+
+        Returns:
+            int: Number of new or changed transactions
+        """
+        ids = [int(transaction["transactionId"]) for transaction in transactions]
+        with closing(self._connect()) as connection, connection:
+            stored = dict(
+                connection.execute(
+                    "SELECT transaction_id, data FROM transactions WHERE account = ? "
+                    "AND transaction_id IN (SELECT value FROM json_each(?))",
+                    (account, json.dumps(ids)),
+                ).fetchall()
+            )
+            rows = [
+                _row(account, transaction)
+                for transaction in transactions
+                if int(transaction["transactionId"]) not in stored
+                or json.loads(stored[int(transaction["transactionId"])]) != transaction
+            ]
+            connection.executemany(
+                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+            now = time.time()
+            tickers = {row[5] or row[4] for row in rows} - {None}
+            connection.executemany(
+                "INSERT OR REPLACE INTO changed_tickers VALUES (?, ?, ?)",
+                [(account, ticker, now) for ticker in tickers],
+            )
+        return len(rows)
+
+    def query(
+        self,
+        account: str,
+        transaction_type: str,
+        start_date: str = None,
+        end_date: str = None,
+        symbol=None,
+    ) -> list:
+        """
+        Stored transactions between start_date and end_date, oldest first.
+
+        Args:
+            account (str): Account number
+            transaction_type (str): Transaction type, ALL for every type
+            start_date (str): First date, YYYY-MM-DD, None for no lower bound
+            end_date (str): Last date, YYYY-MM-DD, None for no upper bound
+            symbol (str or list): Only transactions on these symbols or with them
+                as underlying
+
+        Returns:
+            list: Transactions as returned by the API
+        """
+        sql = "SELECT data FROM transactions WHERE account = ?"
+        args = [account]
+        if start_date:
+            sql += " AND date >= ?"
+            args.append(start_date)
+        if end_date:
+            sql += " AND date <= ?"
+            args.append(end_date)
+        if transaction_type != "ALL":
+            sql += " AND type = ?"
+            args.append(transaction_type)
+        if symbol:
+            symbols = json.dumps([symbol] if isinstance(symbol, str) else list(symbol))
+            sql += (
+                " AND (symbol IN (SELECT value FROM json_each(?))"
+                " OR underlying IN (SELECT value FROM json_each(?)))"
+            )
+            args += [symbols, symbols]
+        sql += " ORDER BY date, transaction_id"
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(sql, args).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def stale_tickers(self, account: str, today: str) -> tuple:
+        """
+        Tickers whose premium rollups must be rebuilt: tickers with new or
+        changed transactions, tickers never rolled up and tickers with an
+        active trade that expired before today.
+
+        Returns:
+            (tickers, as_of): set of tickers and the time they were read, to be
+                passed back to save_rollups
+        """
+        as_of = time.time()
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"""
+                SELECT ticker FROM changed_tickers WHERE account = :account
+                UNION
+                SELECT ticker FROM rollup_state
+                WHERE account = :account AND valid_until < :today
+                UNION
+                SELECT DISTINCT {TICKER} FROM transactions t
+                WHERE account = :account AND {TICKER} IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM rollup_state r
+                    WHERE r.account = t.account AND r.ticker = {TICKER}
+                )
+                """,
+                {"account": account, "today": today},
+            ).fetchall()
+        return {ticker for (ticker,) in rows}, as_of
+
+    def save_rollups(
+        self,
+        account: str,
+        tickers: set,
+        rollups: list,
+        valid_until: dict,
+        as_of: float,
+    ):
+        """
+        Replaces the premium rollups of the tickers.
+
+        Args:
+            account (str): Account number
+            tickers (set): Tickers rebuilt, as returned by stale_tickers
+            rollups (list): dicts with ticker, close_date, option_type, status,
+                total_price, qty and trades
+            valid_until (dict): Ticker to the earliest expiry of its active
+                trades, the rollups must be rebuilt after that date
+            as_of (float): Time returned by stale_tickers, tickers changed since
+                stay flagged
+        """
+        tickers = json.dumps(sorted(tickers))
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "DELETE FROM premium_rollups WHERE account = ? "
+                "AND ticker IN (SELECT value FROM json_each(?))",
+                (account, tickers),
+            )
+            connection.executemany(
+                "INSERT INTO premium_rollups VALUES "
+                "(:account, :ticker, :close_date, :option_type, :status, "
+                ":total_price, :qty, :trades)",
+                [dict(rollup, account=account) for rollup in rollups],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO rollup_state VALUES (?, ?, ?)",
+                [
+                    (account, ticker, valid_until.get(ticker))
+                    for ticker in json.loads(tickers)
+                ],
+            )
+            connection.execute(
+                "DELETE FROM changed_tickers WHERE account = ? AND changed_at <= ? "
+                "AND ticker IN (SELECT value FROM json_each(?))",
+                (account, as_of, tickers),
+            )
+
+    def rollups(
+        self,
+        account: str,
+        start_date: str = None,
+        end_date: str = None,
+        tickers=None,
+        option_type: str = None,
+        status: str = None,
+    ) -> list:
+        """
+        Premium rollups, optionally filtered.
+
+        Args:
+            account (str): Account number
+            start_date (str): First close date, YYYY-MM-DD
+            end_date (str): Last close date, YYYY-MM-DD
+            tickers (str or list): Only these tickers
+            option_type (str): PUT or CALL
+            status (str): Assigned, Closed, Expired or Active
+
+        Returns:
+            list: dicts with ticker, close_date, option_type, status,
+                total_price, qty and trades, by close date and ticker
+        """
+        sql = (
+            "SELECT ticker, close_date, option_type, status, total_price, qty, "
+            "trades FROM premium_rollups WHERE account = ?"
+        )
+        args = [account]
+        if start_date:
+            sql += " AND close_date >= ?"
+            args.append(start_date)
+        if end_date:
+            sql += " AND close_date <= ?"
+            args.append(end_date)
+        if tickers:
+            sql += " AND ticker IN (SELECT value FROM json_each(?))"
+            args.append(
+                json.dumps([tickers] if isinstance(tickers, str) else list(tickers))
+            )
+        if option_type:
+            sql += " AND option_type = ?"
+            args.append(option_type)
+        if status:
+            sql += " AND status = ?"
+            args.append(status)
+        sql += " ORDER BY close_date, ticker"
+
+        with closing(self._connect()) as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(sql, args).fetchall()
+        return [dict(row) for row in rows]
+
+    def sync_state(self, account: str, transaction_type: str) -> dict:
+        """synced_from, synced_to and synced_at (epoch seconds), None if never synced"""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT synced_from, synced_to, synced_at FROM sync_state "
+                "WHERE account = ? AND transaction_type = ?",
+                (account, transaction_type),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("synced_from", "synced_to", "synced_at"), row))
+
+    def _save_sync_state(self, account, transaction_type, start_date, end_date):
+        # Widen the synced dates, another worker may have synced in the meantime
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """
+                INSERT INTO sync_state VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (account, transaction_type) DO UPDATE SET
+                    synced_from = MIN(synced_from, excluded.synced_from),
+                    synced_to = MAX(synced_to, excluded.synced_to),
+                    synced_at = CASE WHEN excluded.synced_to >= synced_to
+                        THEN excluded.synced_at ELSE synced_at END
+                """,
+                (account, transaction_type, start_date, end_date, time.time()),
+            )
+
+
+def _row(account, transaction):
+    instrument = (transaction.get("transactionItem") or {}).get("instrument") or {}
+    return (
+        account,
+        int(transaction["transactionId"]),
+        transaction.get("type"),
+        transaction["transactionDate"][:10],
+        instrument.get("symbol"),
+        instrument.get("underlyingSymbol"),
+        json.dumps(transaction),
+    )
+
+
+transaction_ledger = TransactionLedger()
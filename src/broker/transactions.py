@@ -1,10 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt
+from datetime import timedelta
+
 import pandas as pd
 
+from config.settings import TRANSACTION_FETCH_WORKERS
+
 from .base import Base
 
+# The API rejects date ranges longer than a year
+MAX_WINDOW_DAYS = 365
 
-class Transaction(Base):
 
+class Transaction(Base):
     """A class for searching for an account."""
 
     def __init__(self, **query):
@@ -126,7 +134,8 @@ class Transaction(Base):
         transaction_id=None,
     ):
         """
-        get transaction information as Dataframe
+        get transaction information as Dataframe, date ranges longer than a
+        year are fetched in yearly windows
 
         Args:
             account:
@@ -138,12 +147,93 @@ class Transaction(Base):
 
         Returns:
         """
-        return pd.json_normalize(
-            self.get_transactions(
+        if start_date and end_date:
+            transactions = self.get_transactions_range(
+                account=account,
+                transaction_type=transaction_type,
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+            )
+        else:
+            transactions = self.get_transactions(
                 account=account,
                 transaction_type=transaction_type,
                 symbol=symbol,
                 start_date=start_date,
                 end_date=end_date,
             )
-        )
+        return pd.json_normalize(transactions)
+
+    def get_transactions_range(
+        self,
+        account=None,
+        transaction_type=None,
+        symbol=None,
+        start_date=None,
+        end_date=None,
+        max_workers=None,
+    ):
+        """
+        Transactions between any two dates. The range is split in windows the API
+        accepts, which are fetched concurrently over the pooled session.
+
+        Args:
+            account (str): Account number
+            transaction_type (str): Transaction type, see get_transactions
+            symbol (str): Only transactions for this symbol
+            start_date (str): yyyy-MM-dd
+            end_date (str): yyyy-MM-dd
+            max_workers (int): Windows fetched at once, TRANSACTION_FETCH_WORKERS by default
+
+        Returns:
+            list: Transactions of every window, once per transactionId
+        """
+        windows = date_windows(start_date, end_date)
+        if not windows:
+            return []
+
+        def fetch(window):
+            transactions = self.get_transactions(
+                account=account,
+                transaction_type=transaction_type,
+                symbol=symbol,
+                start_date=window[0],
+                end_date=window[1],
+            )
+            if transactions is False:
+                raise ValueError(f"Invalid transaction type {transaction_type}")
+            return transactions or []
+
+        if len(windows) == 1:
+            results = [fetch(windows[0])]
+        else:
+            workers = min(len(windows), max_workers or TRANSACTION_FETCH_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(fetch, windows))
+
+        # Windows don't overlap but a transaction may still be reported twice
+        transactions = {}
+        for result in results:
+            for transaction in result:
+                transactions.setdefault(transaction["transactionId"], transaction)
+        return list(transactions.values())
+
+
+def date_windows(start_date, end_date, max_days=MAX_WINDOW_DAYS):
+    """
+    Splits start_date to end_date (yyyy-MM-dd, both included) in consecutive
+    windows spanning at most max_days days
+
+    Returns:
+        list: (start_date, end_date) of each window, empty if start_date > end_date
+    """
+    start = dt.strptime(start_date, "%Y-%m-%d")
+    end = dt.strptime(end_date, "%Y-%m-%d")
+
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=max_days - 1), end)
+        windows.append((start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        start = window_end + timedelta(days=1)
+    return windows
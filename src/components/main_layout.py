@@ -8,6 +8,10 @@ user_bar = dbc.DropdownMenu(
     [
         dbc.DropdownMenuItem(account, href=account)
         for account in Accounts().get_account_list()
+    ]
+    + [
+        dbc.DropdownMenuItem(divider=True),
+        dbc.DropdownMenuItem("household", href="household"),
     ],
     label=html.I(className="fa-regular fa-user"),
 )
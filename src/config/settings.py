@@ -1,11 +1,84 @@
+import os
+
 from config.config_manager import ConfigManager
 
+
+def get_bool(key: str, default: bool = False) -> bool:
+    """Flag from the environment, only 1, true, yes or on (any case) enable it"""
+    value = ConfigManager.getInstance().getConfig(key)
+    if value is None:
+        return default
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
 APP_HOST = ConfigManager.getInstance().getConfig("HOST")
 APP_PORT = ConfigManager.getInstance().getConfig("PORT")
-APP_DEBUG = bool(ConfigManager.getInstance().getConfig("DEBUG"))
+APP_DEBUG = get_bool("DEBUG")
 STORE_PATH = ConfigManager.getInstance().getConfig("STORE_PATH")
 CACHE_TYPE = ConfigManager.getInstance().getConfig("CACHE_TYPE")
 REDIS_HOST = ConfigManager.getInstance().getConfig("REDIS_HOST")
 REDIS_PORT = ConfigManager.getInstance().getConfig("REDIS_PORT")
 REDIS_PWD = ConfigManager.getInstance().getConfig("REDIS_PWD")
 LOG_LEVEL = (ConfigManager.getInstance().getConfig("LOG_LEVEL", "INFO")).upper()
+HTTP_POOL_CONNECTIONS = int(
+    ConfigManager.getInstance().getConfig("HTTP_POOL_CONNECTIONS", 4)
+)
+HTTP_POOL_MAXSIZE = int(ConfigManager.getInstance().getConfig("HTTP_POOL_MAXSIZE", 20))
+HTTP_POOL_BLOCK = get_bool("HTTP_POOL_BLOCK")
+HTTP_TIMEOUT = float(ConfigManager.getInstance().getConfig("HTTP_TIMEOUT", 30))
+ASYNC_MAX_CONCURRENCY = int(
+    ConfigManager.getInstance().getConfig("ASYNC_MAX_CONCURRENCY", 32)
+)
+RATE_LIMIT_PER_MINUTE = float(
+    ConfigManager.getInstance().getConfig("RATE_LIMIT_PER_MINUTE", 120)
+)
+RATE_LIMIT_BURST = float(ConfigManager.getInstance().getConfig("RATE_LIMIT_BURST", 5))
+RETRY_MAX_ATTEMPTS = int(ConfigManager.getInstance().getConfig("RETRY_MAX_ATTEMPTS", 5))
+RETRY_BACKOFF_BASE = float(
+    ConfigManager.getInstance().getConfig("RETRY_BACKOFF_BASE", 0.5)
+)
+RETRY_BACKOFF_MAX = float(
+    ConfigManager.getInstance().getConfig("RETRY_BACKOFF_MAX", 30)
+)
+OPTION_CHAIN_CACHE_SIZE = int(
+    ConfigManager.getInstance().getConfig("OPTION_CHAIN_CACHE_SIZE", 128)
+)
+OPTION_CHAIN_CACHE_SHARED = get_bool("OPTION_CHAIN_CACHE_SHARED")
+OPTION_CHAIN_TTL_OPEN = float(
+    ConfigManager.getInstance().getConfig("OPTION_CHAIN_TTL_OPEN", 60)
+)
+OPTION_CHAIN_TTL_CLOSED = float(
+    ConfigManager.getInstance().getConfig("OPTION_CHAIN_TTL_CLOSED", 6 * 3600)
+)
+BACKGROUND_CACHE_PATH = ConfigManager.getInstance().getConfig(
+    "BACKGROUND_CACHE_PATH", "./background_cache"
+)
+CANDLE_STORE_PATH = ConfigManager.getInstance().getConfig(
+    "CANDLE_STORE_PATH", "./candles"
+)
+TRADING_CALENDAR_START_YEAR = int(
+    ConfigManager.getInstance().getConfig("TRADING_CALENDAR_START_YEAR", 2000)
+)
+TRADING_CALENDAR_END_YEAR = int(
+    ConfigManager.getInstance().getConfig("TRADING_CALENDAR_END_YEAR", 2050)
+)
+TRANSACTION_FETCH_WORKERS = int(
+    ConfigManager.getInstance().getConfig("TRANSACTION_FETCH_WORKERS", 4)
+)
+LEDGER_PATH = ConfigManager.getInstance().getConfig(
+    "LEDGER_PATH",
+    os.path.join(os.path.dirname(STORE_PATH or "") or ".", "transactions.sqlite"),
+)
+LEDGER_SYNC_INTERVAL = float(
+    ConfigManager.getInstance().getConfig("LEDGER_SYNC_INTERVAL", 300)
+)
+PORTFOLIO_SNAPSHOT_TTL = float(
+    ConfigManager.getInstance().getConfig("PORTFOLIO_SNAPSHOT_TTL", 60)
+)
+QUOTES_CHUNK_SIZE = int(ConfigManager.getInstance().getConfig("QUOTES_CHUNK_SIZE", 100))
+QUOTES_FETCH_WORKERS = int(
+    ConfigManager.getInstance().getConfig("QUOTES_FETCH_WORKERS", 4)
+)
+QUOTE_CACHE_MAX_AGE = float(
+    ConfigManager.getInstance().getConfig("QUOTE_CACHE_MAX_AGE", 10)
+)
@@ -29,7 +29,7 @@ def render_page_content(pathname):
         return home.layout
     elif pathname == "/income_finder":
         return income_finder.layout
-    elif pathname == "/portfolio":
+    elif pathname in ["/portfolio", "/household"]:
         return portfolio.layout
     elif pathname == "/report":
         return report.layout
@@ -1,22 +1,40 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
-from datetime import timedelta
+from io import StringIO
 
 import numpy as np
 import pandas as pd
 
 from broker.account import Account
-from broker.quotes import Quotes
+from broker.base import Base
+from broker.domain_objects import Balance
+from broker.quote_cache import quote_cache
 from broker.user_config import UserConfig
+from config.settings import PORTFOLIO_SNAPSHOT_TTL
+from utils.accounts import Accounts
 from utils.constants import DATE_FORMAT
 from utils.enums import PUT_CALL
-from utils.functions import convert_to_df, formatter_percent
+from utils.functions import convert_to_df, formatter_percent, parse_option_symbols
+from utils.ttl_cache import TTLCache
+
+# Enriched positions and balance per account, shared by the pages and gunicorn workers
+snapshot_cache = TTLCache(maxsize=8, prefix="portfolio_snapshot", store=Base.store)
+
+# Snapshot key of the positions of all the configured accounts
+HOUSEHOLD = "household"
+
+# Store key prefix of the snapshot versions, bumped when an account's data changes
+SNAPSHOT_VERSION = "portfolio_snapshot_version"
 
 
 class AccountPositions:
-    def __init__(self):
+    def __init__(self, household=False):
         super().__init__()
-        self.positions, self.balance = get_account()
+        if household:
+            self.positions, self.balance = get_household_snapshot()
+        else:
+            self.positions, self.balance = get_snapshot()
         self.params_options = {
             "quantity": "QTY",
             "underlying": "TICKER",
@@ -27,10 +45,15 @@ class AccountPositions:
             "intrinsic": "INTRINSIC",
             "extrinsic": "EXTRINSIC",
             "ITM": "ITM",
-            "theta": "THETA",
-            "delta": "DELTA",
+            "positionTheta": "THETA",
+            "positionDelta": "DELTA",
+            "positionGamma": "GAMMA",
+            "positionVega": "VEGA",
+            "dollarDelta": "DOLLAR DELTA",
+            "dollarGamma": "DOLLAR GAMMA",
             "averagePrice": "PURCHASE PRICE",
             "daysToExpiration": "DAYS",
+            "closeDate": "CLOSE_DATE",
             "maintenanceRequirement": "MARGIN",
         }
 
@@ -41,36 +64,29 @@ class AccountPositions:
             "averagePrice": "AVG COST",
             # "NET": "PROFIT/LOSS",
             "maintenanceRequirement": "MARGIN",
+            "positionDelta": "DELTA",
+            "dollarDelta": "DOLLAR DELTA",
         }
 
+        # Positions of all the accounts carry the account they are held in
+        if household:
+            self.params_options = {"account": "ACCOUNT", **self.params_options}
+            self.params_stocks = {"account": "ACCOUNT", **self.params_stocks}
+
     def get_put_positions(self):
         """
         Get all open Puts first from Accounts API and later pricing information
         for the symbol via Quotes
         """
 
-        def addmoneyness(row):
-            intrinsic = round(max(row["strikePrice"] - row["underlyingPrice"], 0), 2)
-            extrinsic = round(row["mark"] - intrinsic, 2)
-            itm = np.where(row["strikePrice"] > row["underlyingPrice"], "Y", "N")
-            return intrinsic, extrinsic, itm
-
         positions = self.positions
         # Filter for puts
         is_put = positions["option_type"] == PUT_CALL.PUT.value
         df = positions[is_put]
 
-        res_df = pd.DataFrame()
-        res_df[["intrinsic", "extrinsic", "ITM"]] = df.apply(
-            addmoneyness, axis=1, result_type="expand"
-        )
-        df = df.join(res_df)
-
         if not df.empty:
             #  Retain only the columns needed and rename
             df = df[self.params_options.keys()]
-            df["theta"] = df["theta"] * df["quantity"] * 100
-            df["delta"] = df["delta"] * df["quantity"] * 100
             df.rename(columns=self.params_options, inplace=True)
         # Add liquidity for Puts if assigned
         df["COST"] = df["STRIKE PRICE"] * df["QTY"].abs() * 100
@@ -80,9 +96,6 @@ class AccountPositions:
             .apply(formatter_percent)
         )
         df["PREMIUM"] = df["PURCHASE PRICE"] * df["QTY"].abs() * 100
-        df["CLOSE_DATE"] = df["DAYS"].apply(
-            lambda x: (dt.now() + timedelta(x)).strftime(DATE_FORMAT)
-        )
         df = df.round(2)
         df = df.sort_values(by=["DAYS"])
         return df
@@ -93,35 +106,18 @@ class AccountPositions:
         for the symbol via Qouotes
         """
 
-        def addmoneyness(row):
-            intrinsic = round(max(row["underlyingPrice"] - row["strikePrice"], 0), 2)
-            extrinsic = round(row["mark"] - intrinsic, 2)
-            itm = np.where(row["strikePrice"] < row["underlyingPrice"], "Y", "N")
-            return intrinsic, extrinsic, itm
-
         positions = self.positions
 
         # Filter for calls
         is_call = positions["option_type"] == PUT_CALL.CALL.value
         df = positions[is_call]
 
-        res_df = pd.DataFrame()
-        res_df[["intrinsic", "extrinsic", "ITM"]] = df.apply(
-            addmoneyness, axis=1, result_type="expand"
-        )
-        df = df.join(res_df)
-
         if not df.empty:
             #  Retain only the columns needed and rename
             df = df[self.params_options.keys()]
-            df["theta"] = df["theta"] * df["quantity"] * 100
-            df["delta"] = df["delta"] * df["quantity"] * 100
             df.rename(columns=self.params_options, inplace=True)
 
         df["PREMIUM"] = df["PURCHASE PRICE"] * df["QTY"].abs() * 100
-        df["CLOSE_DATE"] = df["DAYS"].apply(
-            lambda x: (dt.now() + timedelta(x)).strftime(DATE_FORMAT)
-        )
         df = df.sort_values(by=["DAYS"])
         df = df.round(2)
         return df
@@ -148,6 +144,240 @@ class AccountPositions:
         df = df.round(2)
         return df
 
+    def get_portfolio_greeks(self):
+        """
+        Greeks of all the positions added up
+
+        Returns:
+            Series: DELTA, GAMMA, THETA, VEGA, DOLLAR DELTA and DOLLAR GAMMA
+        """
+        greeks = {
+            "positionDelta": "DELTA",
+            "positionGamma": "GAMMA",
+            "positionTheta": "THETA",
+            "positionVega": "VEGA",
+            "dollarDelta": "DOLLAR DELTA",
+            "dollarGamma": "DOLLAR GAMMA",
+        }
+        if self.positions.empty:
+            return pd.Series(0.0, index=list(greeks.values()))
+        totals = self.positions[list(greeks)].sum().rename(greeks)
+        return totals.round(2)
+
+
+def get_snapshot(account_number=None):
+    """
+    Enriched positions and balance of the account, fetched at most once every
+    PORTFOLIO_SNAPSHOT_TTL seconds so switching pages reuses the same snapshot,
+    or again once invalidate_snapshot is called
+
+    Args:
+        account_number (str, optional): Defaults to the selected account
+
+    Returns:
+        (positions, balance): Positions with prices as returned by
+            enrich_positions, and the account Balance
+    """
+    account_number = account_number or UserConfig.ACCOUNT_NUMBER
+    key = snapshot_key(account_number)
+    snapshot = snapshot_cache.get(key) if key else None
+    if snapshot is not None:
+        return read_snapshot(snapshot)
+
+    positions, balance = get_account(account_number)
+    positions = enrich_positions(positions)
+    save_snapshot(key, positions, balance)
+    return positions, balance
+
+
+def get_household_snapshot():
+    """
+    Enriched positions of all the configured accounts with an account column,
+    and their balances added up. The accounts are fetched in parallel and all
+    the positions are priced with one quote request, cached like get_snapshot.
+
+    Returns:
+        (positions, balance): Positions as returned by enrich_positions plus
+            the account name, and the total Balance
+    """
+    key = snapshot_key(HOUSEHOLD)
+    snapshot = snapshot_cache.get(key) if key else None
+    if snapshot is not None:
+        return read_snapshot(snapshot)
+
+    names = Accounts().get_account_list()
+    with ThreadPoolExecutor(max_workers=max(len(names), 1)) as executor:
+        portfolios = dict(zip(names, executor.map(get_portfolio, names)))
+
+    # Accounts that couldn't be fetched are left out of the totals
+    portfolios = {
+        name: portfolio
+        for name, portfolio in portfolios.items()
+        if portfolio is not None
+    }
+    if not portfolios:
+        return enrich_positions(pd.DataFrame()), None
+
+    balance = Balance()
+    for portfolio in portfolios.values():
+        for field, value in vars(portfolio.balance).items():
+            setattr(balance, field, getattr(balance, field) + value)
+
+    frames = [
+        convert_to_df(portfolio.positions).assign(account=name)
+        for name, portfolio in portfolios.items()
+        if portfolio.positions
+    ]
+    if frames:
+        positions = add_prices(pd.concat(frames, ignore_index=True))
+    else:
+        positions = pd.DataFrame()
+    positions = enrich_positions(positions)
+    save_snapshot(key, positions, balance)
+    return positions, balance
+
+
+def get_portfolio(account_name):
+    """
+    Positions and balance of one of the configured accounts, with its own
+    account number and consumer id instead of the selected account's
+
+    Returns:
+        SecuritiesAccount: None if the account couldn't be fetched
+    """
+    accounts = Accounts()
+    account_number = accounts.get_account_number(account_name)
+    try:
+        return Account(
+            account_number=account_number,
+            consumer_id=accounts.get_consumer_id(account_name),
+        ).get_portfolio(account=account_number)
+    except Exception as e:
+        logging.error(f"Error fetching account {account_name}: {str(e)}")
+        return None
+
+
+def read_snapshot(snapshot):
+    positions = pd.read_json(
+        StringIO(snapshot["positions"]),
+        orient="split",
+        dtype=False,
+        convert_dates=False,
+    )
+    balance = Balance()
+    balance.__dict__.update(snapshot["balance"])
+    return positions, balance
+
+
+def save_snapshot(key, positions, balance):
+    # Failed fetches (and empty accounts) are not cached
+    if key and not positions.empty and balance is not None:
+        snapshot_cache.set(
+            key,
+            {
+                "positions": positions.to_json(orient="split"),
+                "balance": vars(balance),
+            },
+            PORTFOLIO_SNAPSHOT_TTL,
+        )
+
+
+def snapshot_key(name):
+    """
+    Cache key of the current version of a snapshot. The version is read from
+    the store on every call, so a snapshot invalidated by one worker is no
+    longer served by the in process copies of the others.
+
+    Returns:
+        str: None when the version can't be read, the snapshot isn't cached then
+    """
+    try:
+        state = Base.store.get_dict(SNAPSHOT_VERSION + name)
+    except Exception as e:
+        logging.warning(f"Unable to read the snapshot version of {name}: {str(e)}")
+        return None
+    return f"{name}:{(state or {}).get('version', 0)}"
+
+
+def invalidate_snapshot(account_number=None):
+    """
+    Retire the snapshots of the account and of the household in every worker,
+    the next page load fetches them again. Called when the account's data
+    changes, e.g. new trades synced to the ledger.
+    """
+    for name in (account_number or UserConfig.ACCOUNT_NUMBER, HOUSEHOLD):
+        try:
+            Base.store.update_dict(
+                SNAPSHOT_VERSION + name,
+                lambda state: {"version": (state or {}).get("version", 0) + 1},
+            )
+        except Exception as e:
+            logging.warning(f"Unable to invalidate the snapshot of {name}: {str(e)}")
+
+
+def enrich_positions(positions):
+    """
+    Add moneyness, close date and Greeks to every position in one pass
+
+    Option positions get intrinsic and extrinsic value, ITM (Y/N) and their
+    close date. Every position gets its Greeks scaled to the position size:
+    positionDelta (shares), positionGamma (shares per $1 move), positionTheta
+    ($ per day), positionVega ($ per vol point), dollarDelta ($ per 100% move)
+    and dollarGamma (change of dollarDelta per 1% move). Stocks have a delta of
+    one per share and no other Greeks, funds have none.
+
+    Args:
+        positions (DataFrame): Positions with prices, as returned by add_prices
+
+    Returns:
+        DataFrame: Positions with the added columns
+    """
+    if positions.empty:
+        return positions
+
+    df = positions.copy()
+    is_put = (df["option_type"] == PUT_CALL.PUT.value).to_numpy()
+    is_option = is_put | (df["option_type"] == PUT_CALL.CALL.value).to_numpy()
+
+    # How far the underlying is past the strike, positive when in the money
+    moneyness = np.where(
+        is_put,
+        df["strikePrice"] - df["underlyingPrice"],
+        df["underlyingPrice"] - df["strikePrice"],
+    )
+    intrinsic = np.maximum(moneyness, 0).round(2)
+    df["intrinsic"] = np.where(is_option, intrinsic, np.nan)
+    df["extrinsic"] = np.where(is_option, (df["mark"] - intrinsic).round(2), np.nan)
+    df["ITM"] = np.where(moneyness > 0, "Y", "N")
+    df["closeDate"] = np.where(
+        is_option, close_dates(df["symbol"], df["daysToExpiration"]), None
+    )
+
+    # Contracts cover 100 shares
+    shares = df["quantity"] * np.where(is_option, 100, 1)
+    underlying_price = np.where(is_option, df["underlyingPrice"], df["mark"])
+    is_equity = (df["instrument_type"] == "EQUITY").to_numpy()
+    delta = np.where(is_option, df["delta"], np.where(is_equity, 1.0, 0.0))
+    gamma = np.where(is_option, df["gamma"], 0.0)
+
+    df["positionDelta"] = delta * shares
+    df["positionGamma"] = gamma * shares
+    df["positionTheta"] = np.where(is_option, df["theta"], 0.0) * shares
+    df["positionVega"] = np.where(is_option, df["vega"], 0.0) * shares
+    df["dollarDelta"] = df["positionDelta"] * underlying_price
+    df["dollarGamma"] = df["positionGamma"] * underlying_price**2 / 100
+    return df
+
+
+def close_dates(symbols, days):
+    """
+    Option expiry taken from the position symbols, days to expiration from
+    now for the symbols that can't be parsed
+    """
+    expiry = parse_option_symbols(symbols)["expiry"]
+    from_days = pd.Timestamp(dt.now().date()) + pd.to_timedelta(days, unit="D")
+    return expiry.fillna(from_days).dt.strftime(DATE_FORMAT)
+
 
 def add_prices(df):
     """
@@ -155,9 +385,7 @@ def add_prices(df):
     """
 
     try:
-        quotes = Quotes()
-        instruments = df["symbol"]
-        res = quotes.get_quotesDF(instruments)
+        res = quote_cache.get_quotesDF(df["symbol"])
         res_filter = res[
             [
                 "symbol",
@@ -166,6 +394,8 @@ def add_prices(df):
                 "mark",
                 "theta",
                 "delta",
+                "gamma",
+                "vega",
                 "daysToExpiration",
             ]
         ]
@@ -178,19 +408,21 @@ def add_prices(df):
         return pd.DataFrame()
 
 
-def get_account():
+def get_account(account_number=None):
     """
     Get open positions and balances for a given account
 
     Args:
-        field (str, optional): positions or balances. Defaults to 'positions'.
+        account_number (str, optional): Defaults to the selected account
 
     Returns:
         _type_: _description_
     """
 
     try:
-        account = Account().get_portfolio(account=UserConfig.ACCOUNT_NUMBER)
+        account = Account().get_portfolio(
+            account=account_number or UserConfig.ACCOUNT_NUMBER
+        )
         position_df = convert_to_df(account.positions)
 
         # Populate pricing for all tickers
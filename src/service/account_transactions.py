@@ -1,18 +1,19 @@
+import logging
 from datetime import datetime as dt
 from datetime import timedelta
 
 import numpy as np
 import pandas as pd
-from pandas.tseries.offsets import CustomBusinessDay
 
+from broker.transaction_ledger import transaction_ledger
 from broker.transactions import Transaction
 from broker.user_config import UserConfig
+from service.account_positions import invalidate_snapshot
 from utils.constants import DATE_FORMAT, TIMESTAMP_FORMAT
-from utils.functions import parse_option_symbol
-from utils.ustradingcalendar import USTradingCalendar
+from utils.functions import parse_option_symbols
+from utils.ustradingcalendar import previous_business_day
 
 default_start_duration = 180
-cal = USTradingCalendar()
 
 
 # Mapping column for easier handling
@@ -54,18 +55,7 @@ def get_report(
     """
     df = get_api_transactions(start_close_date, end_close_date, symbol)
     if not df.empty:
-        df = df.rename(columns=params)
-
-        # Change df['transactionDate'] string to remove timestamp
-        df["DATE"] = pd.to_datetime(df["DATE"], format=TIMESTAMP_FORMAT).dt.strftime(
-            DATE_FORMAT
-        )
-
-        # Change df['optionExpirationDate'] string to remove timestamp
-        df["EXPIRY_DATE"] = pd.to_datetime(
-            df["EXPIRY_DATE"],
-            format=TIMESTAMP_FORMAT,
-        ).dt.strftime(DATE_FORMAT)
+        df = prepare_transactions(df)
 
         # Lambda function to filter records based on closing date search input
         filter_date = lambda df: df[
@@ -83,7 +73,7 @@ def get_report(
         elif instrument_type == "EQUITY":
             # Filter for EQUITY
             df = parse_equity_response(df, instrument_type)
-            df = df[(df["DATE"] >= start_close_date)]
+            df = df[(df["DATE"] >= start_close_date) & (df["DATE"] <= end_close_date)]
 
         # For all options parse puts and calls independently and concat
         else:
@@ -105,6 +95,27 @@ def get_api_transactions(
     end_close_date=None,
     symbol=None,
 ):
+    """
+    Every stored trade after syncing the ones that can close between the dates.
+
+    Opens and closes are paired over the whole ledger, same as the premium
+    rollups, so a trade held longer than the search window still finds its
+    opening leg. get_report filters the pairs on their close date.
+    """
+    account, _, _ = sync_transactions(start_close_date, end_close_date)
+    transactions = transaction_ledger.query(account, "TRADE", symbol=symbol)
+    return pd.json_normalize(transactions)
+
+
+def sync_transactions(start_close_date=None, end_close_date=None):
+    """
+    Bring the local ledger up to date with the trades that can close between
+    the given dates
+
+    Returns:
+        (account, search_start_date, search_end_date): Account synced and the
+            trade dates to search for the close dates
+    """
     # In case start date or end date is not passed, use to initialize default
     today = dt.now()
     if not start_close_date:
@@ -125,17 +136,181 @@ def get_api_transactions(
         dt.strptime(end_close_date, DATE_FORMAT) + timedelta(days=45)
     ).strftime(DATE_FORMAT)
 
+    account = UserConfig.ACCOUNT_NUMBER
     transaction = Transaction()
-    df = transaction.get_transactionsDF(
-        UserConfig.ACCOUNT_NUMBER,
-        transaction_type="TRADE",
-        symbol=symbol,
-        start_date=search_start_date,
-        end_date=search_end_date,
+
+    def fetch(start_date, end_date):
+        return transaction.get_transactions_range(
+            account,
+            transaction_type="TRADE",
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+    try:
+        # New trades change the positions and balances of the account
+        if transaction_ledger.sync(
+            account, "TRADE", search_start_date, search_end_date, fetch
+        ):
+            invalidate_snapshot(account)
+    except Exception as e:
+        logging.error(f"Unable to sync transactions, using the local ledger: {str(e)}")
+
+    return account, search_start_date, search_end_date
+
+
+def prepare_transactions(df):
+    """
+    Rename the API columns and remove the timestamp from the dates
+
+    Args:
+        df (DataFrame): Normalized transactions
+
+    Returns:
+        DataFrame: Transactions with the report column names
+    """
+    df = df.rename(columns=params)
+
+    # Change df['transactionDate'] string to remove timestamp
+    df["DATE"] = pd.to_datetime(df["DATE"], format=TIMESTAMP_FORMAT).dt.strftime(
+        DATE_FORMAT
     )
+
+    # Change df['optionExpirationDate'] string to remove timestamp
+    df["EXPIRY_DATE"] = pd.to_datetime(
+        df["EXPIRY_DATE"],
+        format=TIMESTAMP_FORMAT,
+    ).dt.strftime(DATE_FORMAT)
     return df
 
 
+def get_premium_rollups(
+    start_close_date=None,
+    end_close_date=None,
+    symbol=None,
+    instrument_type=None,
+    status="All",
+):
+    """
+    Realized premium per ticker, close month, option type and status, read
+    from the rollups kept in the ledger. Used by the TIME and TICKER reports.
+    Trades are selected on their close date like get_report, so the totals
+    match the TABLE report of the same search.
+
+    Args:
+        start_close_date (str, optional): Include trades closing from this date
+        end_close_date (str, optional): Include trades closing up to this date
+        symbol (str, optional): Ticker
+        instrument_type (str, optional): PUT, CALL or ALL. EQUITY has no
+            option premium, the result is empty.
+        status (str, optional): Trade status or All
+
+    Returns:
+        DataFrame: TICKER, MONTH, OPTION_TYPE, STATUS, TOTAL_PRICE, QTY and TRADES
+    """
+    columns = ["TICKER", "MONTH", "OPTION_TYPE", "STATUS"]
+    if instrument_type == "EQUITY":
+        return pd.DataFrame(columns=columns + ["TOTAL_PRICE", "QTY", "TRADES"])
+
+    account, _, _ = sync_transactions(start_close_date, end_close_date)
+    refresh_premium_rollups(account)
+
+    rollups = transaction_ledger.rollups(
+        account,
+        start_date=start_close_date,
+        end_date=end_close_date,
+        tickers=symbol,
+        option_type=instrument_type if instrument_type in ("PUT", "CALL") else None,
+        status=status if status != "All" else None,
+    )
+    df = pd.DataFrame(rollups, columns=list(rollup_columns))
+    df = df.rename(columns=rollup_columns)
+    df["MONTH"] = df["CLOSE_DATE"].str[:7]
+    return (
+        df.groupby(columns, as_index=False, sort=False)[
+            ["TOTAL_PRICE", "QTY", "TRADES"]
+        ]
+        .sum()
+        .round(2)
+    )
+
+
+# Rollup fields to report column names
+rollup_columns = {
+    "ticker": "TICKER",
+    "close_date": "CLOSE_DATE",
+    "option_type": "OPTION_TYPE",
+    "status": "STATUS",
+    "total_price": "TOTAL_PRICE",
+    "qty": "QTY",
+    "trades": "TRADES",
+}
+
+
+def refresh_premium_rollups(account):
+    """
+    Rebuild the premium rollups of the tickers with new or changed
+    transactions, or with active trades that have expired since. The trades of
+    each ticker are rebuilt from all its transactions in the ledger.
+    """
+    today = dt.now().strftime(DATE_FORMAT)
+    tickers, as_of = transaction_ledger.stale_tickers(account, today)
+    if not tickers:
+        return
+
+    df = pd.json_normalize(transaction_ledger.query(account, "TRADE", symbol=tickers))
+    rollups, valid_until = [], {}
+    if not df.empty:
+        rollups, valid_until = premium_rollups(prepare_transactions(df))
+
+    transaction_ledger.save_rollups(account, tickers, rollups, valid_until, as_of)
+
+
+def premium_rollups(df):
+    """
+    Aggregate the option trades built from the transactions
+
+    Args:
+        df (DataFrame): Transactions, as returned by prepare_transactions
+
+    Returns:
+        (rollups, valid_until):
+            rollups (list): dicts with ticker, close_date, option_type, status,
+                total_price, qty and trades
+            valid_until (dict): Earliest expiry date of the active trades per ticker
+    """
+    trades = []
+    for option_type in ("PUT", "CALL"):
+        df_trades = parse_option_response(df, option_type)
+        if not df_trades.empty:
+            trades.append(df_trades.assign(ROLLUP_OPTION_TYPE=option_type))
+    if not trades:
+        return [], {}
+    trades = pd.concat(trades)
+
+    # Rounded per trade like get_report, so the sums match the report
+    trades["TOTAL_PRICE"] = trades["TOTAL_PRICE"].round(2)
+    grouped = trades.groupby(
+        ["TICKER", "CLOSE_DATE", "ROLLUP_OPTION_TYPE", "STATUS"], as_index=False
+    ).agg(
+        total_price=("TOTAL_PRICE", "sum"),
+        qty=("QTY", "sum"),
+        trades=("SYMBOL", "size"),
+    )
+    grouped = grouped.rename(
+        columns={
+            "TICKER": "ticker",
+            "CLOSE_DATE": "close_date",
+            "ROLLUP_OPTION_TYPE": "option_type",
+            "STATUS": "status",
+        }
+    ).round(2)
+
+    active = trades[trades["STATUS"] == "Active"]
+    valid_until = active.groupby("TICKER")["EXPIRY_DATE"].min().to_dict()
+    return grouped.to_dict("records"), valid_until
+
+
 def parse_option_response(df, instrument_type):
     """
     [Parse Option Response coming from transactions API]
@@ -257,8 +432,13 @@ def handle_early_assignment(df_options, df_assigned):
     df_assigned = df_assigned.copy()
 
     # Add timestamp and sort for merge asof operation using closest timestamp
-    df_option_open["EXPIRY_DATE_TS"] = pd.to_datetime(df_option_open["EXPIRY_DATE"])
-    df_assigned["EXPIRY_DATE_TS"] = pd.to_datetime(df_assigned["EXPIRY_DATE"])
+    # Same resolution on both sides, an empty side would otherwise get another unit
+    df_option_open["EXPIRY_DATE_TS"] = pd.to_datetime(
+        df_option_open["EXPIRY_DATE"]
+    ).astype("datetime64[ns]")
+    df_assigned["EXPIRY_DATE_TS"] = pd.to_datetime(df_assigned["EXPIRY_DATE"]).astype(
+        "datetime64[ns]"
+    )
 
     df_option_open = df_option_open.sort_values(by=["EXPIRY_DATE_TS"])
     df_assigned = df_assigned.sort_values(by=["EXPIRY_DATE_TS"])
@@ -294,9 +474,9 @@ def get_assigned_stock(df, instruction):
     ]
     df_assigned_stocks.loc[:, "QTY"] = df_assigned_stocks.QTY / 100
     df_assigned_stocks.loc[:, "TICKER"] = df_assigned_stocks.SYMBOL
-    df_assigned_stocks.loc[:, "EXPIRY_DATE"] = df_assigned_stocks["DATE"].apply(
-        get_previous_bdate
-    )
+    df_assigned_stocks.loc[:, "EXPIRY_DATE"] = pd.DatetimeIndex(
+        previous_business_day(df_assigned_stocks["DATE"])
+    ).strftime(DATE_FORMAT)
 
     return df_assigned_stocks
 
@@ -311,136 +491,86 @@ def calculate_final_payoff(result_df):
         DataFrame:  DF with Total Price and Status for each trade
     """
 
-    result_df[["DATE", "CLOSE_DATE"]] = result_df.apply(
-        get_date, axis=1, result_type="expand"
-    )
+    result_df[["DATE", "CLOSE_DATE"]] = get_dates(result_df)
     result_df["PRICE"] = result_df["PRICE"].fillna(0)
     result_df["CLOSE_PRICE"] = result_df["PRICE_C"].fillna(0)
 
     # Handle assigned options by adding Close Price as Open price since profit = 0
-    result_df.CLOSE_PRICE = np.where(
-        (result_df.TRAN_TYPE == "OA"), result_df.PRICE, result_df.CLOSE_PRICE
-    )
+    assigned = result_df.TRAN_TYPE == "OA"
+    result_df.CLOSE_PRICE = np.where(assigned, result_df.PRICE, result_df.CLOSE_PRICE)
+
+    # Sum of opening and closing transaction, assigned options don't have any profit
+    result_df["TOTAL_PRICE"] = (
+        result_df["TOTAL_PRICE"].fillna(0) + result_df["TOTAL_PRICE_C"].fillna(0)
+    ).where(~assigned, 0)
 
-    result_df["TOTAL_PRICE"] = result_df.apply(get_net_total_price, axis=1)
-    result_df["STATUS"] = result_df.apply(get_transaction_status, axis=1)
+    result_df["STATUS"] = get_transaction_status(result_df)
     # Add Close Date if missing and Strike price by parsing option symbol string
-    result_df[["CLOSE_DATE", "STRIKE_PRICE"]] = result_df.apply(
-        parse_option_string, axis=1, result_type="expand"
-    )
+    result_df[["CLOSE_DATE", "STRIKE_PRICE"]] = parse_option_strings(result_df)
 
     return result_df
 
 
-def get_net_total_price(row):
-    """Calculate net price for each trade row
-
-    Args:
-        row ([df row]): [Single row of DF to whch the function is applied]
-
-    Returns:
-        [Net Total price]: [Sum of opening transcation and Closing transaction or 0 for assigned positions]
-    """
-    # Assigned option transaction don't have any profit
-    tran_type = row["TRAN_TYPE"]
-    if tran_type == "OA":
-        return 0
-
-    open_total = row["TOTAL_PRICE"]
-    close_total = row["TOTAL_PRICE_C"]
-    if pd.isna(open_total):
-        open_total = 0
-    if pd.isna(close_total):
-        close_total = 0
-
-    return open_total + close_total
-
-
-def get_transaction_status(row):
-    """Assign transcation status for each row
+def get_transaction_status(df):
+    """Assign transcation status for each trade
 
     Args:
-        row ([df row]): [Single row of DF to whch the function is applied]
+        df (DataFrame): Trades with PRICE, CLOSE_PRICE and EXPIRY_DATE
 
     Returns:
-        Trade Status:Assigned, Rolled, Expired or Active status
+        ndarray: Trade Status:Assigned, Closed, Expired or Active status
     """
-    if row.CLOSE_PRICE == row.PRICE:
-        return "Assigned"
-    elif row.CLOSE_PRICE > 0:
-        return "Closed"
-    elif row.CLOSE_PRICE == 0 and row.EXPIRY_DATE < dt.now().strftime(DATE_FORMAT):
-        return "Expired"
-    else:
-        return "Active"
+    today = dt.now().strftime(DATE_FORMAT)
+    conditions = [
+        df.CLOSE_PRICE == df.PRICE,
+        df.CLOSE_PRICE > 0,
+        (df.CLOSE_PRICE == 0) & (df.EXPIRY_DATE < today),
+    ]
+    return np.select(conditions, ["Assigned", "Closed", "Expired"], default="Active")
 
 
-def parse_option_string(row):
-    """Parse Option String to get expiration date and Strike price.
+def parse_option_strings(df):
+    """Parse Option Strings to get expiration date and Strike price.
     If closing transaction is not applicable, use Expiry date as the Close date for those Option trades
 
     Args:
-        row ([df row]): [Single row of DF to whch the function is applied]
+        df (DataFrame): Trades with SYMBOL, EXPIRY_DATE and CLOSE_DATE
 
     Returns:
-        [type]: [description]
+        DataFrame: CLOSE_DATE and STRIKE_PRICE, strike stays the string in the symbol
     """
-    # Initialize
-    strike_price = 0
-    expiration_date = row["EXPIRY_DATE"]
+    has_symbol = df["SYMBOL"].notna()
+    parsed = parse_option_symbols(df["SYMBOL"])
 
-    option_symbol = row["SYMBOL"]
-    close_date = row["CLOSE_DATE"]
-    if pd.notna(option_symbol):
-        expiration_date, strike_price = parse_option_symbol(option_symbol)
+    expiration_date = parsed["expiry"].dt.strftime(DATE_FORMAT)
+    expiration_date = expiration_date.where(has_symbol, df["EXPIRY_DATE"])
+    strike_price = parsed["strike_text"].astype(object).where(has_symbol, 0)
 
     # If transaction was not explicitly closed, close date is same as option expiry date
-    if pd.isna(close_date) and expiration_date:
-        close_date = expiration_date
-    return close_date, strike_price
+    close_date = df["CLOSE_DATE"].where(df["CLOSE_DATE"].notna(), expiration_date)
+    return pd.DataFrame({"CLOSE_DATE": close_date, "STRIKE_PRICE": strike_price})
 
 
-def get_date(row):
-    """Return dates for opening trade and Closing Trade for the Option Trade
+def get_dates(df):
+    """Return dates for opening trade and Closing Trade for the Option Trades
     If Open Trade date is not pulled in the search criteria, the corresponding close trade is displayed
     on its own as independent Open Trade so swap with Open date for such trades
 
     Args:
-        row ([df row]): [Single row of DF to whch the function is applied]
+        df (DataFrame): Trades with DATE, DATE_C and DATE_A
 
     Returns:
-        [type]: [description]
-    """
-
-    open_date = row["DATE"]
-    if pd.notna(row["DATE_C"]):
-        close_date = row["DATE_C"]
-    elif pd.notna(row["DATE_A"]):
-        close_date = row["DATE_A"]
-    else:
-        close_date = None
-
-    if pd.isna(open_date):
-        # Open date is before Search and transaction not pulled or other mismatch
-        # Only for closing transaction not matching
-        open_date = close_date
-        close_date = None
-    return open_date, close_date
-
-
-def get_previous_bdate(date):
-    """gets previous businessdate based on US trading calendar
-
-    Args:
-        date (_type_): _description_
-
-    Returns:
-        _type_: _description_
+        DataFrame: DATE and CLOSE_DATE
     """
-    previous_business_date = (
-        dt.strptime(date, "%Y-%m-%d") - CustomBusinessDay(1, calendar=cal)
-    ).strftime("%Y-%m-%d")
-    return previous_business_date
+    close_date = df["DATE_C"].where(df["DATE_C"].notna(), df["DATE_A"])
+    close_date = close_date.astype(object).where(close_date.notna(), None)
+
+    # Open date is before Search and transaction not pulled or other mismatch
+    # Only for closing transaction not matching
+    missing_open = df["DATE"].isna()
+    open_date = df["DATE"].astype(object).where(~missing_open, close_date)
+    close_date = close_date.where(~missing_open, None)
+    return pd.DataFrame({"DATE": open_date, "CLOSE_DATE": close_date})
 
 
 def parse_equity_response(df, instrument_type):
@@ -0,0 +1,290 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class BatchIndicators:
+    """
+    Bollinger Bands and RSI for many tickers at once.
+
+    Takes a wide close price matrix (dates x tickers) and computes every
+    indicator for all the tickers in one pass over the matrix, instead of one
+    pandas pipeline per ticker. Results match RsiBollingerBands: bands use the
+    sample standard deviation of a simple moving window and RSI uses the
+    adjusted exponential mean with com = rsi_period - 1. Tickers don't always
+    trade on the same dates, so each column is computed over its own closes
+    only and dates without a close are skipped, as in the per ticker pipeline.
+
+    Parameters:
+        close (DataFrame): Close prices, one column per ticker, sorted by date
+        params (dict): rsi_period, bb_period and bb_dev as in RsiBollingerBands
+
+    Attributes:
+        sma, upper, lower, rsi (DataFrame): Indicators, same shape as close
+    """
+
+    def __init__(self, close: pd.DataFrame, params: dict):
+        self.close = close
+        self.params = params
+
+        values = close.to_numpy(dtype=np.float64)
+        packed, order, missing = pack_columns(values)
+        sma, upper, lower = bollinger_bands(
+            packed, params["bb_period"], params["bb_dev"]
+        )
+        strength = rsi(packed, params["rsi_period"])
+        self.sma = self._frame(unpack_columns(sma, order, missing))
+        self.upper = self._frame(unpack_columns(upper, order, missing))
+        self.lower = self._frame(unpack_columns(lower, order, missing))
+        self.rsi = self._frame(unpack_columns(strength, order, missing))
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=self.close.index, columns=self.close.columns)
+
+    def signals(self) -> tuple:
+        """
+        Buy when close price is below lower band and sell when above upper band.
+
+        Returns:
+            (buy, sell) (DataFrame): Boolean masks, same shape as close
+        """
+        buy = self.close <= self.lower
+        sell = self.close >= self.upper
+        return buy, sell
+
+    def latest_signals(self, trade_type: str) -> pd.DataFrame:
+        """
+        Most recent buy or sell signal of each ticker.
+
+        Parameters:
+            trade_type (str): 'buy' or 'sell'
+
+        Returns:
+            DataFrame: Ticker, Date and Price (close on that date) of the tickers
+                with at least one signal, in column order
+        """
+        buy, sell = self.signals()
+        mask = (buy if trade_type == "buy" else sell).to_numpy()
+
+        has_signal = mask.any(axis=0)
+        # Row of the last True in each column
+        last = len(mask) - 1 - np.argmax(mask[::-1], axis=0)
+        columns = np.flatnonzero(has_signal)
+        rows = last[columns]
+
+        return pd.DataFrame(
+            {
+                "Ticker": self.close.columns[columns],
+                "Date": self.close.index[rows],
+                "Price": self.close.to_numpy()[rows, columns],
+            }
+        )
+
+
+def pack_columns(values: np.ndarray) -> tuple:
+    """
+    Moves the non NaN values of each column to the top, keeping their order,
+    so rolling windows and exponential means only see the column's own values.
+
+    Returns:
+        (packed, order, missing): Packed values, the row each packed value came
+            from, and the NaN mask of values, for unpack_columns
+    """
+    missing = np.isnan(values)
+    order = np.argsort(missing, axis=0, kind="stable")
+    return np.take_along_axis(values, order, axis=0), order, missing
+
+
+def unpack_columns(packed: np.ndarray, order: np.ndarray, missing: np.ndarray):
+    """Puts values computed on pack_columns output back on their original rows"""
+    values = np.empty(packed.shape)
+    np.put_along_axis(values, order, packed, axis=0)
+    values[missing] = np.nan
+    return values
+
+
+def bollinger_bands(close: np.ndarray, period: int, dev: float) -> tuple:
+    """
+    Simple moving average and bands of +/- dev sample standard deviations.
+
+    Parameters:
+        close (ndarray): Close prices, dates x tickers
+
+    Returns:
+        sma, upper, lower (ndarray): NaN until a full window is available
+    """
+    sma = np.full(close.shape, np.nan)
+    std = np.full(close.shape, np.nan)
+    if len(close) >= period:
+        windows = sliding_window_view(close, period, axis=0)
+        sma[period - 1 :] = windows.mean(axis=-1)
+        std[period - 1 :] = windows.std(axis=-1, ddof=1)
+    return sma, sma + dev * std, sma - dev * std
+
+
+def ewm_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Adjusted exponential mean with com = period - 1 down each column, same as
+    pandas ewm(com=period - 1, adjust=True, min_periods=period).mean().
+    Iterates over the dates only, every ticker is updated at once.
+    """
+    decay = 1 - 1 / period
+    valid = ~np.isnan(values)
+    observations = np.where(valid, values, 0.0)
+
+    out = np.full(values.shape, np.nan)
+    num = np.zeros(values.shape[1:])
+    den = np.zeros(values.shape[1:])
+    count = np.zeros(values.shape[1:])
+    for t in range(len(values)):
+        num = num * decay + observations[t]
+        den = den * decay + valid[t]
+        count += valid[t]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[t] = np.where(count >= period, num / den, np.nan)
+    return out
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Relative Strength Index of each column using exponential means of the
+    gains and losses.
+    """
+    delta = np.full(close.shape, np.nan)
+    delta[1:] = np.diff(close, axis=0)
+
+    up = np.clip(delta, 0, None)
+    down = -np.clip(delta, None, 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = ewm_mean(up, period) / ewm_mean(down, period)
+        return 100 - (100 / (1 + rs))
+
+
+class IncrementalIndicators:
+    """
+    Bollinger Bands and RSI of one ticker kept up to date one price at a time.
+
+    Holds running sums of the last bb_period - 1 closes and the exponential
+    gain/loss sums of the RSI, so a new live price updates every indicator in
+    constant time instead of recomputing the windows. The price of the bar in
+    progress is provisional: update() can be called on every tick and the bar
+    is only folded into the running state when a price for a new date arrives
+    (or roll() is called). Values match BatchIndicators on the same closes.
+
+    Parameters:
+        close (array): Closes of the completed bars, oldest first
+        params (dict): rsi_period, bb_period and bb_dev as in RsiBollingerBands
+        date (str): Date of the last completed bar
+    """
+
+    def __init__(self, close, params: dict, date: str = None):
+        self.bb_period = params["bb_period"]
+        self.bb_dev = params["bb_dev"]
+        self.rsi_period = params["rsi_period"]
+        self.decay = 1 - 1 / self.rsi_period
+
+        # Completed bars in the current bands window, the bar in progress makes it whole
+        self.window = deque(maxlen=self.bb_period - 1)
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+        # Exponential sums of gains and losses, and number of price changes seen
+        self.up = 0.0
+        self.down = 0.0
+        self.changes = 0
+        self.last_close = None
+
+        self.date = date
+        self.price = None
+        self.bar_date = None
+
+        for value in close:
+            self._add_close(float(value))
+
+    def update(self, price: float, date: str = None) -> dict:
+        """
+        Applies a live price to the bar in progress.
+
+        Parameters:
+            price (float): Latest price
+            date (str): Date of the price, completes the previous bar when it changes
+
+        Returns:
+            dict: price, sma, upper, lower, rsi, buy and sell for the bar in progress
+        """
+        if (
+            date is not None
+            and self.price is not None
+            and self.bar_date is not None
+            and date != self.bar_date
+        ):
+            self.roll()
+        self.price = float(price)
+        self.bar_date = date
+        return self.values()
+
+    def roll(self):
+        """Completes the bar in progress with its last price."""
+        if self.price is None:
+            return
+        self._add_close(self.price)
+        self.date = self.bar_date
+        self.price = None
+        self.bar_date = None
+
+    def values(self) -> dict:
+        """Indicators with the bar in progress as the latest close."""
+        price = self.price
+        result = {
+            "price": price,
+            "sma": np.nan,
+            "upper": np.nan,
+            "lower": np.nan,
+            "rsi": np.nan,
+            "buy": False,
+            "sell": False,
+        }
+        if price is None:
+            return result
+
+        if len(self.window) == self.bb_period - 1:
+            n = self.bb_period
+            sma = (self.sum + price) / n
+            variance = (self.sum_sq + price * price - n * sma * sma) / (n - 1)
+            std = math.sqrt(max(variance, 0.0))
+            result["sma"] = sma
+            result["upper"] = sma + self.bb_dev * std
+            result["lower"] = sma - self.bb_dev * std
+            result["buy"] = bool(price <= result["lower"])
+            result["sell"] = bool(price >= result["upper"])
+
+        if self.last_close is not None and self.changes + 1 >= self.rsi_period:
+            up, down = self._rsi_sums(price)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result["rsi"] = float(100 - 100 / (1 + np.float64(up) / down))
+        return result
+
+    def _rsi_sums(self, price):
+        delta = price - self.last_close
+        up = self.up * self.decay + max(delta, 0.0)
+        down = self.down * self.decay + max(-delta, 0.0)
+        return up, down
+
+    def _add_close(self, value):
+        if len(self.window) == self.window.maxlen:
+            oldest = self.window[0]
+            self.sum -= oldest
+            self.sum_sq -= oldest * oldest
+        if self.window.maxlen:
+            self.window.append(value)
+            self.sum += value
+            self.sum_sq += value * value
+
+        if self.last_close is not None:
+            self.up, self.down = self._rsi_sums(value)
+            self.changes += 1
+        self.last_close = value
@@ -18,9 +18,11 @@ def get_ticker_details(ticker: str):
     startDate = dt.now() + timedelta(days=params["min_expiration_days"])
     endDate = dt.now() + timedelta(days=params["max_expiration_days"])
     options = Options()
+    # Same request as the income screener so a chain just screened is served from cache
     option_chain_req = OptionChain(
         symbol=ticker,
         strategy=params["strategy"],
+        contractType=params["contractType"],
         fromDate=startDate,
         toDate=endDate,
         range=params["range"],
@@ -1,15 +1,15 @@
-import multiprocessing
+import asyncio
+import logging
 from datetime import datetime as dt
 from datetime import timedelta
 
+import numpy as np
 import pandas as pd
-from joblib import Parallel, delayed
 
-from broker.option import Option
+from broker.async_base import AsyncBase
 from broker.option_chain import OptionChain
-from broker.options import Options
+from broker.options import Options, option_chain_to_df
 from utils.enums import PUT_CALL
-from utils.functions import formatter_currency_with_cents, formatter_percent
 
 # Mapping column for UI display
 TABLE_MAPPING = {
@@ -27,13 +27,53 @@ TABLE_MAPPING = {
     "open_interest": "OPEN INT",
     "volume": "VOLUME",
     "percentage_otm": "OTM",
+    "bid": "BID",
+    "ask": "ASK",
 }
 
+# Columns returned by the screener, in display order
+COLUMNS = [
+    "symbol",
+    "underlying",
+    "mark",
+    "strike_price",
+    "type",
+    "days_to_expiration",
+    "returns",
+    "breakeven",
+    "stock_price",
+    "delta",
+    "volatility",
+    "percentage_otm",
+    "expiration",
+    "bid",
+    "ask",
+    "open_interest",
+    "volume",
+]
+
 
 def income_finder(ticker: str, **kwargs) -> pd.DataFrame:
     """
     Get option chain for a given ticker
     """
+    params = screener_params(**kwargs)
+
+    if not ticker:
+        raise ValueError(" Ticker must be provided")
+
+    options = Options()
+    option_chain_req = option_chain_request(ticker, params)
+
+    # API call
+    res = options.get_options_chain(option_chain=option_chain_req)
+    return parse_option_chain(ticker, res, params)
+
+
+def screener_params(**kwargs) -> dict:
+    """
+    Screener defaults overridden by the values passed from the UI
+    """
 
     # define the parameters that we will take when a new object is initalized.
     params = {
@@ -48,6 +88,10 @@ def income_finder(ticker: str, **kwargs) -> pd.DataFrame:
         "tran_type": "SINGLE",
         "interval": 1,
         "range": "OTM",
+        "min_open_interest": 0,
+        "min_volume": 0,
+        "max_spread": None,
+        "top_k": None,
     }
 
     for key in kwargs:
@@ -57,17 +101,20 @@ def income_finder(ticker: str, **kwargs) -> pd.DataFrame:
 
     params.update(kwargs.items())
 
-    if not ticker:
-        raise ValueError(" Ticker must be provided")
-
     if not params["contractType"]:
         raise ValueError(" Contract Type of either PUT or CALL should be provided")
 
+    return params
+
+
+def option_chain_request(ticker: str, params: dict) -> OptionChain:
+    """
+    Option chain request for the expiration window in the screener params
+    """
     startDate = dt.now() + timedelta(days=params["min_expiration_days"])
     endDate = dt.now() + timedelta(days=params["max_expiration_days"])
 
-    options = Options()
-    option_chain_req = OptionChain(
+    return OptionChain(
         symbol=ticker,
         strategy="SINGLE",
         contractType=params["contractType"],
@@ -76,165 +123,256 @@ def income_finder(ticker: str, **kwargs) -> pd.DataFrame:
         range=params["range"],
     )
 
-    # API call
-    res = options.get_options_chain(option_chain=option_chain_req)
 
-    # Current Stock Price
-    current_stock_price = res["underlyingPrice"]
+def parse_option_chain(
+    ticker: str, res: dict, params: dict, strike_filter: "StrikeFilter" = None
+) -> pd.DataFrame:
+    """
+    Parse the option chain response and keep the strikes passing the screener filters.
+    Columns stay numeric, returns and percentage_otm are in percent points.
+
+    Args:
+        ticker (str): Ticker of the chain
+        res (dict): Option chain response
+        params (dict): Screener params
+        strike_filter (StrikeFilter): Filter compiled from params, built if None
+    """
+    if strike_filter is None:
+        strike_filter = StrikeFilter(params)
 
-    # Use Put or Call key to parse JSON response
-    if params["contractType"] == PUT_CALL.PUT.value:
-        mapKey = "putExpDateMap"
-    elif params["contractType"] == PUT_CALL.CALL.value:
-        mapKey = "callExpDateMap"
-
-    # Get expiration periods
-    expiration_weeks = res[mapKey].items()
-
-    # Parse the Put response. TD option chain JSON is nested
-    option_chain = []
-
-    # Iterate all the expiration weeks
-    for expiration_week in expiration_weeks:
-        # Details for a given week's strikes
-        strikes = expiration_week[1].items()
-        for strike in strikes:
-            strike_price = strike[0]  # Get the strike price
-            # Get the option chain detail for that strike price
-            # avaialble as first element of tuple object
-            strike_detail = (strike[1])[0]
-
-            option = populate_option(
-                ticker, params, current_stock_price, expiration_week, strike_detail
-            )
-
-            # Append to the list if pass the filter criteria
-            if filter_strikes(option, params):
-                option_chain.append(option)
-    df = pd.DataFrame([vars(s) for s in option_chain])
-    return df
-
-
-def populate_option(
-    ticker, params, current_stock_price, expiration_week, strike_detail
-):
-    option = Option()
-    option.symbol = strike_detail["symbol"]
-    option.underlying = ticker
-    option.mark = float(strike_detail["mark"])
-    option.strike_price = float(strike_detail["strikePrice"])
-    option.type = strike_detail["putCall"]
-    option.days_to_expiration = strike_detail["daysToExpiration"]
-    option.returns = formatter_percent(
-        365
-        * option.mark
-        / ((option.strike_price - option.mark) * option.days_to_expiration)
-    )
+    df = option_chain_to_df(res, params["contractType"])
+    df["underlying"] = ticker
 
     # breakeven logic
     if params["contractType"] == PUT_CALL.PUT.value:
-        option.breakeven = option.strike_price - option.mark
+        df["breakeven"] = df["strike_price"] - df["mark"]
     elif params["contractType"] == PUT_CALL.CALL.value:
-        option.breakeven = option.strike_price + option.mark
+        df["breakeven"] = df["strike_price"] + df["mark"]
 
-    option.stock_price = float(current_stock_price)
-    option.delta = strike_detail["delta"]
-    option.volatility = strike_detail["volatility"]
-    option.percentage_otm = formatter_percent(
-        (option.stock_price - option.strike_price) / option.stock_price
+    returns = (
+        365
+        * df["mark"]
+        / ((df["strike_price"] - df["mark"]) * df["days_to_expiration"])
     )
-    return option
+    percentage_otm = (df["stock_price"] - df["strike_price"]) / df["stock_price"]
 
+    # Keep the strikes passing the filter criteria
+    mask = strike_filter.mask(df)
+    df = df[mask].copy()
+    df["returns"] = 100 * returns[mask]
+    df["percentage_otm"] = 100 * percentage_otm[mask]
+    return top_returns(df[COLUMNS], params.get("top_k"))
 
-def filter_strikes(option: Option, params) -> bool:
-    """
-    Filter out strikes not matching filter criteria in screener
+
+def top_returns(df: pd.DataFrame, k: int = None) -> pd.DataFrame:
     """
+    Keep the k rows with the highest returns, in no particular order.
+    Uses a partial sort, so the cost is linear in the number of rows.
 
-    desired_premium = float(params["premium"])
-    desired_moneyness = float(params["moneyness"])
-    desired_min_delta = float(params["min_delta"])
-    desired_max_delta = float(params["max_delta"])
+    Args:
+        df (pd.DataFrame): Screener results with a numeric returns column
+        k (int): Rows to keep, None keeps everything
+    """
+    if not k or len(df) <= k:
+        return df
+    returns = df["returns"].to_numpy()
+    # NaN returns sort last
+    keys = np.where(np.isnan(returns), -np.inf, returns)
+    top = np.argpartition(-keys, k - 1)[:k]
+    return df.iloc[np.sort(top)]
 
-    def moneyness_flag():
-        return (
-            (option.type == PUT_CALL.PUT.value)
-            and (
-                option.strike_price
-                <= (1 - desired_moneyness / 100) * option.stock_price
-            )
-            or (
-                (option.type == PUT_CALL.CALL.value)
-                and (
-                    option.strike_price
-                    >= (1 + desired_moneyness / 100) * option.stock_price
-                )
-            )
-        )
 
-    def premium_flag():
-        return option.mark > desired_premium * option.stock_price / 100
+class StrikeFilter:
+    """
+    Screener filters compiled once and applied as boolean masks over a columnar chain.
+
+    The same instance can be reused for every ticker of a watchlist scan.
+
+    Parameters:
+        params (dict): Screener params
+            premium (float): Minimum mark as % of the stock price
+            moneyness (float): Minimum % out of the money
+            min_delta, max_delta (float): Delta window, positive for puts too
+            min_expiration_days, max_expiration_days (int): Days to expiration window
+            min_open_interest (int): Minimum open interest
+            min_volume (int): Minimum volume traded today
+            max_spread (float): Maximum bid/ask spread as % of the mark, None to skip
+    """
 
-    def delta_flag():
+    def __init__(self, params: dict):
+        self.premium = float(params["premium"])
+        self.moneyness = float(params["moneyness"]) / 100
+        self.min_delta = float(params["min_delta"])
+        self.max_delta = float(params["max_delta"])
+        self.min_days = int(params["min_expiration_days"])
+        self.max_days = int(params["max_expiration_days"])
+        self.min_open_interest = int(params.get("min_open_interest") or 0)
+        self.min_volume = int(params.get("min_volume") or 0)
+        max_spread = params.get("max_spread")
+        self.max_spread = float(max_spread) / 100 if max_spread else None
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
         """
-        Since UI is taking positive deltas, need to convert to negative deltas for puts
+        Boolean mask of the strikes matching the filter criteria. Rows with
+        missing values (e.g. NaN delta) never match.
         """
-
-        return (
-            (option.type == PUT_CALL.PUT.value)
-            and (-desired_min_delta > option.delta > -desired_max_delta)
-            or (
-                (option.type == PUT_CALL.CALL.value)
-                and (desired_min_delta < option.delta < desired_max_delta)
-            )
+        option_type = df["type"].to_numpy()
+        strike = df["strike_price"].to_numpy()
+        stock = df["stock_price"].to_numpy()
+        mark = df["mark"].to_numpy()
+        delta = df["delta"].to_numpy()
+        days = df["days_to_expiration"].to_numpy()
+
+        is_put = option_type == PUT_CALL.PUT.value
+        is_call = option_type == PUT_CALL.CALL.value
+
+        moneyness = (is_put & (strike <= (1 - self.moneyness) * stock)) | (
+            is_call & (strike >= (1 + self.moneyness) * stock)
         )
+        premium = mark > self.premium * stock / 100
 
-    try:
-        if premium_flag() and moneyness_flag() and delta_flag():
-            return True
-        else:
-            return False
-    except:
-        return False
+        # Since UI is taking positive deltas, need to convert to negative deltas for puts
+        delta_window = (
+            is_put & (-self.min_delta > delta) & (delta > -self.max_delta)
+        ) | (is_call & (self.min_delta < delta) & (delta < self.max_delta))
+
+        expiration = (days >= self.min_days) & (days <= self.max_days)
+
+        mask = moneyness & premium & delta_window & expiration
+        if self.min_open_interest:
+            mask &= df["open_interest"].to_numpy() >= self.min_open_interest
+        if self.min_volume:
+            mask &= df["volume"].to_numpy() >= self.min_volume
+        if self.max_spread is not None:
+            spread = df["ask"].to_numpy() - df["bid"].to_numpy()
+            mask &= spread <= self.max_spread * mark
+        return mask
 
 
 def watchlist_income(watch_list: list, params: dict) -> pd.DataFrame:
     """Invoke the Options API in parallel for requested stocks and filter parameters
 
     Args:
-        watch_list (list): _description_
-        params (dict): _description_
+        watch_list (list): Tickers to scan
+        params (dict): Screener params, top_k limits the results to the best
+            returns across the whole watch list
 
     Returns:
-        pd.DataFrame: _description_
+        pd.DataFrame: Numeric screener results sorted by returns, formatting is left to the view
     """
-    df = pd.DataFrame()
+    frames = []
+    for _, frames in watchlist_income_progress(watch_list, params):
+        pass
 
-    # Get Option chain for watch list
-    # Parallel mode for API calls
-    num_workers = min(len(watch_list), multiprocessing.cpu_count())
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(by=["RETURNS"], ascending=False, ignore_index=True)
 
-    results = Parallel(n_jobs=num_workers)(
-        delayed(income_finder)(i, **params) for i in watch_list
-    )
 
-    #  Aggregate the results
-    for result in results:
-        df = pd.concat([df, result], ignore_index=True)
-
-    if not df.empty:
-        df = df.sort_values(by=["returns"], ascending=False)
-        df["strike_price"] = df["strike_price"].apply(formatter_currency_with_cents)
-        df["stock_price"] = df["stock_price"].apply(formatter_currency_with_cents)
-        df["mark"] = df["mark"].apply(formatter_currency_with_cents)
-        df["breakeven"] = df["breakeven"].apply(formatter_currency_with_cents)
-
-        df = df.drop(
-            [
-                "type",
-            ],
-            axis=1,
-        )
+def watchlist_income_progress(watch_list: list, params: dict):
+    """Yield the screener results gathered so far each time a ticker completes
+
+    Results are kept as a list of frames, one per ticker, so nothing is copied
+    until the caller concatenates them. With top_k, the list is trimmed to the
+    best top_k rows after each ticker, so it never holds more than top_k rows
+    plus the rows of one ticker.
 
-        df = df.rename(columns=TABLE_MAPPING)
-    return df
+    Args:
+        watch_list (list): Tickers to scan
+        params (dict): Screener params
+
+    Yields:
+        (df, frames):
+            df (pd.DataFrame): Results of the ticker just completed, so callers
+                can append them without going over the earlier ones again
+            frames (list): Frames of the results so far, renamed for display
+    """
+    top_k = params.get("top_k")
+    frames = []
+    for result in watchlist_income_stream(watch_list, params):
+        frames.append(result)
+        if top_k and sum(len(frame) for frame in frames) > top_k:
+            df = pd.concat(frames, ignore_index=True)
+            frames = [df.nlargest(top_k, "RETURNS")]
+        yield result, frames
+
+
+def watchlist_income_stream(watch_list: list, params: dict):
+    """Yield the screener results of each ticker as soon as its option chain arrives
+
+    Synchronous wrapper over stream_income, for callers without an event loop
+    such as Dash callbacks.
+
+    Args:
+        watch_list (list): Tickers to scan
+        params (dict): Screener params
+
+    Yields:
+        pd.DataFrame: Results of one ticker, renamed for display
+    """
+    loop = asyncio.new_event_loop()
+    stream = stream_income(watch_list, params)
+    try:
+        while True:
+            try:
+                df = loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            yield display_frame(df)
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
+
+
+async def stream_income(watch_list: list, params: dict):
+    """Fetch the option chains concurrently and yield each ticker's filtered strikes
+    in completion order, so the fastest ticker is available first
+
+    Args:
+        watch_list (list): Tickers to scan
+        params (dict): Screener params
+
+    Yields:
+        pd.DataFrame: Strikes of one ticker passing the filters, tickers without
+            any are skipped
+    """
+    params = screener_params(**params)
+    strike_filter = StrikeFilter(params)
+
+    async with AsyncBase() as client:
+
+        async def fetch(ticker):
+            try:
+                request = option_chain_request(ticker, params)
+                return ticker, await client.get_options_chain(option_chain=request)
+            except Exception as e:
+                return ticker, e
+
+        tasks = [asyncio.ensure_future(fetch(ticker)) for ticker in watch_list]
+        try:
+            for task in asyncio.as_completed(tasks):
+                ticker, res = await task
+                if isinstance(res, Exception):
+                    logging.error(
+                        f"Error fetching option chain for {ticker}: {str(res)}"
+                    )
+                    continue
+                df = parse_option_chain(ticker, res, params, strike_filter)
+                if not df.empty:
+                    yield df
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort the screener results by returns and rename the columns for display"""
+    df = df.sort_values(by=["returns"], ascending=False, ignore_index=True)
+    df = df.drop(
+        [
+            "type",
+        ],
+        axis=1,
+    )
+    return df.rename(columns=TABLE_MAPPING)
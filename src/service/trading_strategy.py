@@ -7,7 +7,15 @@ import pandas as pd
 from joblib import Parallel, delayed
 
 from broker.history import History
-from broker.quotes import Quotes
+from broker.quote_cache import quote_cache
+from service.indicators import (
+    BatchIndicators,
+    IncrementalIndicators,
+    bollinger_bands,
+    pack_columns,
+    rsi,
+    unpack_columns,
+)
 from utils.constants import screener_list
 from utils.functions import date_from_milliseconds
 
@@ -44,11 +52,15 @@ class RsiBollingerBands:
         self.ticker = ticker
         self.params = self.DEFAULT_PARAMS.copy()
 
-    def analyze_ticker(self) -> tuple:
+    def analyze_ticker(self, data: pd.DataFrame = None, quote: dict = None) -> tuple:
         """
         Generates historical data, calculates indicators, identifies signals,
          and returns DataFrames for charting.
 
+         Parameters:
+             data (DataFrame): Historical prices already fetched, fetched from API if None
+             quote (dict): Quote for the ticker already fetched, fetched from API if None
+
          Returns:
              (df, buy, sell, price):
                  df (DataFrame): Contains close price, bands, RSI, SMA
@@ -56,29 +68,38 @@ class RsiBollingerBands:
                  sell (DataFrame): Sell signals
                  price (float): Current price
         """
-        now = datetime.now()
-        start = now - timedelta(days=self.params["chart_period"])
-        data = self.get_historical_prices(start, now)
+        if data is None:
+            start, now = self.get_history_window()
+            data = self.get_historical_prices(start, now)
 
         if data.empty:
             raise SystemError(
                 f"Historical Prices not available for ticker: {self.ticker}"
             )
 
-        df, current_price = self.prepare_dataframe(data)
+        df, current_price = self.prepare_dataframe(data, quote)
         # Buy when close price is below lower band and sell when above upper band
         buy = df[df["close"] <= df["lower"]]
         sell = df[df["close"] >= df["upper"]]
 
         return df, buy, sell, current_price
 
-    def prepare_dataframe(self, data: pd.DataFrame) -> pd.DataFrame:
+    def get_history_window(self) -> tuple:
+        """
+        Start and end of the historical prices needed for the chart period.
+        """
+        now = datetime.now()
+        start = now - timedelta(days=self.params["chart_period"])
+        return start, now
+
+    def prepare_dataframe(self, data: pd.DataFrame, quote: dict = None) -> pd.DataFrame:
         """
         This method appends the current price to the historical close prices, calculates Bollinger Bands, RSI, and SMA,
         and drops initial rows (less than bb_period) where Bollinger Bands are not populated.
 
         Parameters:
             data (pd.DataFrame): The historical price data as a DataFrame.
+            quote (dict): Quote for the ticker, fetched from API if None
 
         Returns:
             Tuple[pd.DataFrame, float]: A tuple containing the prepared DataFrame and the current price.
@@ -93,7 +114,10 @@ class RsiBollingerBands:
         """
         df = data[["close"]].copy()
         # Append current price to historical close prices to include today's price
-        current_price, date = self.get_current_price()
+        if quote is None:
+            current_price, date = self.get_current_price()
+        else:
+            current_price, date = self.parse_quote(quote)
         index = date
         df.loc[index] = current_price
         sma, upper_band, lower_band = self.get_bollinger_bands(df)
@@ -203,23 +227,33 @@ class RsiBollingerBands:
 
         stock = self.ticker
         try:
-            c = Quotes()
-            r = c.get_quotes(stock)
-            price = r[stock]["lastPrice"]
-            date = date_from_milliseconds(r[stock]["quoteTimeInLong"])
-            return price, date
+            r = quote_cache.get_quotes([stock])
+            return self.parse_quote(r[stock])
         except Exception as e:
             logging.error(f"Error fetching current price for {stock}: {str(e)}")
             return None, None
 
+    @staticmethod
+    def parse_quote(quote: dict) -> tuple:
+        """
+        Last price and its date from a quote returned by the Quotes API.
+        """
+        price = quote["lastPrice"]
+        date = date_from_milliseconds(quote["quoteTimeInLong"])
+        return price, date
 
-def get_trade_signal(ticker: str, trade_type: str):
+
+def get_trade_signal(
+    ticker: str, trade_type: str, data: pd.DataFrame = None, quote: dict = None
+):
     """
     Generates a trading signal for a given ticker and trade type (buy or sell) using the RsiBollingerBands strategy.
 
     Parameters:
         ticker (str): The stock symbol to generate a signal for.
         trade_type (str): The type of trade signal to generate, either 'buy' or 'sell'.
+        data (DataFrame): Historical prices already fetched, fetched from API if None
+        quote (dict): Quote for the ticker already fetched, fetched from API if None
 
     Returns:
         tuple or None: A tuple containing the following information if a signal is generated:
@@ -231,7 +265,7 @@ def get_trade_signal(ticker: str, trade_type: str):
     """
     strategy = RsiBollingerBands(ticker)
     try:
-        _, buy, sell, current_price = strategy.analyze_ticker()
+        _, buy, sell, current_price = strategy.analyze_ticker(data, quote)
         trade_type = buy if trade_type == "buy" else sell
         latest_trade = trade_type.tail(1)
 
@@ -277,24 +311,395 @@ def analyze_watchlist(ticker_list: str, trade_type: str) -> pd.DataFrame:
     tickers = screener_list.get(ticker_list)
     df = pd.DataFrame()
     try:
-        num_workers = min(len(tickers), multiprocessing.cpu_count())
+        start, end = RsiBollingerBands(None).get_history_window()
+        history = get_watchlist_closes(tickers, start, end)
+        quotes = get_watchlist_quotes(list(history.columns))
 
-        results = Parallel(n_jobs=num_workers)(
-            delayed(get_trade_signal)(i, trade_type) for i in tickers
-        )
-        #  Aggregate the results
-        for result in results:
-            if result:
-                ticker_row = {
-                    "Ticker": result[0],
-                    "Date": result[1],
-                    "Price": result[2],
-                    "Current_Price": result[3],
-                }
-                df2 = pd.DataFrame([ticker_row])
-                df = pd.concat([df, df2], ignore_index=True)
-                df["Buy"] = np.where(df["Price"] > df["Current_Price"], True, False)
+        close, current_prices = close_matrix(history, quotes)
+        if close.empty:
+            return df
+
+        # Indicators and signals for the whole watchlist in one pass
+        indicators = BatchIndicators(close, RsiBollingerBands.DEFAULT_PARAMS)
+        df = indicators.latest_signals(trade_type)
+        if not df.empty:
+            df["Current_Price"] = df["Ticker"].map(current_prices)
+            df["Buy"] = np.where(df["Price"] > df["Current_Price"], True, False)
         return df
     except Exception as e:
-        logging.error(f"Error running Parallel: {str(e)}")
+        logging.error(f"Error analyzing watchlist: {str(e)}")
         return None
+
+
+def close_matrix(history: pd.DataFrame, quotes: dict) -> tuple:
+    """
+    Wide close price matrix of the watchlist with today's price appended,
+    as RsiBollingerBands.prepare_dataframe does for a single ticker.
+
+    Parameters:
+        history (DataFrame): Historical closes, dates x tickers
+        quotes (dict): Quotes keyed by ticker, fetched from API when missing
+
+    Returns:
+        (close, current_prices):
+            close (DataFrame): Close prices, dates x tickers
+            current_prices (dict): Current price keyed by ticker
+    """
+    close = history.copy()
+    current_prices = {}
+    for ticker in history.columns:
+        strategy = RsiBollingerBands(ticker)
+        quote = quotes.get(ticker)
+        if quote is None:
+            price, date = strategy.get_current_price()
+        else:
+            price, date = strategy.parse_quote(quote)
+        if price is None:
+            close = close.drop(columns=ticker)
+            continue
+
+        close.loc[date, ticker] = price
+        current_prices[ticker] = price
+
+    return close.sort_index(), current_prices
+
+
+def get_watchlist_closes(
+    tickers: list, start: datetime, end: datetime, periodType: str = "month"
+) -> pd.DataFrame:
+    """
+    Daily closes of the tickers fetched in bulk, dates x tickers. Dates are
+    formatted like candles_to_df so the quote of the day lines up.
+    """
+    history = History().get_price_history_bulk(
+        tickers,
+        startDate=start,
+        endDate=end,
+        periodType=periodType,
+        frequencyType="daily",
+        frequency=1,
+        needExtendedHoursData=False,
+        wide=True,
+    )
+    history.index = history.index.strftime("%Y-%m-%d")
+    return history
+
+
+def get_watchlist_quotes(tickers: list) -> dict:
+    """Quotes of the tickers in one request, empty if the request fails."""
+    if not tickers:
+        return {}
+    try:
+        return quote_cache.get_quotes(tickers)
+    except Exception as e:
+        logging.error(f"Error fetching quotes for watchlist: {str(e)}")
+        return {}
+
+
+class LiveSignals:
+    """
+    Bollinger Band signals of a watchlist refreshed from live prices.
+
+    Seeds an IncrementalIndicators per ticker from the daily history once, then
+    each price from a Quotes poll or the level one stream updates the ticker's
+    bands and RSI in constant time, so the whole watchlist can be refreshed
+    every few seconds.
+
+    EXAMPLE:
+
+    live = LiveSignals(screener_list.get("option_stocks"))
+    live.poll()
+    streamer.add_handler(service="QUOTE", handler=live.on_stream_quote)
+
+    Parameters:
+        tickers (list): The stock symbols to follow
+        params (dict): Strategy params, RsiBollingerBands.DEFAULT_PARAMS if None
+    """
+
+    def __init__(self, tickers: list, params: dict = None):
+        self.tickers = list(tickers)
+        self.params = params or RsiBollingerBands.DEFAULT_PARAMS.copy()
+        self.indicators = {}
+        self.latest = {}
+
+        start, end = RsiBollingerBands(None).get_history_window()
+        history = get_watchlist_closes(self.tickers, start, end)
+        quotes = get_watchlist_quotes(list(history.columns))
+        for ticker in history.columns:
+            quote = quotes.get(ticker)
+            today = RsiBollingerBands.parse_quote(quote)[1] if quote else None
+            close = history[ticker].dropna()
+            # Today's candle is the bar in progress, it is fed by the live prices
+            if today is not None:
+                close = close[close.index < today]
+            self.indicators[ticker] = IncrementalIndicators(
+                close.to_numpy(),
+                self.params,
+                date=close.index[-1] if len(close) else None,
+            )
+            if quote:
+                self.on_quote(ticker, quote)
+
+    def on_price(self, ticker: str, price: float, date: str = None) -> dict:
+        """
+        Applies a live price to a ticker.
+
+        Returns:
+            dict: price, sma, upper, lower, rsi, buy and sell, None if the ticker isn't followed
+        """
+        indicators = self.indicators.get(ticker)
+        if indicators is None or price is None:
+            return None
+        self.latest[ticker] = indicators.update(price, date)
+        return self.latest[ticker]
+
+    def on_quote(self, ticker: str, quote: dict) -> dict:
+        """Applies a quote returned by the Quotes API."""
+        price, date = RsiBollingerBands.parse_quote(quote)
+        return self.on_price(ticker, price, date)
+
+    def on_stream_quote(self, symbol: str, fields: dict):
+        """Handler for TDStreamerClient level one quotes."""
+        price = fields.get("last-price")
+        if price is not None:
+            self.on_price(symbol, float(price), datetime.now().strftime("%Y-%m-%d"))
+
+    def poll(self) -> pd.DataFrame:
+        """Fetches quotes for the watchlist in one request and refreshes the signals."""
+        quotes = quote_cache.get_quotes(list(self.indicators), max_age=0)
+        for ticker, quote in quotes.items():
+            self.on_quote(ticker, quote)
+        return self.signals()
+
+    def signals(self) -> pd.DataFrame:
+        """Latest indicators and buy/sell flags, one row per ticker."""
+        return pd.DataFrame.from_dict(self.latest, orient="index")
+
+
+class Backtest:
+    """
+    Vectorized backtest of the RsiBollingerBands strategy over a grid of params.
+
+    Goes long at the close when the close is at or below the lower band and the
+    RSI at or below oversold, and exits at the close when the close is at or
+    above the upper band and the RSI at or above overbought. Set oversold to 100
+    and overbought to 0 to trade on the bands alone, like the charts.
+
+    Indicators are computed once per bb_period and rsi_period, and every
+    bb_dev x oversold x overbought combination is evaluated for all the tickers
+    of a block in one broadcast array pass. Tickers are split in blocks to bound
+    memory, and blocks can be spread over worker processes.
+
+    EXAMPLE:
+
+    backtest = Backtest(close, {"bb_dev": [1.5, 2, 2.5], "oversold": [30, 100]})
+    results = backtest.run()
+    backtest.summary(results)
+
+    Parameters:
+        close (DataFrame): Daily close prices, dates x tickers
+        grid (dict): Values to try per param, missing params use DEFAULT_PARAMS
+        n_jobs (int): Worker processes for the ticker blocks, None runs in process
+
+    Attributes:
+        block_size (int): Array elements evaluated at once, per ticker block
+    """
+
+    PARAMS = ["bb_period", "rsi_period", "bb_dev", "oversold", "overbought"]
+    METRICS = ["total_return", "max_drawdown", "trades", "hit_rate", "exposure"]
+
+    block_size = 2_000_000
+
+    def __init__(self, close: pd.DataFrame, grid: dict = None, n_jobs: int = None):
+        self.close = close.sort_index()
+        self.grid = {
+            param: list(np.atleast_1d((grid or {}).get(param, default)))
+            for param, default in RsiBollingerBands.DEFAULT_PARAMS.items()
+            if param in self.PARAMS
+        }
+        self.n_jobs = n_jobs
+
+    def run(self) -> pd.DataFrame:
+        """
+        Backtests every combination of params on every ticker.
+
+        Returns:
+            DataFrame: One row per ticker and params, with
+                total_return (float): Compounded return of the strategy
+                max_drawdown (float): Largest peak to trough loss of the equity
+                trades (int): Completed round trips
+                hit_rate (float): Share of completed trades with a gain, NaN if none
+                exposure (float): Share of days holding a position
+        """
+        values = self.close.to_numpy(dtype=np.float64)
+        tickers = np.asarray(self.close.columns)
+
+        combinations = (
+            len(self.grid["bb_dev"])
+            * len(self.grid["oversold"])
+            * len(self.grid["overbought"])
+        )
+        per_ticker = max(combinations * len(values), 1)
+        step = max(self.block_size // per_ticker, 1)
+        blocks = [
+            slice(start, start + step) for start in range(0, values.shape[1], step)
+        ]
+
+        if self.n_jobs and len(blocks) > 1:
+            num_workers = min(len(blocks), self.n_jobs, multiprocessing.cpu_count())
+            results = Parallel(n_jobs=num_workers)(
+                delayed(backtest_block)(values[:, block], self.grid) for block in blocks
+            )
+        else:
+            results = [backtest_block(values[:, block], self.grid) for block in blocks]
+
+        frames = []
+        for block, result in zip(blocks, results):
+            result.insert(0, "ticker", tickers[block][result.pop("column")])
+            frames.append(result)
+        if not frames:
+            return pd.DataFrame(columns=["ticker"] + self.PARAMS + self.METRICS)
+        return pd.concat(frames, ignore_index=True)
+
+    def summary(self, results: pd.DataFrame) -> pd.DataFrame:
+        """Average metrics across tickers per combination of params, best returns first."""
+        return (
+            results.groupby(self.PARAMS)[self.METRICS]
+            .mean()
+            .sort_values(by="total_return", ascending=False)
+            .reset_index()
+        )
+
+
+def backtest_block(close: np.ndarray, grid: dict) -> pd.DataFrame:
+    """
+    Backtests a block of tickers for every combination of params in the grid.
+
+    Parameters:
+        close (ndarray): Close prices, dates x tickers
+        grid (dict): Values to try per param, see Backtest
+
+    Returns:
+        DataFrame: column (position of the ticker in the block), the params and
+            the metrics of Backtest.run
+    """
+    num_days, num_tickers = close.shape
+    returns = np.zeros(close.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = np.diff(np.log(close), axis=0)
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # Threshold params are broadcast as leading axes: dev x oversold x overbought x days x tickers
+    dev = np.asarray(grid["bb_dev"], dtype=np.float64)[:, None, None, None, None]
+    oversold = np.asarray(grid["oversold"], dtype=np.float64)[None, :, None, None, None]
+    overbought = np.asarray(grid["overbought"], dtype=np.float64)[
+        None, None, :, None, None
+    ]
+    thresholds = np.meshgrid(
+        grid["bb_dev"], grid["oversold"], grid["overbought"], indexing="ij"
+    )
+
+    # Indicators of each ticker skip the dates it has no close for
+    packed, order, missing = pack_columns(close)
+    strengths = {
+        period: unpack_columns(rsi(packed, period), order, missing)
+        for period in grid["rsi_period"]
+    }
+
+    frames = []
+    for bb_period in grid["bb_period"]:
+        sma, upper, _ = bollinger_bands(packed, bb_period, 1)
+        sma = unpack_columns(sma, order, missing)
+        std = unpack_columns(upper, order, missing) - sma
+        for rsi_period, strength in strengths.items():
+            with np.errstate(invalid="ignore"):
+                buy = (close <= sma - dev * std) & (strength <= oversold)
+                sell = (close >= sma + dev * std) & (strength >= overbought)
+            metrics = backtest_signals(*np.broadcast_arrays(buy, sell), returns)
+
+            frame = {
+                "column": np.broadcast_to(
+                    np.arange(num_tickers), metrics["trades"].shape
+                ).ravel(),
+                "bb_period": bb_period,
+                "rsi_period": rsi_period,
+            }
+            for name, values in zip(["bb_dev", "oversold", "overbought"], thresholds):
+                frame[name] = np.repeat(values.ravel(), num_tickers)
+            for name, values in metrics.items():
+                frame[name] = values.ravel()
+            frames.append(pd.DataFrame(frame))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def backtest_signals(buy: np.ndarray, sell: np.ndarray, returns: np.ndarray) -> dict:
+    """
+    Positions and performance of long only trading on buy/sell signal masks.
+    Days are the second to last axis, signals act from the next day.
+
+    Returns:
+        dict: total_return, max_drawdown, trades, hit_rate and exposure, with the
+            days axis reduced
+    """
+    days = np.arange(buy.shape[-2])[:, None]
+
+    # Holding after a day if the latest signal so far was a buy
+    signal = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+    latest = np.maximum.accumulate(np.where(signal != 0, days, -1), axis=-2)
+    holding = np.take_along_axis(signal, np.maximum(latest, 0), axis=-2) == 1
+    holding &= latest >= 0
+
+    position = np.zeros(holding.shape, dtype=bool)
+    position[..., 1:, :] = holding[..., :-1, :]
+    previous = np.zeros(holding.shape, dtype=bool)
+    previous[..., 1:, :] = position[..., :-1, :]
+
+    strategy = position * returns
+    equity = np.cumsum(strategy, axis=-2)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=-2), 0)
+    drawdown = np.max(peak - equity, axis=-2)
+
+    # Trade returns: equity at exit less equity before the entry day
+    entries = position & ~previous
+    exits = ~position & previous
+    entry_day = np.maximum.accumulate(np.where(entries, days, 0), axis=-2)
+    entry_equity = np.take_along_axis(equity - strategy, entry_day, axis=-2)
+    gains = exits & (equity - entry_equity > 0)
+
+    trades = exits.sum(axis=-2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(trades > 0, gains.sum(axis=-2) / trades, np.nan)
+
+    return {
+        "total_return": np.expm1(equity[..., -1, :]),
+        "max_drawdown": -np.expm1(-drawdown),
+        "trades": trades,
+        "hit_rate": hit_rate,
+        "exposure": position.mean(axis=-2),
+    }
+
+
+def backtest_watchlist(
+    tickers: list, grid: dict = None, years: int = 5, n_jobs: int = None
+) -> pd.DataFrame:
+    """
+    Backtests a watchlist on its daily history, served from the local candle store.
+
+    Parameters:
+        tickers (list): The stock symbols
+        grid (dict): Values to try per param, see Backtest
+        years (int): Years of history to test on
+        n_jobs (int): Worker processes, see Backtest
+
+    Returns:
+        DataFrame: Metrics averaged across tickers per combination of params
+    """
+    end = datetime.now()
+    start = end - timedelta(days=365 * years)
+    close = get_watchlist_closes(tickers, start, end, periodType="year")
+    if close.empty:
+        return pd.DataFrame()
+
+    backtest = Backtest(close, grid, n_jobs)
+    return backtest.summary(backtest.run())
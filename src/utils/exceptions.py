@@ -5,12 +5,15 @@ class APIException(Exception):
     """Exception raised for errors during API call.
 
     Args:
-        api_respone(str): API endpoint response
+        api_respone(str): API endpoint response or its already decoded JSON body
     """
 
     def __init__(self, api_response):
         # Create a JSON response to parse error key
-        response_dict = api_response.json()
+        if isinstance(api_response, dict):
+            response_dict = api_response
+        else:
+            response_dict = api_response.json()
         message = ""
         if response_dict.get("error") is not None:
             message = f"API Error : {response_dict.get('error')}"
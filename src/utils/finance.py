@@ -1,25 +1,38 @@
 import logging
+from datetime import datetime, timedelta
 
 import yfinance as yf
 
+from broker.history import History
+
 
 def get_stock_price(ticker, history=5):
     """
     Get historical stock price data for a given ticker symbol.
 
+    Prices come from the broker price history (local candle store first),
+    falling back to Yahoo Finance if the broker request fails.
+
     Args:
         ticker (str): The ticker symbol of the stock.
-        history (int): The number of years of historical data to retrieve (default is 5 years).
+        history (int): The number of most recent trading days to retrieve (default is 5 days).
 
     Returns:
         str: A formatted string containing the historical stock price data.
     """
-    stock = yf.Ticker(ticker)
-    df = stock.history(period="1y")
+    try:
+        df = get_broker_prices(ticker, history)
+    except Exception as e:
+        logging.warning(f"Broker price history failed for {ticker}: {str(e)}")
+        df = None
 
-    df = df[["Close", "Volume"]]
-    df.index = [str(x).split()[0] for x in list(df.index)]
-    df.index.rename("Date", inplace=True)
+    if df is None or df.empty:
+        stock = yf.Ticker(ticker)
+        df = stock.history(period="1y")
+
+        df = df[["Close", "Volume"]]
+        df.index = [str(x).split()[0] for x in list(df.index)]
+        df.index.rename("Date", inplace=True)
 
     df = df[-history:]
     stock_prices = df.to_string()
@@ -28,6 +41,28 @@ def get_stock_price(ticker, history=5):
     return stock_prices
 
 
+def get_broker_prices(ticker, history):
+    """
+    Daily close and volume of the last trading days from the broker price history.
+    """
+    end = datetime.now()
+    # Calendar days covering the trading days requested, with room for holidays
+    start = end - timedelta(days=max(2 * history, 30))
+    df = History().get_price_history_bulk(
+        [ticker],
+        startDate=start,
+        endDate=end,
+        periodType="month",
+        frequencyType="daily",
+        frequency=1,
+        needExtendedHoursData=False,
+    )
+    df = df[["close", "volume"]].rename(columns={"close": "Close", "volume": "Volume"})
+    df.index = df.index.strftime("%Y-%m-%d")
+    df.index.rename("Date", inplace=True)
+    return df
+
+
 def get_financial_statements(ticker):
     """
     Get the financial statements (balance sheet) for a given company's ticker symbol.
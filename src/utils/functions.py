@@ -3,6 +3,9 @@ from datetime import datetime as dt
 
 import pandas as pd
 
+# Option symbol: underlying, expiry as MMDDYY, P or C and strike
+OPTION_SYMBOL_REGEX = re.compile(r"^(.+)([0-9]{6})([PC])(\d*\.?\d*)")
+
 
 # Define Formatters
 def formatter_currency(x):
@@ -45,10 +48,8 @@ def convert_to_df(list_obj):
 
 
 def parse_option_symbol(symbol):
-    # Regex to parse option string
-    matcher = re.compile(r"^(.+)([0-9]{6})([PC])(\d*\.?\d*)")
-
-    groups = matcher.search(symbol)
+    # Single symbol counterpart of parse_option_symbols, on the same pattern
+    groups = OPTION_SYMBOL_REGEX.search(symbol)
 
     # Date is in group 2
     date_string = groups[2]
@@ -60,3 +61,28 @@ def parse_option_symbol(symbol):
     expiration_date = dt.strptime(date_string, "%m%d%y").strftime("%Y-%m-%d")
 
     return expiration_date, strike_price
+
+
+def parse_option_symbols(symbols):
+    """
+    Parse a Series of option symbols like AAPL_011323P120 in one pass
+
+    Args:
+        symbols (Series): Option symbols, values that don't match give NaN/NaT
+
+    Returns:
+        DataFrame: underlying, expiry (datetime64), put_call ('P' or 'C'),
+            strike (float) and strike_text (str, as written in the symbol)
+            columns, same index as symbols
+    """
+    parsed = symbols.fillna("").astype(str).str.extract(OPTION_SYMBOL_REGEX)
+    return pd.DataFrame(
+        {
+            "underlying": parsed[0].str.rstrip("_"),
+            "expiry": pd.to_datetime(parsed[1], format="%m%d%y"),
+            "put_call": parsed[2],
+            "strike": pd.to_numeric(parsed[3], errors="coerce"),
+            "strike_text": parsed[3],
+        },
+        index=symbols.index,
+    )
@@ -1,7 +1,9 @@
 import dbm
+import fcntl
 import json
 import logging
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 import redis
 
@@ -26,6 +28,19 @@ class Store(ABC):
     def get_dict(self, key):
         pass
 
+    @abstractmethod
+    def delete(self, key):
+        """Removes key, no error if it doesn't exist."""
+        pass
+
+    @abstractmethod
+    def update_dict(self, key, fn):
+        """
+        Atomically replace the dict stored at key with fn(current dict or None)
+        and return the new value. Safe across threads and processes.
+        """
+        pass
+
 
 class RedisStore(Store):
     def __init__(self):
@@ -59,23 +74,55 @@ class RedisStore(Store):
         else:
             return None
 
+    def delete(self, key):
+        try:
+            self.client.delete(key)
+        except redis.exceptions.ConnectionError as err:
+            raise HaltCallbackException("Unable to connect", err)
+
+    def update_dict(self, key, fn):
+        def transaction(pipe):
+            json_string = pipe.get(key)
+            val = fn(json.loads(json_string) if json_string else None)
+            pipe.multi()
+            pipe.set(key, json.dumps(val))
+            return val
+
+        # WATCH the key and retry the transaction if another client changed it
+        try:
+            return self.client.transaction(transaction, key, value_from_callable=True)
+        except redis.exceptions.ConnectionError as err:
+            raise HaltCallbackException("Unable to connect", err)
+
 
 class LocalStore(Store):
     def __init__(self):
         pass
 
+    @contextmanager
+    def _lock(self, exclusive=False):
+        # dbm doesn't support concurrent writers, serialize access with a lock file
+        with open(f"{STORE_PATH}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     def set_dict(self, key, val):
-        db = dbm.open(STORE_PATH, "c")
-        # Convert Dict to JSON string
-        json_val = json.dumps(val)
-        db[key] = json_val
-        db.close()
+        with self._lock(exclusive=True):
+            db = dbm.open(STORE_PATH, "c")
+            # Convert Dict to JSON string
+            json_val = json.dumps(val)
+            db[key] = json_val
+            db.close()
 
     def get_dict(self, key):
         try:
-            db = dbm.open(STORE_PATH, "r")
-            json_string = db.get(key)
-            db.close()
+            with self._lock():
+                db = dbm.open(STORE_PATH, "r")
+                json_string = db.get(key)
+                db.close()
             if json_string:
                 return json.loads(json_string)
             else:
@@ -83,3 +130,23 @@ class LocalStore(Store):
         except Exception as err:
             logging.error(f" Error reading from dbm at {STORE_PATH}, {str(err)}")
             raise SystemError("Unable to connect", err)
+
+    def update_dict(self, key, fn):
+        with self._lock(exclusive=True):
+            db = dbm.open(STORE_PATH, "c")
+            try:
+                json_string = db.get(key)
+                val = fn(json.loads(json_string) if json_string else None)
+                db[key] = json.dumps(val)
+            finally:
+                db.close()
+        return val
+
+    def delete(self, key):
+        with self._lock(exclusive=True):
+            db = dbm.open(STORE_PATH, "c")
+            try:
+                if key in db:
+                    del db[key]
+            finally:
+                db.close()
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    In process LRU cache whose entries expire after a per entry time to live.
+
+    When a Store is given, entries are written through to it as well so other
+    gunicorn workers can reuse them, and a local miss falls back to the store.
+
+    Parameters:
+        maxsize (int): Entries kept in process before the least recently used is evicted
+        prefix (str): Prefix for the keys written to the store
+        store (Store): Optional shared store
+    """
+
+    def __init__(self, maxsize: int = 128, prefix: str = "", store=None):
+        self.maxsize = maxsize
+        self.prefix = prefix
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Returns the cached value, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+
+        if self.store is None:
+            return None
+
+        try:
+            entry = self.store.get_dict(self.prefix + key)
+        except Exception as e:
+            logging.warning(f"Unable to read {key} from store: {str(e)}")
+            return None
+        if not entry or entry["expires_at"] <= now:
+            return None
+
+        self._put(key, entry["value"], entry["expires_at"])
+        return entry["value"]
+
+    def set(self, key: str, value, ttl: float):
+        """Caches value for ttl seconds."""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._put(key, value, expires_at)
+
+        if self.store is not None:
+            try:
+                self.store.set_dict(
+                    self.prefix + key, {"expires_at": expires_at, "value": value}
+                )
+            except Exception as e:
+                logging.warning(f"Unable to write {key} to store: {str(e)}")
+
+    def delete(self, key: str):
+        """Drops the entry from this process and from the store."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.store is not None:
+            try:
+                self.store.delete(self.prefix + key)
+            except Exception as e:
+                logging.warning(f"Unable to delete {key} from store: {str(e)}")
+
+    def clear(self):
+        """Drops every entry held in process."""
+        with self._lock:
+            self._entries.clear()
+
+    def _put(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
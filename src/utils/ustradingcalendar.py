@@ -1,8 +1,20 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+import numpy as np
 from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday,
                                     Holiday, USLaborDay, USMartinLutherKingJr,
                                     USMemorialDay, USPresidentsDay,
                                     USThanksgivingDay, nearest_workday)
 
+from config.settings import (TRADING_CALENDAR_END_YEAR,
+                             TRADING_CALENDAR_START_YEAR)
+
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
 
 class USTradingCalendar(AbstractHolidayCalendar):
     rules = [
@@ -15,4 +27,98 @@ class USTradingCalendar(AbstractHolidayCalendar):
         USLaborDay,
         USThanksgivingDay,
         Holiday('Christmas', month=12, day=25, observance=nearest_workday)
-    ]
\ No newline at end of file
+    ]
+
+
+@lru_cache(maxsize=None)
+def _holidays(year):
+    holidays = USTradingCalendar().holidays(
+        start=datetime(year, 1, 1), end=datetime(year, 12, 31))
+    return frozenset(holiday.date() for holiday in holidays)
+
+
+@lru_cache(maxsize=None)
+def business_days(start_year=TRADING_CALENDAR_START_YEAR,
+                  end_year=TRADING_CALENDAR_END_YEAR):
+    '''Sorted datetime64[D] array of the trading days from start_year to end_year'''
+    holidays = USTradingCalendar().holidays(
+        start=datetime(start_year, 1, 1), end=datetime(end_year, 12, 31))
+    days = np.arange(f'{start_year}-01-01', f'{end_year + 1}-01-01',
+                     dtype='datetime64[D]')
+    is_business_day = np.is_busday(
+        days, holidays=holidays.values.astype('datetime64[D]'))
+    days = days[is_business_day]
+    days.flags.writeable = False
+    return days
+
+
+def _lookup(dates, positions):
+    '''Business days at positions, NaT for dates outside the configured year range'''
+    days = business_days()
+    inside = ((dates >= np.datetime64(f'{TRADING_CALENDAR_START_YEAR}-01-01'))
+              & (dates <= np.datetime64(f'{TRADING_CALENDAR_END_YEAR}-12-31'))
+              & (positions >= 0) & (positions < len(days)))
+    return np.where(inside, days[np.clip(positions, 0, len(days) - 1)],
+                    np.datetime64('NaT', 'D'))
+
+
+def _as_days(dates):
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def previous_business_day(dates):
+    '''
+    Trading day before each date, same as subtracting one CustomBusinessDay
+    with USTradingCalendar. NaT outside the configured year range.
+
+    Args:
+        dates (array like): Dates as datetime64, datetime or YYYY-MM-DD strings
+
+    Returns:
+        ndarray: datetime64[D] previous trading days
+    '''
+    dates = _as_days(dates)
+    return _lookup(dates, np.searchsorted(business_days(), dates, 'left') - 1)
+
+
+def next_business_day(dates):
+    '''Trading day after each date, NaT outside the configured year range'''
+    dates = _as_days(dates)
+    return _lookup(dates, np.searchsorted(business_days(), dates, 'right'))
+
+
+def business_days_between(start, end):
+    '''
+    Number of trading days from start up to but not including end,
+    like numpy busday_count when start <= end
+    '''
+    days = business_days()
+    return (np.searchsorted(days, _as_days(end), 'left')
+            - np.searchsorted(days, _as_days(start), 'left'))
+
+
+def is_trading_day(day):
+    '''True if the exchange is open on the given date'''
+    return day.weekday() < 5 and day not in _holidays(day.year)
+
+
+def is_market_open(now=None):
+    '''True during regular trading hours on a trading day'''
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    return is_trading_day(now.date()) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def seconds_until_open(now=None):
+    '''Seconds until the next regular session opens, 0 if it is open now'''
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    if is_market_open(now):
+        return 0
+
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+
+    next_open = datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TIMEZONE)
+    return (next_open - now).total_seconds()
@@ -1,13 +1,18 @@
 import dash_bootstrap_components as dbc
 import dash_tabulator
+import pandas as pd
 from dash import callback, dcc, html
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
 from service.chart_helper import show_charts
-from service.search_income import watchlist_income
+from service.search_income import watchlist_income_progress
 from utils.constants import screener_list
 
+# Tabulator formatters applied in the browser, the screener returns raw numbers
+CURRENCY_COLUMNS = ["MARK", "STRIKE", "BREAK EVEN", "STOCK PRICE", "BID", "ASK"]
+PERCENT_COLUMNS = ["RETURNS", "OTM"]
+
 SIDE_COLUMN = (
     html.Div(
         [
@@ -139,6 +144,66 @@ SIDE_COLUMN = (
                     ),
                 ]
             ),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        children=[
+                            dbc.Label("Min OI", size="sm"),
+                            dbc.Input(
+                                type="number",
+                                id="min_open_interest",
+                                min=0,
+                                step=1,
+                                placeholder="0",
+                                size="sm",
+                            ),
+                        ],
+                    ),
+                    dbc.Col(
+                        children=[
+                            dbc.Label("Min Volume", size="sm"),
+                            dbc.Input(
+                                type="number",
+                                id="min_volume",
+                                min=0,
+                                step=1,
+                                placeholder="0",
+                                size="sm",
+                            ),
+                        ],
+                    ),
+                ]
+            ),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        children=[
+                            dbc.Label("Max Spread %", size="sm"),
+                            dbc.Input(
+                                type="number",
+                                id="max_spread",
+                                min=0,
+                                step="any",
+                                placeholder="",
+                                size="sm",
+                            ),
+                        ],
+                    ),
+                    dbc.Col(
+                        children=[
+                            dbc.Label("Top", size="sm"),
+                            dbc.Input(
+                                type="number",
+                                id="top_k",
+                                min=1,
+                                step=1,
+                                placeholder="",
+                                size="sm",
+                            ),
+                        ],
+                    ),
+                ]
+            ),
             dbc.Row(
                 [
                     dbc.Col(
@@ -159,6 +224,8 @@ SIDE_COLUMN = (
 )
 SEARCH_RESULT = html.Div(
     [
+        # Results of the tickers scanned so far, while the scan is running
+        html.Div(id="income-progress"),
         dbc.Spinner(
             children=[
                 dbc.Alert(id="income-message", dismissable=True, is_open=False),
@@ -174,7 +241,7 @@ SEARCH_RESULT = html.Div(
                 ),
                 (html.Div(id="income-output")),
             ]
-        )
+        ),
     ]
 )
 
@@ -205,11 +272,20 @@ layout = dbc.Form(
         State("max_delta", "value"),
         State("premium", "value"),
         State("moneyness", "value"),
+        State("min_open_interest", "value"),
+        State("min_volume", "value"),
+        State("max_spread", "value"),
+        State("top_k", "value"),
         State("ticker", "value"),
         State("ticker_list", "value"),
     ],
+    background=True,
+    progress=[Output("income-progress", "children")],
+    progress_default=[None],
+    running=[(Output("income-btn", "disabled"), True, False)],
 )
 def on_button_click(
+    set_progress,
     n,
     contractType,
     min_expiration_days,
@@ -218,13 +294,19 @@ def on_button_click(
     max_delta,
     premium,
     moneyness,
+    min_open_interest,
+    min_volume,
+    max_spread,
+    top_k,
     ticker,
     ticker_list,
 ):
     """
     Callback function triggered on button click to perform income search.
+    Runs as a background callback, the table is refreshed as each ticker completes.
 
     Args:
+        set_progress (function): Pushes the partial results to the page.
         n (int): Number of button clicks.
         contractType (str): Selected instrument type.
         min_expiration_days (int): Minimum expiration days.
@@ -233,6 +315,10 @@ def on_button_click(
         max_delta (float): Maximum delta.
         premium (str): Premium value.
         moneyness (str): Moneyness value.
+        min_open_interest (int): Minimum open interest.
+        min_volume (int): Minimum volume.
+        max_spread (float): Maximum bid/ask spread as % of the mark.
+        top_k (int): Only keep the contracts with the best returns.
         ticker (str): Ticker input.
         ticker_list (str): Selected watchlist.
 
@@ -257,6 +343,14 @@ def on_button_click(
             params["premium"] = premium
         if moneyness:
             params["moneyness"] = moneyness
+        if min_open_interest:
+            params["min_open_interest"] = int(min_open_interest)
+        if min_volume:
+            params["min_volume"] = int(min_volume)
+        if max_spread:
+            params["max_spread"] = float(max_spread)
+        if top_k:
+            params["top_k"] = int(top_k)
 
         # Convert ticker to list for consistency with ticker list
         # Ticker can take comma seperated values
@@ -268,31 +362,77 @@ def on_button_click(
         else:
             return None, True, "Enter Ticker or Select Watchlist"
 
-        df = watchlist_income(tickers, params)
-        if not df.empty:
-            options = {
-                "selectable": 1,
-                "pagination": "local",
-                "paginationSize": 20,
-                "responsiveLayout": "true",
-                "movableRows": "true",
-                "groupBy": "TICKER",
-            }
-
-            dt = (
-                dash_tabulator.DashTabulator(
-                    id="screener-table",
-                    columns=[{"id": i, "title": i, "field": i} for i in df.columns],
-                    data=df.to_dict("records"),
-                    options=options,
-                ),
-            )
-            return dt, False, ""
+        records = []
+        columns = None
+        for df, frames in watchlist_income_progress(tickers, params):
+            columns = columns or table_columns(df)
+            if "top_k" in params:
+                # Trimming can drop earlier rows, the frames hold at most top_k
+                # rows plus the ticker just completed
+                records = table_records(pd.concat(frames, ignore_index=True))
+            else:
+                records.extend(table_records(df))
+            set_progress((results_table("screener-progress-table", columns, records),))
 
+        if records:
+            return results_table("screener-table", columns, records), False, ""
         else:
             return None, True, "No Results Found"
 
 
+def results_table(id, columns, records):
+    """
+    Screener results table, rows are sorted by returns in the browser so
+    results can be appended in the order the tickers complete.
+    """
+    options = {
+        "selectable": 1,
+        "pagination": "local",
+        "paginationSize": 20,
+        "responsiveLayout": "true",
+        "movableRows": "true",
+        "groupBy": "TICKER",
+        "initialSort": [{"column": "RETURNS", "dir": "desc"}],
+    }
+
+    return (
+        dash_tabulator.DashTabulator(
+            id=id,
+            columns=columns,
+            data=records,
+            options=options,
+        ),
+    )
+
+
+def table_records(df):
+    """Screener results as Tabulator rows, with the expiration as a date string"""
+    expiration = df["EXPIRATION"].dt.strftime("%Y-%m-%d")
+    return df.assign(EXPIRATION=expiration).to_dict("records")
+
+
+def table_columns(df):
+    """
+    Tabulator column definitions for the screener results, with currency and
+    percent formatting done client side so the columns sort as numbers.
+    """
+    columns = []
+    for i in df.columns:
+        column = {"id": i, "title": i, "field": i}
+        if i in CURRENCY_COLUMNS:
+            column["formatter"] = "money"
+            column["formatterParams"] = {"symbol": "$", "precision": 2}
+        elif i in PERCENT_COLUMNS:
+            column["formatter"] = "money"
+            column["formatterParams"] = {
+                "symbol": "%",
+                "symbolAfter": True,
+                "precision": 1,
+            }
+        columns.append(column)
+    return columns
+
+
 # dash_tabulator can register a callback on rowClicked
 # to receive a dict of the row values
 @callback(
@@ -5,7 +5,11 @@ from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
 from service.account_positions import AccountPositions
-from utils.functions import formatter_currency
+from utils.functions import (
+    formatter_currency,
+    formatter_number,
+    formatter_number_2_digits,
+)
 from utils.opstrat.basic_multi import multi_plotter
 
 layout = html.Div(
@@ -90,15 +94,14 @@ layout = html.Div(
         Output("call-detail", "children"),
         Output("stock-detail", "children"),
     ],
-    [
-        [Input("url", "pathname")],
-    ],
+    Input("url", "pathname"),
 )
-def on_button_click(n):
+def on_button_click(pathname):
     """Display account summary and positions tables.
 
     Retrieves account balance, put positions, call positions, and stock positions.
-    Renders the data in Tabulator tables and summary alerts.
+    Renders the data in Tabulator tables and summary alerts. On /household the
+    positions of all the accounts are shown together.
 
     Returns:
         puts_table (DashTabulator): Put positions table
@@ -109,11 +112,17 @@ def on_button_click(n):
         call_detail (html.Div): Call positions summary alert
         stock_detail (html.Div): Stock positions summary alert
     """
-    account = AccountPositions()
+    household = pathname == "/household"
+    account = AccountPositions(household=household)
     balance = account.balance
+    if balance is None:
+        # None of the household accounts could be fetched
+        message = dbc.Alert(children="No account could be loaded", color="danger")
+        return None, None, None, message, None, None, None
     df_puts = account.get_put_positions()
     df_calls = account.get_call_positions()
     df_stocks = account.get_stock_positions()
+    greeks = account.get_portfolio_greeks()
     puts_count = df_puts.shape[0]
     calls_count = df_calls.shape[0]
     stocks_count = df_stocks.shape[0]
@@ -130,13 +139,19 @@ def on_button_click(n):
     tabulator_options = {
         "selectable": "true",
     }
+    account_column = (
+        [{"title": "ACCOUNT", "field": "ACCOUNT", "headerFilter": "input"}]
+        if household
+        else []
+    )
 
     puts_dt = (
         dash_tabulator.DashTabulator(
             id="put-table",
             data=df_puts.to_dict("records"),
             options=tabulator_options,
-            columns=[
+            columns=account_column
+            + [
                 {"title": "UNDERLYING", "field": "TICKER", "headerFilter": "input"},
                 {"title": "QTY", "field": "QTY"},
                 {"title": "SYMBOL", "field": "SYMBOL"},
@@ -160,7 +175,8 @@ def on_button_click(n):
             id="call-table",
             data=df_calls.to_dict("records"),
             options=tabulator_options,
-            columns=[
+            columns=account_column
+            + [
                 {"title": "UNDERLYING", "field": "TICKER", "headerFilter": "input"},
                 {"title": "QTY", "field": "QTY"},
                 {"title": "SYMBOL", "field": "SYMBOL"},
@@ -183,7 +199,8 @@ def on_button_click(n):
             id="stock-table",
             data=df_stocks.to_dict("records"),
             options=tabulator_options,
-            columns=[
+            columns=account_column
+            + [
                 {"title": "TICKER", "field": "TICKER", "headerFilter": "input"},
                 {"title": "QTY", "field": "QTY"},
                 {"title": "MARK", "field": "MARK"},
@@ -204,6 +221,10 @@ def on_button_click(n):
                     children=f" Account Value:{formatter_currency(balance.accountValue)}  Cash Balance:{formatter_currency(balance.marginBalance)}  Maintenance:{formatter_currency(balance.maintenanceRequirement)}",
                     color="info",
                 ),
+                dbc.Alert(
+                    children=f" Delta:{formatter_number(greeks['DELTA'])} ({formatter_currency(greeks['DOLLAR DELTA'])})  Gamma:{formatter_number_2_digits(greeks['GAMMA'])} ({formatter_currency(greeks['DOLLAR GAMMA'])}/1%)  Theta:{formatter_currency(greeks['THETA'])}/day  Vega:{formatter_currency(greeks['VEGA'])}/vol",
+                    color="info",
+                ),
             ]
         ),
         html.Div(
@@ -7,7 +7,7 @@ import plotly.graph_objects as go
 from dash import Input, Output, State, callback, dcc, html
 from dash.exceptions import PreventUpdate
 
-from service.account_transactions import get_report
+from service.account_transactions import get_premium_rollups, get_report
 from utils.functions import change_date_format, formatter_currency_with_cents
 
 TOP_COLUMN = dbc.Form(
@@ -146,7 +146,16 @@ def on_search(
         raise PreventUpdate
     else:
         try:
-            df = get_report(start_date, end_date, ticker, instrument_type, status_type)
+            # Charts read the premium rollups, only the table needs every trade.
+            # Both pair opens and closes over the whole ledger so totals agree
+            if report_type == "TABLE":
+                df = get_report(
+                    start_date, end_date, ticker, instrument_type, status_type
+                )
+            else:
+                df = get_premium_rollups(
+                    start_date, end_date, ticker, instrument_type, status_type
+                )
             if not df.empty:
                 total = df["TOTAL_PRICE"].sum()
                 message = html.Div(
@@ -203,7 +212,7 @@ def on_search(
                 elif report_type == "TIME":
                     fig = px.bar(
                         df,
-                        x="CLOSE_DATE",
+                        x="MONTH",
                         y="TOTAL_PRICE",
                         color="TICKER",
                         text="TOTAL_PRICE",
@@ -0,0 +1,9 @@
+import os
+
+from config.account_reader import JSONReader
+
+# broker.user_config reads accounts.json on import. Without one in the working
+# directory, the tests load the placeholder account of the fixtures instead.
+# JSONReader is a singleton, so every later Accounts() reuses it.
+if not os.path.exists("accounts.json"):
+    JSONReader(os.path.join(os.path.dirname(__file__), "fixtures", "accounts.json"))
@@ -0,0 +1,173 @@
+import math
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from broker.domain_objects import Balance, Position, SecuritiesAccount
+from broker.quote_cache import QuoteCache
+from service import account_positions
+from utils.ttl_cache import TTLCache
+
+
+class MemoryStore:
+    """Store shared by the workers of a test, like Redis or the dbm file"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get_dict(self, key):
+        return self.data.get(key)
+
+    def set_dict(self, key, val):
+        self.data[key] = val
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def update_dict(self, key, fn):
+        self.data[key] = fn(self.data.get(key))
+        return self.data[key]
+
+
+def position(symbol, quantity):
+    return Position(
+        quantity=quantity,
+        symbol=symbol,
+        instrument_type="EQUITY",
+        underlying=symbol,
+        option_type=None,
+        averagePrice=90.0,
+        maintenanceRequirement=30.0 * quantity,
+    )
+
+
+PORTFOLIOS = {
+    "brokerage": SecuritiesAccount(
+        Balance(1000, 300, 10000), [position("AAPL", 10), position("MSFT", 5)]
+    ),
+    "ira": SecuritiesAccount(Balance(500, 0, 5000), [position("AAPL", 20)]),
+    "closed": None,
+}
+
+
+class HouseholdSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def fetch(symbols):
+            self.calls.append(sorted(symbols))
+            return {
+                symbol: {
+                    "symbol": symbol,
+                    "underlyingPrice": math.nan,
+                    "strikePrice": math.nan,
+                    "mark": 100.0,
+                    "theta": math.nan,
+                    "delta": math.nan,
+                    "gamma": math.nan,
+                    "vega": math.nan,
+                    "daysToExpiration": math.nan,
+                }
+                for symbol in symbols
+            }
+
+        accounts = mock.Mock()
+        accounts.get_account_list.return_value = list(PORTFOLIOS)
+        patches = [
+            mock.patch.object(account_positions, "Accounts", return_value=accounts),
+            mock.patch.object(
+                account_positions, "get_portfolio", side_effect=PORTFOLIOS.get
+            ),
+            mock.patch.object(
+                account_positions, "quote_cache", QuoteCache(fetch=fetch)
+            ),
+            mock.patch.object(account_positions, "snapshot_cache", TTLCache()),
+            mock.patch.object(account_positions.Base, "store", MemoryStore()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_accounts_are_merged_and_priced_once(self):
+        positions, balance = account_positions.get_household_snapshot()
+
+        self.assertEqual(self.calls, [["AAPL", "MSFT"]])
+        self.assertEqual(
+            sorted(zip(positions["account"], positions["symbol"])),
+            [("brokerage", "AAPL"), ("brokerage", "MSFT"), ("ira", "AAPL")],
+        )
+        self.assertTrue((positions["mark"] == 100.0).all())
+        self.assertEqual(
+            vars(balance),
+            {
+                "marginBalance": 1500,
+                "maintenanceRequirement": 300,
+                "accountValue": 15000,
+            },
+        )
+
+        # Served from the snapshot until it expires
+        cached, _ = account_positions.get_household_snapshot()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(cached["account"].tolist(), positions["account"].tolist())
+
+    def test_stock_table_shows_account(self):
+        account = account_positions.AccountPositions(household=True)
+        stocks = account.get_stock_positions()
+        self.assertEqual(stocks.columns[0], "ACCOUNT")
+        self.assertEqual(stocks["QTY"].sum(), 35)
+
+
+class SnapshotInvalidationTest(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryStore()
+        self.positions = pd.DataFrame({"symbol": ["AAPL"], "quantity": [10]})
+        patches = [
+            mock.patch.object(account_positions.Base, "store", self.store),
+            mock.patch.object(
+                account_positions,
+                "get_account",
+                return_value=(self.positions, Balance(1000, 300, 10000)),
+            ),
+            mock.patch.object(
+                account_positions, "enrich_positions", side_effect=lambda df: df
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def get_snapshot(self, worker):
+        with mock.patch.object(account_positions, "snapshot_cache", worker):
+            return account_positions.get_snapshot("1")
+
+    def test_invalidation_reaches_every_worker(self):
+        worker_a = TTLCache(store=self.store)
+        worker_b = TTLCache(store=self.store)
+
+        self.get_snapshot(worker_a)
+        self.get_snapshot(worker_a)
+        self.get_snapshot(worker_b)
+        self.assertEqual(account_positions.get_account.call_count, 1)
+
+        # Worker B syncs new trades, worker A still holds the old snapshot in process
+        with mock.patch.object(account_positions, "snapshot_cache", worker_b):
+            account_positions.invalidate_snapshot("1")
+        self.get_snapshot(worker_a)
+        self.assertEqual(account_positions.get_account.call_count, 2)
+
+        # The new snapshot is shared again
+        self.get_snapshot(worker_b)
+        self.assertEqual(account_positions.get_account.call_count, 2)
+
+    def test_invalidation_retires_household(self):
+        key = account_positions.snapshot_key(account_positions.HOUSEHOLD)
+        account_positions.invalidate_snapshot("1")
+        self.assertNotEqual(
+            account_positions.snapshot_key(account_positions.HOUSEHOLD), key
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
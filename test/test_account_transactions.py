@@ -0,0 +1,75 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from service import account_transactions
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Report searches covered by the fixture, as called from the Reports screen
+REPORTS = {
+    "all": {"start_close_date": "2023-01-01", "end_close_date": "2099-12-31"},
+    "window": {"start_close_date": "2023-01-15", "end_close_date": "2023-02-28"},
+    "puts": {
+        "start_close_date": "2023-01-01",
+        "end_close_date": "2099-12-31",
+        "instrument_type": "PUT",
+    },
+    "calls_closed": {
+        "start_close_date": "2023-01-01",
+        "end_close_date": "2099-12-31",
+        "instrument_type": "CALL",
+        "status": "Closed",
+    },
+    "assigned": {
+        "start_close_date": "2023-01-01",
+        "end_close_date": "2099-12-31",
+        "status": "Assigned",
+    },
+    "expired": {
+        "start_close_date": "2023-01-01",
+        "end_close_date": "2099-12-31",
+        "status": "Expired",
+    },
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+def report_to_json(df):
+    return json.loads(df.to_json(orient="split"))
+
+
+class GetReportRegression(unittest.TestCase):
+    """
+    get_report output for a fixed set of transactions, compared with the output
+    recorded in fixtures/transactions_report.json from the row by row implementation.
+    """
+
+    def setUp(self):
+        self.transactions = load_fixture("transactions.json")
+        self.expected = load_fixture("transactions_report.json")
+
+    def get_api_transactions(self, *args, **kwargs):
+        return pd.json_normalize(self.transactions)
+
+    def test_get_report(self):
+        with mock.patch.object(
+            account_transactions,
+            "get_api_transactions",
+            side_effect=self.get_api_transactions,
+        ):
+            for name, search in REPORTS.items():
+                with self.subTest(report=name):
+                    df = account_transactions.get_report(**search)
+                    self.assertEqual(report_to_json(df), self.expected[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import math
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from service.trading_strategy import Backtest
+
+# Three day bands of one standard deviation, trading on the bands alone
+GRID = {"bb_period": 3, "rsi_period": 2, "bb_dev": 1, "oversold": 100, "overbought": 0}
+
+
+def fixed_closes():
+    """
+    AAPL closes at or below the lower band on day 3 and at or above the upper
+    band on day 6, so it is held on days 4 to 6 for a 10 / 9 gain. It buys
+    again on day 10 and is still held, from 10 to 11, on the last day.
+    FLAT never changes price, so it has no RSI and never trades.
+    """
+    days = pd.bdate_range("2023-01-02", periods=14).strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "AAPL": [10, 10.5, 10, 9, 8, 9, 10, 11, 12, 11, 10, 9, 10, 11],
+            "FLAT": [50.0] * 14,
+        },
+        index=days,
+    )
+
+
+class BacktestTest(unittest.TestCase):
+    def run_backtest(self, block_size=None):
+        backtest = Backtest(fixed_closes(), GRID)
+        if block_size:
+            backtest.block_size = block_size
+        return backtest.run().set_index("ticker")
+
+    def test_trades_and_pnl(self):
+        results = self.run_backtest()
+        aapl = results.loc["AAPL"]
+
+        # One completed round trip, the second trade is still open
+        self.assertEqual(aapl["trades"], 1)
+        self.assertEqual(aapl["hit_rate"], 1.0)
+        self.assertAlmostEqual(aapl["total_return"], 11 / 9 - 1)
+        # Day 4 drops from the entry at 9 to 8
+        self.assertAlmostEqual(aapl["max_drawdown"], 1 - 8 / 9)
+        self.assertAlmostEqual(aapl["exposure"], 6 / 14)
+
+        flat = results.loc["FLAT"]
+        self.assertEqual(flat["trades"], 0)
+        self.assertTrue(math.isnan(flat["hit_rate"]))
+        self.assertEqual(flat["total_return"], 0.0)
+        self.assertEqual(flat["exposure"], 0.0)
+
+    def test_ticker_blocks_give_same_results(self):
+        pd.testing.assert_frame_equal(
+            self.run_backtest(), self.run_backtest(block_size=1)
+        )
+
+    def test_grid_combinations(self):
+        backtest = Backtest(
+            fixed_closes(), dict(GRID, bb_dev=[1, 3], oversold=[30, 100])
+        )
+        results = backtest.run()
+        self.assertEqual(len(results), 2 * 2 * 2)
+
+        # Bands of three deviations are never crossed
+        wide = results[results["bb_dev"] == 3]
+        self.assertTrue((wide["trades"] == 0).all())
+
+        summary = backtest.summary(results)
+        self.assertEqual(len(summary), 4)
+        self.assertTrue(np.all(np.diff(summary["total_return"]) <= 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
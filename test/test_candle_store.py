@@ -0,0 +1,200 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from broker import async_base
+from broker.async_base import AsyncBase
+from broker.candle_store import CandleStore
+
+
+def ms(date):
+    return int(pd.Timestamp(date, tz="UTC").timestamp() * 1000)
+
+
+class FakeHistory:
+    """Daily candles for every weekday, records the requested ranges"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, params):
+        self.calls.append((params["startDate"], params["endDate"]))
+        days = pd.bdate_range(
+            pd.Timestamp(params["startDate"], unit="ms"),
+            pd.Timestamp(params["endDate"], unit="ms"),
+        )
+        return [
+            {
+                "open": 100.0 + i,
+                "high": 101.0 + i,
+                "low": 99.0 + i,
+                "close": 100.5 + i,
+                "volume": 1000,
+                "datetime": ms(day),
+            }
+            for i, day in enumerate(days)
+        ]
+
+
+class CandleStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = CandleStore(tmp.name)
+        self.api = FakeHistory()
+
+    def payload(self, start, end):
+        return {
+            "startDate": ms(start),
+            "endDate": ms(end),
+            "frequencyType": "daily",
+            "frequency": 1,
+        }
+
+    def get(self, start, end):
+        """Serves a request the way the price history clients do"""
+        data = self.payload(start, end)
+        stored, fetch_start, fetch_end = self.store.plan("AAPL", data)
+        candles = []
+        if fetch_start is not None:
+            candles = self.api.fetch(
+                dict(data, startDate=fetch_start, endDate=fetch_end)
+            )
+        return self.store.update("AAPL", data, stored, candles, fetch_end)
+
+    def assert_complete(self, candles, start, end):
+        self.assertEqual(
+            [candle["datetime"] for candle in candles],
+            [ms(day) for day in pd.bdate_range(start, end)],
+        )
+
+    def test_first_request_is_fetched_and_stored(self):
+        candles = self.get("2023-03-01", "2023-06-30")
+
+        self.assertEqual(self.api.calls, [(ms("2023-03-01"), ms("2023-06-30"))])
+        self.assert_complete(candles, "2023-03-01", "2023-06-30")
+        self.assertEqual(
+            self.store.load("AAPL", "daily", 1)["covered_from"], ms("2023-03-01")
+        )
+
+    def test_covered_range_fetches_from_last_candle(self):
+        self.get("2023-03-01", "2023-06-30")
+
+        stored, fetch_start, fetch_end = self.store.plan(
+            "AAPL", self.payload("2023-04-03", "2023-07-14")
+        )
+        self.assertEqual((fetch_start, fetch_end), (ms("2023-06-30"), ms("2023-07-14")))
+
+        candles = self.get("2023-04-03", "2023-07-14")
+        self.assert_complete(candles, "2023-04-03", "2023-07-14")
+
+        # Nothing left to fetch inside the stored range
+        _, fetch_start, _ = self.store.plan(
+            "AAPL", self.payload("2023-04-03", "2023-05-31")
+        )
+        self.assertIsNone(fetch_start)
+
+    def test_overlapping_earlier_start_extends_coverage(self):
+        self.get("2023-03-01", "2023-06-30")
+        candles = self.get("2023-02-01", "2023-04-28")
+
+        self.assertEqual(self.api.calls[-1], (ms("2023-02-01"), ms("2023-04-28")))
+        self.assert_complete(candles, "2023-02-01", "2023-04-28")
+        self.assertEqual(
+            self.store.load("AAPL", "daily", 1)["covered_from"], ms("2023-02-01")
+        )
+
+    def test_earlier_range_is_fetched_through_to_stored_start(self):
+        self.get("2023-03-01", "2023-06-30")
+
+        _, fetch_start, fetch_end = self.store.plan(
+            "AAPL", self.payload("2023-01-02", "2023-02-15")
+        )
+        self.assertEqual((fetch_start, fetch_end), (ms("2023-01-02"), ms("2023-03-01")))
+
+        candles = self.get("2023-01-02", "2023-02-15")
+        self.assert_complete(candles, "2023-01-02", "2023-02-15")
+
+        # The whole range is served without a hole before the first stored candle
+        self.api.calls.clear()
+        candles = self.get("2023-01-02", "2023-06-30")
+        self.assertEqual(self.api.calls, [(ms("2023-06-30"), ms("2023-06-30"))])
+        self.assert_complete(candles, "2023-01-02", "2023-06-30")
+
+    def test_gap_before_stored_range_keeps_coverage(self):
+        self.get("2023-03-01", "2023-06-30")
+
+        # Candles that don't reach the stored range leave covered_from alone
+        data = self.payload("2023-01-02", "2023-02-15")
+        stored, _, _ = self.store.plan("AAPL", data)
+        candles = self.api.fetch(data)
+        self.store.update("AAPL", data, stored, candles, data["endDate"])
+        self.assertEqual(
+            self.store.load("AAPL", "daily", 1)["covered_from"], ms("2023-03-01")
+        )
+
+        # So the hole is fetched by the next request that spans it
+        _, fetch_start, fetch_end = self.store.plan(
+            "AAPL", self.payload("2023-01-02", "2023-06-30")
+        )
+        self.assertEqual((fetch_start, fetch_end), (ms("2023-01-02"), ms("2023-06-30")))
+        candles = self.get("2023-01-02", "2023-06-30")
+        self.assert_complete(candles, "2023-01-02", "2023-06-30")
+
+
+class ThreadRecordingStore(CandleStore):
+    """Records the threads reading and writing the candle files"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def load(self, *args):
+        self.threads.append(threading.current_thread())
+        return super().load(*args)
+
+    def save(self, *args):
+        self.threads.append(threading.current_thread())
+        return super().save(*args)
+
+
+class AsyncCandleStoreTest(unittest.TestCase):
+    def test_candle_files_are_used_off_the_event_loop(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = ThreadRecordingStore(tmp.name)
+        api = FakeHistory()
+
+        client = AsyncBase.__new__(AsyncBase)
+        client.config = {"consumer_id": "TEST", "resource": "", "api_version": ""}
+
+        async def api_response(url, params):
+            return {"candles": api.fetch(params)}
+
+        async def get_history():
+            candles = await client.get_price_history(
+                symbol="AAPL",
+                periodType="month",
+                startDate=ms("2023-03-01"),
+                endDate=ms("2023-03-31"),
+                frequencyType="daily",
+                frequency=1,
+            )
+            return candles, threading.current_thread()
+
+        with mock.patch.object(async_base, "candle_store", store), mock.patch.object(
+            client, "_api_response_async", side_effect=api_response
+        ):
+            candles, loop_thread = asyncio.run(get_history())
+
+        self.assertEqual(len(candles), len(pd.bdate_range("2023-03-01", "2023-03-31")))
+        self.assertEqual(len(store.threads), 2)
+        self.assertNotIn(loop_thread, store.threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+import pandas as pd
+
+from utils.functions import parse_option_symbol, parse_option_symbols
+
+
+class ParseOptionSymbolTest(unittest.TestCase):
+    def test_single_and_bulk_parsers_agree(self):
+        symbols = pd.Series(["AAPL_011323P120", "BRK/B_021723C310.5", None])
+        parsed = parse_option_symbols(symbols)
+
+        self.assertEqual(parsed["underlying"].tolist()[:2], ["AAPL", "BRK/B"])
+        self.assertEqual(parsed["put_call"].tolist()[:2], ["P", "C"])
+        self.assertEqual(parsed["strike"].tolist()[:2], [120.0, 310.5])
+        self.assertTrue(parsed.iloc[2].isna().all())
+
+        for i, symbol in enumerate(symbols[:2]):
+            expiration_date, strike_price = parse_option_symbol(symbol)
+            self.assertEqual(expiration_date, parsed["expiry"][i].strftime("%Y-%m-%d"))
+            self.assertEqual(strike_price, parsed["strike_text"][i])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import pandas as pd
+
+from broker.history import candles_to_df, candles_to_frame
+
+
+def candle(timestamp, close):
+    return {
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1000,
+        "datetime": int(pd.Timestamp(timestamp).timestamp() * 1000),
+    }
+
+
+# Daily candles are stamped at midnight in market time, the last one is after
+# midnight UTC but still the same day in New York
+CANDLES = [
+    candle("2023-01-03 05:00Z", 100.0),
+    candle("2023-01-04 05:00Z", 101.0),
+    candle("2023-01-05 04:30Z", 102.0),
+]
+
+
+class CandlesToDataFrameTest(unittest.TestCase):
+    def test_dates_in_market_time(self):
+        df = candles_to_df(CANDLES)
+        self.assertEqual(df.index.tolist(), ["2023-01-03", "2023-01-04", "2023-01-04"])
+        self.assertEqual(df["close"].tolist(), [100.0, 101.0, 102.0])
+
+    def test_same_dates_as_bulk_frame(self):
+        df = candles_to_frame({"AAPL": CANDLES})
+        self.assertEqual(
+            df.index.strftime("%Y-%m-%d").tolist(),
+            candles_to_df(CANDLES).index.tolist(),
+        )
+
+    def test_no_candles(self):
+        self.assertTrue(candles_to_df([]).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from service.indicators import BatchIndicators, IncrementalIndicators
+from service.trading_strategy import RsiBollingerBands, close_matrix, get_trade_signal
+
+PARAMS = RsiBollingerBands.DEFAULT_PARAMS
+
+
+def synthetic_history():
+    """Random walk closes, dates x tickers, MSFT listed a month after the others"""
+    rng = np.random.default_rng(7)
+    days = pd.bdate_range("2023-01-02", periods=120)
+    close = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(days), 3)), axis=0)),
+        index=days.strftime("%Y-%m-%d"),
+        columns=["AAPL", "MSFT", "TSLA"],
+    )
+    close.iloc[:22, 1] = np.nan
+    return close
+
+
+def quote(price, date):
+    return {
+        "lastPrice": price,
+        "quoteTimeInLong": int(pd.Timestamp(f"{date} 16:00").timestamp() * 1000),
+    }
+
+
+class BatchIndicatorsTest(unittest.TestCase):
+    """BatchIndicators against the per ticker RsiBollingerBands pipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.history = synthetic_history()
+        cls.quotes = {
+            "AAPL": quote(95.0, "2023-06-19"),
+            "MSFT": quote(130.0, "2023-06-19"),
+            "TSLA": quote(101.5, "2023-06-19"),
+        }
+        close, cls.current_prices = close_matrix(cls.history, cls.quotes)
+        cls.batch = BatchIndicators(close, PARAMS)
+
+    def ticker_data(self, ticker):
+        return self.history[[ticker]].dropna().rename(columns={ticker: "close"})
+
+    def test_indicators_match_per_ticker(self):
+        for ticker in self.history.columns:
+            with self.subTest(ticker=ticker):
+                strategy = RsiBollingerBands(ticker)
+                df, price = strategy.prepare_dataframe(
+                    self.ticker_data(ticker), self.quotes[ticker]
+                )
+                self.assertEqual(price, self.current_prices[ticker])
+                self.assertEqual(
+                    self.batch.lower[ticker].dropna().index.tolist(),
+                    df.index.tolist(),
+                )
+                for column in ["sma", "upper", "lower", "rsi"]:
+                    np.testing.assert_allclose(
+                        getattr(self.batch, column)[ticker].loc[df.index],
+                        df[column],
+                        rtol=1e-9,
+                        err_msg=column,
+                    )
+
+    def test_latest_signals_match_per_ticker(self):
+        for trade_type in ["buy", "sell"]:
+            latest = self.batch.latest_signals(trade_type).set_index("Ticker")
+            expected = {}
+            for ticker in self.history.columns:
+                signal = get_trade_signal(
+                    ticker, trade_type, self.ticker_data(ticker), self.quotes[ticker]
+                )
+                if signal is not None:
+                    expected[ticker] = signal[1:3]
+
+            with self.subTest(trade_type=trade_type):
+                self.assertTrue(expected)
+                self.assertEqual(
+                    {
+                        ticker: (row["Date"], row["Price"])
+                        for ticker, row in latest.iterrows()
+                    },
+                    expected,
+                )
+
+
+class MisalignedDatesTest(BatchIndicatorsTest):
+    """Tickers whose dates don't line up in the close matrix"""
+
+    @classmethod
+    def setUpClass(cls):
+        history = synthetic_history()[["AAPL", "TSLA"]]
+        # TSLA was halted for three days and its last quote is from the day
+        # before AAPL's, so each leaves holes in the other's column
+        history.iloc[70:73, 1] = np.nan
+        cls.history = history
+        cls.quotes = {
+            "AAPL": quote(95.0, "2023-06-20"),
+            "TSLA": quote(101.5, "2023-06-19"),
+        }
+        close, cls.current_prices = close_matrix(cls.history, cls.quotes)
+        cls.batch = BatchIndicators(close, PARAMS)
+
+    def test_holes_keep_indicators(self):
+        # Bands right after the halt and on TSLA's last row are still computed
+        self.assertFalse(np.isnan(self.batch.lower.loc["2023-04-13", "TSLA"]))
+        self.assertFalse(np.isnan(self.batch.rsi.loc["2023-06-19", "TSLA"]))
+        self.assertTrue(np.isnan(self.batch.lower.loc["2023-06-20", "TSLA"]))
+
+
+class IncrementalIndicatorsTest(unittest.TestCase):
+    """IncrementalIndicators fed one bar at a time against BatchIndicators"""
+
+    def assert_matches_batch(self, close, seeded):
+        batch = BatchIndicators(close.to_frame(), PARAMS)
+        indicators = IncrementalIndicators(
+            close.iloc[:seeded].to_numpy(), PARAMS, date=close.index[seeded - 1]
+        )
+        for i, (date, price) in enumerate(close.iloc[seeded:].items(), seeded):
+            # A provisional tick of the bar in progress is replaced by its close
+            indicators.update(price * 1.05, date)
+            values = indicators.update(price, date)
+
+            for column in ["sma", "upper", "lower", "rsi"]:
+                expected = getattr(batch, column).iloc[i, 0]
+                if np.isnan(expected):
+                    self.assertTrue(np.isnan(values[column]), (date, column))
+                else:
+                    self.assertAlmostEqual(
+                        values[column], expected, delta=1e-9 * abs(expected)
+                    )
+            self.assertEqual(values["buy"], bool(price <= batch.lower.iloc[i, 0]))
+            self.assertEqual(values["sell"], bool(price >= batch.upper.iloc[i, 0]))
+
+    def test_bars_fed_one_at_a_time(self):
+        close = synthetic_history()["AAPL"]
+        self.assert_matches_batch(close, seeded=1)
+
+    def test_seeded_from_history(self):
+        close = synthetic_history()["TSLA"]
+        self.assert_matches_batch(close, seeded=60)
+
+    def test_roll_completes_bar(self):
+        close = synthetic_history()["AAPL"]
+        indicators = IncrementalIndicators(close.iloc[:-2].to_numpy(), PARAMS)
+        indicators.update(close.iloc[-2])
+        indicators.roll()
+        values = indicators.update(close.iloc[-1])
+
+        batch = BatchIndicators(close.to_frame(), PARAMS)
+        self.assertAlmostEqual(values["sma"], batch.sma.iloc[-1, 0], places=9)
+        self.assertAlmostEqual(values["rsi"], batch.rsi.iloc[-1, 0], places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import datetime
+import unittest
+from unittest import mock
+
+from broker import options
+from broker.options import Options, chain_cache_key
+from utils.ttl_cache import TTLCache
+
+
+class OptionChainCacheTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(options, "chain_cache", TTLCache())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.client = Options.__new__(Options)
+        self.client.config = {"consumer_id": "TEST", "resource": "", "api_version": ""}
+        self.client._api_response = mock.Mock(
+            side_effect=lambda **kwargs: {"symbol": "AAPL", "putExpDateMap": {}}
+        )
+
+    def request(self, **query):
+        return dict(
+            {"apikey": "TEST", "symbol": "AAPL", "contractType": "PUT"}, **query
+        )
+
+    def test_cache_key_ignores_apikey_and_time_of_day(self):
+        morning = self.request(fromDate=datetime.datetime(2023, 1, 3, 9, 30))
+        evening = self.request(fromDate=datetime.datetime(2023, 1, 3, 16, 0))
+        evening["apikey"] = "OTHER"
+        self.assertEqual(chain_cache_key(morning), chain_cache_key(evening))
+        self.assertNotEqual(
+            chain_cache_key(morning), chain_cache_key(self.request(contractType="CALL"))
+        )
+
+    def test_repeated_chain_is_served_from_cache(self):
+        first = self.client.get_options_chain(args_dictionary=self.request())
+        second = self.client.get_options_chain(args_dictionary=self.request())
+
+        self.assertEqual(self.client._api_response.call_count, 1)
+        # Callers share the cached response, see get_options_chain
+        self.assertIs(first, second)
+
+        self.client.get_options_chain(args_dictionary=self.request(strikeCount=5))
+        self.assertEqual(self.client._api_response.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from broker.quote_cache import QuoteCache
+
+
+class FakeQuotes:
+    """Returns a quote for every symbol but UNKNOWN and records the requests"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = []
+
+    def fetch(self, symbols):
+        self.calls.append(list(symbols))
+        time.sleep(self.delay)
+        return {
+            symbol: {"symbol": symbol, "lastPrice": 100.0, "mark": 100.0}
+            for symbol in symbols
+            if symbol != "UNKNOWN"
+        }
+
+
+class QuoteCacheTest(unittest.TestCase):
+    def test_misses_are_fetched_in_one_batch(self):
+        api = FakeQuotes()
+        cache = QuoteCache(max_age=10, fetch=api.fetch)
+
+        cache.get_quotes(["AAPL"])
+        quotes = cache.get_quotes(["AAPL", "MSFT", "UNKNOWN", "MSFT"])
+
+        self.assertEqual(api.calls, [["AAPL"], ["MSFT", "UNKNOWN"]])
+        self.assertEqual(list(quotes), ["AAPL", "MSFT"])
+
+    def test_stale_quotes_are_fetched_again(self):
+        api = FakeQuotes()
+        cache = QuoteCache(max_age=10, fetch=api.fetch)
+
+        cache.get_quotes(["AAPL", "MSFT"])
+        with mock.patch("time.time", return_value=time.time() + 11):
+            cache.get_quotes(["AAPL"])
+        cache.get_quotes(["MSFT"], max_age=0)
+
+        self.assertEqual(api.calls, [["AAPL", "MSFT"], ["AAPL"], ["MSFT"]])
+
+    def test_concurrent_requests_share_one_fetch(self):
+        api = FakeQuotes(delay=0.2)
+        cache = QuoteCache(max_age=10, fetch=api.fetch)
+        results = []
+
+        def get():
+            results.append(cache.get_quotes(["AAPL"]))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(api.calls, [["AAPL"]])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result["AAPL"]["lastPrice"] == 100.0 for result in results))
+
+    def test_failed_fetch_is_raised_and_retried(self):
+        cache = QuoteCache(max_age=10, fetch=mock.Mock(side_effect=ConnectionError))
+        with self.assertRaises(ConnectionError):
+            cache.get_quotes(["AAPL"])
+
+        cache.fetch = FakeQuotes().fetch
+        self.assertIn("AAPL", cache.get_quotes(["AAPL"]))
+
+    def test_stream_pushes_keep_quotes_fresh(self):
+        api = FakeQuotes()
+        cache = QuoteCache(max_age=10, fetch=api.fetch)
+
+        cache.get_quotes(["AAPL"])
+        with mock.patch("time.time", return_value=time.time() + 8):
+            cache.on_stream_quote("AAPL", {"last-price": 101.5, "bid-size": None})
+            cache.on_stream_quote("MSFT", {"last-price": 250.0})
+        with mock.patch("time.time", return_value=time.time() + 15):
+            quotes = cache.get_quotes(["AAPL"])
+
+        self.assertEqual(api.calls, [["AAPL"]])
+        self.assertEqual(quotes["AAPL"]["lastPrice"], 101.5)
+        self.assertEqual(quotes["AAPL"]["mark"], 100.0)
+
+    def test_quotes_dataframe(self):
+        cache = QuoteCache(max_age=10, fetch=FakeQuotes().fetch)
+        df = cache.get_quotesDF(["MSFT", "UNKNOWN", "AAPL", "MSFT"])
+        self.assertEqual(df["symbol"].tolist(), ["MSFT", "AAPL"])
+
+
+if __name__ == "__main__":
+    unittest.main()
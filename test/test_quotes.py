@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+from broker import quotes
+from broker.quotes import Quotes, quotes_frame
+
+
+def quote(symbol):
+    return {"symbol": symbol, "lastPrice": 100.0, "mark": 100.0}
+
+
+class QuotesFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.client = Quotes.__new__(Quotes)
+        self.client.config = {"consumer_id": "TEST", "resource": "", "api_version": ""}
+        self.requests = []
+
+        def api_response(url, params, verify=True):
+            symbols = params["symbol"].split(",")
+            self.requests.append(symbols)
+            return {symbol: quote(symbol) for symbol in symbols if symbol != "UNKNOWN"}
+
+        self.client._api_response = api_response
+
+    def test_rows_follow_requested_order(self):
+        df = quotes_frame(
+            {"AAPL": quote("AAPL"), "MSFT": quote("MSFT")}, ["MSFT", "AAPL", "MSFT"]
+        )
+        self.assertEqual(df["symbol"].tolist(), ["MSFT", "AAPL"])
+
+    def test_missing_symbols_are_left_out(self):
+        # Before the quotes were fetched in chunks a missing symbol raised KeyError
+        df = self.client.get_quotesDF(["AAPL", "UNKNOWN", "MSFT"])
+        self.assertEqual(df["symbol"].tolist(), ["AAPL", "MSFT"])
+
+        df = self.client.get_quotesDF("UNKNOWN")
+        self.assertTrue(df.empty)
+
+    def test_long_lists_are_fetched_in_chunks(self):
+        symbols = ["AAPL", "MSFT", "TSLA", "AAPL", "NVDA", "AMZN"]
+        with mock.patch.object(quotes, "QUOTES_CHUNK_SIZE", 2):
+            df = self.client.get_quotesDF(symbols)
+
+        self.assertEqual(
+            sorted(self.requests), [["AAPL", "MSFT"], ["AMZN"], ["TSLA", "NVDA"]]
+        )
+        self.assertEqual(
+            df["symbol"].tolist(), ["AAPL", "MSFT", "TSLA", "NVDA", "AMZN"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
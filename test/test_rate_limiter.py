@@ -0,0 +1,149 @@
+import asyncio
+import email.utils
+import threading
+import time
+import unittest
+from unittest import mock
+
+from broker import base, rate_limiter
+from broker.base import Base
+from broker.rate_limiter import RateLimiter, retry_delay
+
+
+class MemoryStore:
+    """Store shared by the limiters of a test, records the threads using it"""
+
+    def __init__(self):
+        self.data = {}
+        self.threads = []
+
+    def update_dict(self, key, fn):
+        self.threads.append(threading.current_thread())
+        self.data[key] = fn(self.data.get(key))
+        return self.data[key]
+
+
+class BrokenStore:
+    def update_dict(self, key, fn):
+        raise ConnectionError("store unavailable")
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patch = mock.patch.object(rate_limiter.time, "time", lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def limiter(self, store=None):
+        # One request per second, three back to back
+        return RateLimiter(
+            "TEST", rate_per_minute=60, burst=3, store=store or MemoryStore()
+        )
+
+    def test_reserve_paces_past_burst(self):
+        limiter = self.limiter()
+        waits = [limiter.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0.0, 0.0, 0.0, 1.0, 2.0])
+
+        # Tokens refill at the rate, up to the burst
+        self.now += 10
+        self.assertEqual([limiter.reserve() for _ in range(4)], [0.0, 0.0, 0.0, 1.0])
+
+    def test_limiters_share_the_store(self):
+        store = MemoryStore()
+        worker_a, worker_b = self.limiter(store), self.limiter(store)
+        waits = [worker.reserve() for worker in (worker_a, worker_b) * 2]
+        self.assertEqual(waits, [0.0, 0.0, 0.0, 1.0])
+
+    def test_penalize_holds_everyone_until_retry(self):
+        limiter = self.limiter()
+        limiter.reserve()
+        limiter.penalize(5)
+
+        # The throttled caller retries after 5s, the next request comes after it
+        self.assertEqual(limiter.reserve(), 6.0)
+
+        # A shorter penalty doesn't refill a bucket that is already drained
+        limiter.penalize(1)
+        self.assertEqual(limiter.reserve(), 7.0)
+
+    def test_store_failure_falls_back_to_process_state(self):
+        limiter = self.limiter(BrokenStore())
+        with self.assertLogs(level="WARNING"):
+            waits = [limiter.reserve() for _ in range(4)]
+        self.assertEqual(waits, [0.0, 0.0, 0.0, 1.0])
+
+    def test_acquire_async_reserves_off_the_event_loop(self):
+        store = MemoryStore()
+        limiter = self.limiter(store)
+
+        async def acquire():
+            await limiter.acquire_async()
+            await limiter.penalize_async(1)
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(acquire())
+        self.assertEqual(len(store.threads), 2)
+        self.assertNotIn(loop_thread, store.threads)
+
+
+class RetryDelayTest(unittest.TestCase):
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_delay("2.5", 0), 2.5)
+        self.assertEqual(retry_delay("-3", 0), 0.0)
+
+    def test_retry_after_http_date(self):
+        header = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(retry_delay(header, 0), 30, delta=2)
+
+    def test_backoff_with_jitter(self):
+        with mock.patch.object(
+            rate_limiter, "RETRY_BACKOFF_BASE", 0.5
+        ), mock.patch.object(rate_limiter, "RETRY_BACKOFF_MAX", 4), mock.patch.object(
+            rate_limiter.random, "uniform", side_effect=max
+        ):
+            self.assertEqual(retry_delay(None, 0), 0.5)
+            self.assertEqual(retry_delay("soon", 2), 2.0)
+            self.assertEqual(retry_delay(None, 10), 4)
+
+
+class APIResponseRetryTest(unittest.TestCase):
+    def response(self, status, retry_after=None):
+        response = mock.Mock(status_code=status, headers={})
+        if retry_after:
+            response.headers["Retry-After"] = retry_after
+        response.json.return_value = {"status": status}
+        return response
+
+    def test_retry_after_429_is_not_reserved_twice(self):
+        client = Base.__new__(Base)
+        client.config = {"consumer_id": "TEST"}
+        client.merged_headers = {}
+        limiter = mock.Mock()
+        responses = [
+            self.response(429, "2"),
+            self.response(503, "1"),
+            self.response(200),
+        ]
+
+        with mock.patch.object(
+            base.RateLimiter, "for_consumer", return_value=limiter
+        ), mock.patch.object(
+            base.SessionManager, "request", side_effect=responses
+        ), mock.patch.object(
+            base.time, "sleep"
+        ) as sleep, self.assertLogs(
+            level="WARNING"
+        ):
+            result = client._api_response("https://example.com", {})
+
+        self.assertEqual(result, {"status": 200})
+        limiter.penalize.assert_called_once_with(2.0)
+        # First request and the retry after the 503, not the retry after the 429
+        self.assertEqual(limiter.acquire.call_count, 2)
+        self.assertEqual(sleep.call_args_list, [mock.call(2.0), mock.call(1.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
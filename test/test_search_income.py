@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from service import search_income
+
+
+def batches():
+    """Display frames of three tickers, as yielded by watchlist_income_stream"""
+    return [
+        pd.DataFrame({"TICKER": ticker, "RETURNS": returns})
+        for ticker, returns in [
+            ("AAPL", [30.0, 10.0]),
+            ("MSFT", [25.0, 5.0, 40.0]),
+            ("TSLA", [20.0]),
+        ]
+    ]
+
+
+class WatchlistIncomeTest(unittest.TestCase):
+    def stream(self):
+        return mock.patch.object(
+            search_income, "watchlist_income_stream", return_value=iter(batches())
+        )
+
+    def test_all_results_sorted_by_returns(self):
+        with self.stream():
+            df = search_income.watchlist_income(["AAPL", "MSFT", "TSLA"], {})
+
+        self.assertEqual(df["RETURNS"].tolist(), [40.0, 30.0, 25.0, 20.0, 10.0, 5.0])
+        self.assertEqual(df.loc[0, "TICKER"], "MSFT")
+
+    def test_top_k_is_kept_after_each_ticker(self):
+        sizes = [len(frame) for frame in batches()]
+        with self.stream():
+            progress = [
+                pd.concat(frames)["RETURNS"].tolist()
+                for _, frames in search_income.watchlist_income_progress(
+                    ["AAPL", "MSFT", "TSLA"], {"top_k": 2}
+                )
+            ]
+
+        # Never more than top_k rows plus the rows of the ticker just finished
+        for returns, size in zip(progress, sizes):
+            self.assertLessEqual(len(returns), 2 + size)
+        self.assertEqual(sorted(progress[-1], reverse=True)[:2], [40.0, 30.0])
+
+        with self.stream():
+            df = search_income.watchlist_income(["AAPL", "MSFT", "TSLA"], {"top_k": 2})
+        self.assertEqual(df["RETURNS"].tolist(), [40.0, 30.0])
+        self.assertEqual(df["TICKER"].tolist(), ["MSFT", "AAPL"])
+
+
+if __name__ == "__main__":
+    unittest.main()
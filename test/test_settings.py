@@ -0,0 +1,33 @@
+import os
+import unittest
+from unittest import mock
+
+from config.settings import get_bool
+
+
+class GetBoolTest(unittest.TestCase):
+    def get(self, value, default=False):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("TEST_FLAG", None)
+            if value is not None:
+                os.environ["TEST_FLAG"] = value
+            return get_bool("TEST_FLAG", default)
+
+    def test_enabled(self):
+        for value in ["1", "true", "True", "YES", "on", " true "]:
+            with self.subTest(value=value):
+                self.assertTrue(self.get(value))
+
+    def test_disabled(self):
+        # Any non empty string used to enable the flag
+        for value in ["0", "false", "False", "no", "off", ""]:
+            with self.subTest(value=value):
+                self.assertFalse(self.get(value, default=True))
+
+    def test_default_when_unset(self):
+        self.assertFalse(self.get(None))
+        self.assertTrue(self.get(None, default=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
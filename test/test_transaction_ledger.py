@@ -0,0 +1,276 @@
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from broker.transaction_ledger import TransactionLedger
+from service import account_transactions
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class FakeAPI:
+    """Serves the fixture transactions by date and records the requested ranges"""
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.calls = []
+
+    def fetch(self, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return [
+            transaction
+            for transaction in self.transactions
+            if start_date <= transaction["transactionDate"][:10] <= end_date
+        ]
+
+
+class TransactionLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledger = TransactionLedger(
+            os.path.join(self.directory.name, "ledger.sqlite"), sync_interval=300
+        )
+        self.api = FakeAPI(load_fixture("transactions.json"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_sync_fetches_only_missing_dates(self):
+        self.ledger.sync("1", "TRADE", "2023-02-01", "2023-03-31", self.api.fetch)
+        self.ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+        self.ledger.sync("1", "TRADE", "2023-01-15", "2023-04-30", self.api.fetch)
+
+        self.assertEqual(
+            self.api.calls,
+            [
+                ("2023-02-01", "2023-03-31"),
+                ("2023-01-01", "2023-02-01"),
+                ("2023-03-31", "2023-05-31"),
+            ],
+        )
+        state = self.ledger.sync_state("1", "TRADE")
+        self.assertEqual(state["synced_from"], "2023-01-01")
+        self.assertEqual(state["synced_to"], "2023-05-31")
+
+        # Transactions fetched twice are stored once
+        transactions = self.ledger.query("1", "TRADE", "2023-01-01", "2023-05-31")
+        self.assertEqual(
+            sorted(t["transactionId"] for t in transactions),
+            sorted(t["transactionId"] for t in self.api.transactions),
+        )
+
+    def test_high_water_mark_is_refreshed_after_interval(self):
+        self.ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+        self.ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+        self.assertEqual(len(self.api.calls), 1)
+
+        with mock.patch("time.time", return_value=time.time() + 301):
+            self.ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+        self.assertEqual(self.api.calls[-1], ("2023-05-31", "2023-05-31"))
+
+    def test_query_filters(self):
+        self.ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+
+        tsla = self.ledger.query("1", "TRADE", "2023-01-01", "2023-05-31", "TSLA")
+        self.assertTrue(tsla)
+        self.assertTrue(
+            all(
+                "TSLA"
+                in (
+                    t["transactionItem"]["instrument"]["symbol"],
+                    t["transactionItem"]["instrument"].get("underlyingSymbol"),
+                )
+                for t in tsla
+            )
+        )
+        self.assertEqual(
+            self.ledger.query("2", "TRADE", "2023-01-01", "2023-05-31"), []
+        )
+        self.assertEqual(
+            self.ledger.query("1", "DIVIDEND", "2023-01-01", "2023-05-31"), []
+        )
+
+    def test_rollups_of_older_ledgers_are_rebuilt(self):
+        path = os.path.join(self.directory.name, "old.sqlite")
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            connection.executescript(
+                "CREATE TABLE premium_rollups (account TEXT, ticker TEXT, "
+                "month TEXT, option_type TEXT, status TEXT, total_price REAL, "
+                "qty REAL, trades INTEGER);"
+                "CREATE TABLE rollup_state (account TEXT, ticker TEXT, "
+                "valid_until TEXT);"
+                "INSERT INTO rollup_state VALUES ('1', 'AAPL', NULL);"
+            )
+
+        ledger = TransactionLedger(path)
+        ledger.sync("1", "TRADE", "2023-01-01", "2023-05-31", self.api.fetch)
+        self.assertEqual(ledger.rollups("1"), [])
+        self.assertIn("AAPL", ledger.stale_tickers("1", "2023-06-01")[0])
+
+    @contextlib.contextmanager
+    def api_ledger(self):
+        """Reports read from this ledger, synced from the fake API"""
+
+        def get_transactions(account, transaction_type, start_date, end_date, **kw):
+            return self.api.fetch(start_date, end_date)
+
+        with mock.patch.object(
+            account_transactions, "transaction_ledger", self.ledger
+        ), mock.patch.object(
+            account_transactions.Transaction,
+            "get_transactions",
+            side_effect=get_transactions,
+        ), mock.patch.object(
+            account_transactions.Transaction, "__init__", return_value=None
+        ), mock.patch.object(
+            account_transactions.UserConfig, "ACCOUNT_NUMBER", "1"
+        ), mock.patch.object(
+            account_transactions, "invalidate_snapshot"
+        ):
+            yield
+
+    def test_report_from_ledger(self):
+        """get_report built from the ledger matches the report built from the API"""
+        expected = load_fixture("transactions_report.json")["all"]
+
+        with self.api_ledger():
+            df = account_transactions.get_report("2023-01-01", "2099-12-31")
+
+        self.assertEqual(json.loads(df.to_json(orient="split")), expected)
+
+    def test_new_trades_invalidate_the_portfolio_snapshot(self):
+        with self.api_ledger():
+            account_transactions.get_report("2023-01-01", "2023-05-31")
+            account_transactions.get_report("2023-01-01", "2023-05-31")
+            account_transactions.invalidate_snapshot.assert_called_once_with("1")
+
+    def test_premium_rollups_match_report(self):
+        with self.api_ledger():
+            report = account_transactions.get_report("2023-01-01", "2099-12-31")
+            rollups = account_transactions.get_premium_rollups(
+                "2023-01-01", "2099-12-31"
+            )
+
+        expected = (
+            report.assign(MONTH=report["CLOSE_DATE"].str[:7])
+            .groupby(["TICKER", "MONTH", "STATUS"])["TOTAL_PRICE"]
+            .sum()
+            .round(2)
+        )
+        actual = rollups.groupby(["TICKER", "MONTH", "STATUS"])["TOTAL_PRICE"].sum()
+        pd.testing.assert_series_equal(actual, expected, check_like=True)
+        self.assertEqual(rollups["TRADES"].sum(), len(report))
+
+    def test_premium_rollups_total_matches_report_search(self):
+        searches = [
+            # Partial months at both ends
+            ("2023-01-13", "2023-04-15", "All"),
+            ("2023-01-13", "2023-03-31", "PUT"),
+            ("2023-01-01", "2099-12-31", "CALL"),
+        ]
+        for start, end, instrument_type in searches:
+            with self.subTest(start=start, end=end, instrument_type=instrument_type):
+                with self.api_ledger():
+                    report = account_transactions.get_report(
+                        start, end, instrument_type=instrument_type
+                    )
+                    rollups = account_transactions.get_premium_rollups(
+                        start, end, instrument_type=instrument_type
+                    )
+                self.assertAlmostEqual(
+                    rollups["TOTAL_PRICE"].sum(), report["TOTAL_PRICE"].sum(), places=2
+                )
+                self.assertEqual(rollups["TRADES"].sum(), len(report))
+
+    def test_long_held_trade_matches_in_report_and_rollups(self):
+        # Opened more than 45 days before the April search window
+        def option_trade(transaction_id, date, instruction, effect, amount):
+            return {
+                "type": "TRADE",
+                "transactionId": transaction_id,
+                "transactionSubType": "SO" if instruction == "SELL" else "BC",
+                "transactionDate": date + "T15:30:00+0000",
+                "netAmount": amount,
+                "transactionItem": {
+                    "amount": 1,
+                    "price": abs(amount) / 100,
+                    "instruction": instruction,
+                    "positionEffect": effect,
+                    "instrument": {
+                        "symbol": "XYZ_042123P50",
+                        "assetType": "OPTION",
+                        "underlyingSymbol": "XYZ",
+                        "optionExpirationDate": "2023-04-21T06:00:00+0000",
+                        "putCall": "PUT",
+                    },
+                },
+            }
+
+        self.api.transactions += [
+            option_trade(901, "2023-01-05", "SELL", "OPENING", 300.0),
+            option_trade(902, "2023-04-14", "BUY", "CLOSING", -50.0),
+        ]
+        with self.api_ledger():
+            account_transactions.get_report("2023-01-01", "2023-01-31")
+            report = account_transactions.get_report("2023-04-01", "2023-04-30")
+            rollups = account_transactions.get_premium_rollups(
+                "2023-04-01", "2023-04-30"
+            )
+
+        xyz = report[report["TICKER"] == "XYZ"]
+        self.assertEqual(xyz["TOTAL_PRICE"].tolist(), [250.0])
+        self.assertAlmostEqual(
+            rollups["TOTAL_PRICE"].sum(), report["TOTAL_PRICE"].sum(), places=2
+        )
+        self.assertEqual(rollups["TRADES"].sum(), len(report))
+
+    def test_premium_rollups_of_equities_are_empty(self):
+        with self.api_ledger():
+            rollups = account_transactions.get_premium_rollups(
+                "2023-01-01", "2099-12-31", instrument_type="EQUITY"
+            )
+        self.assertTrue(rollups.empty)
+        self.assertIn("TOTAL_PRICE", rollups.columns)
+
+    def test_premium_rollups_are_rebuilt_for_changed_tickers(self):
+        with self.api_ledger():
+            account_transactions.get_premium_rollups("2023-01-01", "2099-12-31")
+        self.assertEqual(self.ledger.stale_tickers("1", "2023-06-01")[0], set())
+
+        # Closing transaction amended by the broker
+        changed = [
+            dict(t, netAmount=-10.0)
+            for t in self.api.transactions
+            if t["transactionId"] == 2
+        ]
+        ticker = changed[0]["transactionItem"]["instrument"]["underlyingSymbol"]
+        self.assertEqual(self.ledger.save("1", changed), 1)
+        self.assertEqual(self.ledger.save("1", changed), 0)
+        self.assertEqual(self.ledger.stale_tickers("1", "2023-06-01")[0], {ticker})
+
+        with mock.patch.object(
+            account_transactions,
+            "premium_rollups",
+            wraps=account_transactions.premium_rollups,
+        ) as rebuild:
+            with self.api_ledger():
+                account_transactions.refresh_premium_rollups("1")
+        tickers = set(rebuild.call_args.args[0]["TICKER"].dropna())
+        self.assertEqual(tickers, {ticker})
+        self.assertEqual(self.ledger.stale_tickers("1", "2023-06-01")[0], set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+
+from broker.transactions import Transaction, date_windows
+
+
+class DateWindowsTest(unittest.TestCase):
+    def test_windows_cover_range_without_overlap(self):
+        self.assertEqual(
+            date_windows("2020-01-01", "2022-03-01"),
+            [
+                ("2020-01-01", "2020-12-30"),
+                ("2020-12-31", "2021-12-30"),
+                ("2021-12-31", "2022-03-01"),
+            ],
+        )
+        self.assertEqual(
+            date_windows("2023-05-01", "2023-05-01"), [("2023-05-01", "2023-05-01")]
+        )
+        self.assertEqual(date_windows("2023-05-02", "2023-05-01"), [])
+
+
+class GetTransactionsRangeTest(unittest.TestCase):
+    def test_windows_are_merged_once_per_transaction(self):
+        responses = {
+            "2020-01-01": [{"transactionId": 1}, {"transactionId": 2}],
+            "2020-12-31": [{"transactionId": 2}, {"transactionId": 3}],
+            "2021-12-31": [],
+        }
+
+        def get_transactions(**kwargs):
+            return responses[kwargs["start_date"]]
+
+        with mock.patch.object(Transaction, "__init__", return_value=None):
+            transaction = Transaction()
+        with mock.patch.object(
+            transaction, "get_transactions", side_effect=get_transactions
+        ) as get:
+            transactions = transaction.get_transactions_range(
+                account="1",
+                transaction_type="TRADE",
+                start_date="2020-01-01",
+                end_date="2022-03-01",
+            )
+
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual([t["transactionId"] for t in transactions], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
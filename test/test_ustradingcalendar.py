@@ -0,0 +1,42 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import CustomBusinessDay
+
+from utils.ustradingcalendar import (
+    USTradingCalendar,
+    next_business_day,
+    previous_business_day,
+)
+
+
+class BusinessDayTest(unittest.TestCase):
+    """Lookups on the precomputed calendar against CustomBusinessDay offsets"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.days = pd.date_range("2001-01-01", "2049-12-31", freq="D")
+        cls.offset = CustomBusinessDay(1, calendar=USTradingCalendar())
+
+    def shifted(self, direction):
+        with warnings.catch_warnings():
+            # Offsets without a vectorized implementation warn when applied to an index
+            warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+            return (self.days + direction * self.offset).values.astype("datetime64[D]")
+
+    def test_previous_business_day(self):
+        np.testing.assert_array_equal(
+            previous_business_day(self.days.strftime("%Y-%m-%d")), self.shifted(-1)
+        )
+
+    def test_next_business_day(self):
+        np.testing.assert_array_equal(next_business_day(self.days), self.shifted(1))
+
+    def test_outside_calendar_is_nat(self):
+        self.assertTrue(np.isnat(previous_business_day(["1990-06-01"])[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()